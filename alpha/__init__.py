@@ -1,3 +1,32 @@
+"""
+Alpha, data from alpha vantage as pandas frames and plotly subplots of it.
 
-from alpha import (core_api, subplots)
+Submodules are imported on first access, so `import alpha` is cheap and a fetch-only job
+never loads plotly: alpha.core_api (Equities, Economics) needs pandas and requests, and
+plotly is only imported when a figure is built (a *_subplot method or
+subplots.build_subplots).
+"""
 
+import importlib
+
+_SUBMODULES = ('aio', 'analytics', 'backtest', 'batch', 'cache', 'core_api', 'covariance', 'export', 'history',
+               'indicators', 'panel', 'parsing', 'quota', 'resample', 'scheduler', 'screener', 'store', 'streaming',
+               'subplots', 'transport')
+
+# names re-exported from a submodule -> that submodule
+_EXPORTS = {'Equities': 'core_api', 'Economics': 'core_api', 'PricePanel': 'panel',
+            'build_subplots': 'subplots'}
+
+__all__ = list(_SUBMODULES) + list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f'{__name__}.{_EXPORTS[name]}'), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Command line entry point of alpha, see python -m alpha --help (or alpha --help when installed)
+"""
+
+import argparse
+import os
+import sys
+
+from alpha import batch
+
+
+def _refresh(args) -> int:
+    api_key = args.api_key or os.environ.get('ALPHA_VANTAGE_API_KEY')
+    if not api_key:
+        print('an api key is required, pass --api-key or set ALPHA_VANTAGE_API_KEY', file=sys.stderr)
+        return 2
+
+    symbols = batch.read_universe(args.universe)
+    endpoints = [e for e in args.endpoints.split(',') if e]
+    store_root = os.path.expanduser(args.store) if args.store else None
+
+    def progress(rows):
+        failed = [r for r in rows if not r['ok']]
+        print(f"{rows[0]['endpoint']:>16} {len(rows) - len(failed):4d} ok {len(failed):4d} failed", flush=True)
+        for r in failed:
+            print(f"{'':>16} {r['key']}: {r['error']}", flush=True)
+
+    try:
+        report = batch.refresh(symbols, endpoints, api_key, store_root=store_root, processes=args.processes,
+                               threads=args.threads, chunk_size=args.chunk_size, per_minute=args.per_minute,
+                               per_day=args.per_day, run_id=args.run_id, restart=args.restart,
+                               base_url=args.base_url, progress=progress)
+    except KeyboardInterrupt:
+        print('interrupted, run the same command again to resume', file=sys.stderr)
+        return 130
+
+    failed = int((~report['ok']).sum())
+    print(f'{len(report) - failed} fetched, {failed} failed')
+    # failures are retried by running the command again with the same run id
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='alpha', description='Alpha vantage data tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    refresh = commands.add_parser('refresh', help='fetch a universe of symbols into the local store',
+                                  description='Fetches endpoints of every symbol of a universe file into the '
+                                              'local column store, sharded across worker processes under one '
+                                              'rate budget. Rerunning an interrupted run resumes it.')
+    refresh.add_argument('universe', help='file with one symbol per line, or a csv with the symbol first')
+    refresh.add_argument('--endpoints', default='daily_adjusted',
+                         help=f'comma separated endpoints of {batch.ENDPOINTS}')
+    refresh.add_argument('--api-key', default=None, help='default is the ALPHA_VANTAGE_API_KEY variable')
+    refresh.add_argument('--store', default=None, help='store directory, default is ~/.cache/alpha/store')
+    refresh.add_argument('--processes', type=int, default=None, help='worker processes, default is the cpu count')
+    refresh.add_argument('--threads', type=int, default=8, help='concurrent requests per process')
+    refresh.add_argument('--chunk-size', type=int, default=25, help='symbols per task')
+    refresh.add_argument('--per-minute', type=int, default=75, help='requests per minute across all processes')
+    refresh.add_argument('--per-day', type=int, default=None, help='requests per day across all processes')
+    refresh.add_argument('--run-id', default=None, help="checkpoint name, default is today's date")
+    refresh.add_argument('--base-url', default=batch.BASE_URL, help='api endpoint, e.g. a proxy or a mock server')
+    refresh.add_argument('--restart', action='store_true', help='ignore the checkpoint and fetch everything')
+    refresh.set_defaults(run=_refresh)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
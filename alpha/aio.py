@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio variants of Equities and Economics for event loop based applications.
+
+AsyncEquities and AsyncEconomics have the same methods as Equities and Economics, but the
+fetch methods are coroutines, so they never block the event loop and can be combined with
+asyncio.gather:
+
+    async with AsyncTransport(rate_limiter=RateLimiter(per_minute=75)) as transport:
+        equities = AsyncEquities(api_key, tickers, transport=transport)
+        econ = AsyncEconomics(api_key, transport=transport)
+        prices, cpi = await asyncio.gather(equities.get_time_series_daily_adjusted(), econ.cpi())
+
+Requests go through an AsyncTransport, an aiohttp session with a pooled connector, and
+responses are parsed with the same code as the synchronous classes (on a worker thread,
+so large responses don't stall the loop). The rate limiter and response cache can be
+shared with synchronous Transport objects. Identical queries awaited concurrently on a
+loop share one request, like Transport does for threads.
+
+aiohttp is an optional dependency, install it with `pip install alpha[async]`.
+"""
+
+import asyncio
+from typing import Optional
+
+import pandas as pd
+
+from alpha import analytics
+from alpha.cache import ResponseCache
+from alpha.core_api import Economics, Equities
+from alpha.quota import QuotaManager, quota_for
+from alpha.scheduler import AsyncSingleFlight, RateLimiter, gather_results
+from alpha.screener import FundamentalsTable
+from alpha.store import ColumnStore
+from alpha.transport import BASE_URL, ThrottleError, flight_key, is_throttle_payload
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# statuses retried with backoff, the same as the synchronous Transport
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# in flight requests shared by every AsyncTransport, see transport.flight_key
+_FLIGHTS = AsyncSingleFlight()
+
+
+class AsyncTransport:
+    '''
+    Pooled, retrying asyncio request pipeline for alpha vantage, the counterpart of
+    transport.Transport. Share one AsyncTransport between AsyncEquities and AsyncEconomics
+    objects to share the connection pool, cache and rate limiter.
+
+    Parameters
+    ----------
+    cache : ResponseCache, optional
+        response cache, if None every call goes to the api
+
+    rate_limiter : RateLimiter, optional
+        acquired before each request that is sent to the api (cache hits skip it). The
+        same limiter can be used by synchronous Transport objects.
+
+    quota : QuotaManager, optional
+        hands out the api key of every request, see transport.Transport. The same quota
+        manager can be used by synchronous Transport objects.
+
+    timeout : float, optional
+        seconds to wait for a response. Default is 30.
+
+    max_retries : int, optional
+        retries for connection errors, 429/5xx statuses and throttle payloads. Default is 3.
+
+    backoff : float, optional
+        base of the exponential backoff in seconds, the n-th retry waits backoff * 2**n.
+        Default is 1.
+
+    limit : int, optional
+        maximum number of open connections. Default is 32.
+
+    session : aiohttp.ClientSession, optional
+        session to send requests with, by default one is created on first use
+
+    base_url : str, optional
+        alpha vantage query url
+
+    single_flight : bool, optional
+        if True a query already in flight on the event loop is not sent again, the caller
+        awaits the in flight response instead. Default is True.
+    '''
+
+    def __init__(self, cache: Optional[ResponseCache] = None, rate_limiter: Optional[RateLimiter] = None,
+                 timeout: float = 30, max_retries: int = 3, backoff: float = 1.0, limit: int = 32,
+                 session=None, base_url: str = BASE_URL, sleep=asyncio.sleep, single_flight: bool = True,
+                 quota: Optional[QuotaManager] = None):
+        if session is None and aiohttp is None:
+            raise ImportError('AsyncTransport requires aiohttp, install it with pip install alpha[async]')
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.quota = quota
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limit = limit
+        self.base_url = base_url
+        self.session = session
+        self._sleep = sleep
+        self.single_flight = single_flight
+
+    def _session(self):
+        # aiohttp sessions belong to a running loop, so the default one is created lazily
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip, deflate'})
+        return self.session
+
+    async def get_json(self, params: dict, api_key: str):
+        '''
+        Returns the decoded json response for a query, see transport.Transport.get_json.
+
+        Raises
+        ------
+        ThrottleError if alpha vantage is still throttling after max_retries retries
+        '''
+        if self.single_flight:
+            return await _FLIGHTS.do(flight_key(self.base_url, params, api_key, self.quota),
+                                     lambda: self._get_json(params, api_key))
+        return await self._get_json(params, api_key)
+
+    async def _get_json(self, params: dict, api_key: str):
+        if self.cache is not None:
+            data = await asyncio.to_thread(self.cache.get, params)
+            if data is not None:
+                return data
+
+        errors = (aiohttp.ClientError, asyncio.TimeoutError) if aiohttp is not None else (asyncio.TimeoutError,)
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(self._sleep)
+            key = await self.quota.acquire_async(self._sleep) if self.quota is not None else api_key
+
+            try:
+                async with self._session().get(self.base_url, params=dict(params, apikey=key)) as r:
+                    if r.status in _RETRY_STATUSES and attempt < self.max_retries:
+                        await self._sleep(self.backoff * 2**attempt)
+                        continue
+                    r.raise_for_status()
+                    data = await r.json(content_type=None)
+            except errors:
+                if attempt == self.max_retries:
+                    raise
+                await self._sleep(self.backoff * 2**attempt)
+                continue
+
+            throttled = is_throttle_payload(data)
+            if self.quota is not None:
+                self.quota.record(key, throttled)
+            if not throttled:
+                break
+            if attempt < self.max_retries and self.quota is None:
+                await self._sleep(self.backoff * 2**attempt)
+        else:
+            raise ThrottleError(f'alpha vantage throttled {params} after {self.max_retries} retries: {data}',
+                                params, data)
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, params, data)
+
+        return data
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncEquities(Equities):
+    '''
+    Equities whose fetch methods are coroutines, see Equities for the methods and
+    parameters. Tickers are fetched concurrently with asyncio.gather, at most max_workers
+    at once, under the transport's rate limiter.
+
+    get_time_series_daily_adjusted takes no incremental or stream arguments, they need the
+    synchronous history store and streaming decoder, use Equities for those.
+    '''
+
+    def __init__(self, api_key: str, tickers: list, max_workers: int = 8,
+                 rate_limiter: RateLimiter = None, timeout: float = 30, cache: ResponseCache = None,
+                 transport: AsyncTransport = None, store: ColumnStore = None):
+        if transport is None:
+            quota = quota_for(api_key)
+            if rate_limiter is None and quota is None:
+                rate_limiter = RateLimiter()
+            transport = AsyncTransport(cache=cache, timeout=timeout, limit=max(max_workers, 10),
+                                       rate_limiter=rate_limiter, quota=quota)
+        super().__init__(api_key, tickers, max_workers=max_workers, transport=transport, store=store)
+
+    async def _get(self, params: dict):
+        return await self.transport.get_json(params, self.api_key)
+
+    async def _fetch_each(self, params, parse, combine, keys: list = None):
+        async def fetch(k):
+            # params may read the local store, so it runs on a worker thread like parse
+            p = await asyncio.to_thread(params, k)
+            data = None if p is None else await self._get(p)
+            return await asyncio.to_thread(parse, k, data)
+
+        results = await gather_results(fetch, self.tickers if keys is None else keys,
+                                       max_concurrency=self.max_workers)
+        self.last_fetch = results
+        return combine(results)
+
+    def get_time_series_daily_adjusted(self, dataframe: bool = True, output_size: str = 'compact',
+                                       start: str = None, end: str = None):
+        return super().get_time_series_daily_adjusted(dataframe=dataframe, output_size=output_size,
+                                                      start=start, end=end)
+
+    async def price_matrix(self, column: str = 'adjusted_close', **kwargs) -> pd.DataFrame:
+        return analytics.price_matrix(await self.get_time_series_daily_adjusted(**kwargs), column=column)
+
+    async def fundamentals_table(self, period: str = 'annual', overview: bool = True,
+                                 prices: pd.Series = None) -> FundamentalsTable:
+        income, balance, cashflow = await asyncio.gather(self.get_income_statement(period=period),
+                                                         self.get_balance_sheet(period=period),
+                                                         self.get_cashflow(period=period))
+        return FundamentalsTable.from_frames(income=income, balance=balance, cashflow=cashflow,
+                                             overview=await self.get_overview() if overview else None,
+                                             prices=prices, period=period)
+
+    async def cashflow_subplot(self, columns: list = ['operatingCashflow', 'netIncome', 'changeInCashAndCashEquivalents'],
+                               period: str = 'annual'):
+        return self._cashflow_figure(await self.get_cashflow(period=period), columns)
+
+    async def daily_adjusted_subplot(self, series_type: str = 'daily_adjusted', output_size: str = 'compact',
+                                     start_end_dates=(), webgl_threshold: int = None, max_points: int = None,
+                                     indicators: list = None):
+        start, end = start_end_dates if start_end_dates else (None, None)
+        price = await self.get_time_series_daily_adjusted(output_size=output_size, start=start, end=end)
+        return self._daily_adjusted_figure(price, series_type, indicators, webgl_threshold, max_points)
+
+
+class AsyncEconomics(Economics):
+    '''
+    Economics whose indicator methods and macro_panel are coroutines, see Economics for
+    the methods and parameters.
+    '''
+
+    def __init__(self, api_key, cache: ResponseCache = None, timeout: float = 30,
+                 rate_limiter: RateLimiter = None, transport: AsyncTransport = None, store: ColumnStore = None,
+                 max_workers: int = 8):
+        if transport is None:
+            quota = quota_for(api_key)
+            if rate_limiter is None and quota is None:
+                rate_limiter = RateLimiter()
+            transport = AsyncTransport(cache=cache, timeout=timeout, limit=max(max_workers, 10),
+                                       rate_limiter=rate_limiter, quota=quota)
+        super().__init__(api_key, transport=transport, store=store, max_workers=max_workers)
+
+    async def _get(self, params: dict):
+        return await self.transport.get_json(params, self.api_key)
+
+    async def _fetch(self, params: dict, dataframe: bool = True, start: str = None, end: str = None):
+        data = await self._get(params)
+        return await asyncio.to_thread(self._parse, params, data, dataframe, start, end)
+
+    async def macro_panel(self, specs: list, freq: str = 'MS', fill: str = 'ffill', agg: str = 'last',
+                          start: str = None, end: str = None):
+        jobs = self._panel_jobs(specs)
+
+        async def fetch(name):
+            indicator, kwargs = jobs[name]
+            # no start here, so the last observation before start can be carried forward
+            return (await getattr(self, indicator)(end=end, **kwargs))['value']
+
+        results = await gather_results(fetch, jobs, max_concurrency=self.max_workers)
+        self.last_fetch = results
+        return self._build_panel(results, freq, fill, agg, start, end)
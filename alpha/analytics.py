@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized return, volatility and drawdown analytics over a wide price matrix.
+
+Equities returns its prices as one long frame with a ticker column. The functions here
+work on a wide matrix instead, one row per date and one column per ticker, so every
+statistic is computed for all tickers at once with NumPy/pandas operations over the
+whole matrix rather than a Python loop per ticker.
+
+    prices = analytics.price_matrix(equities.get_time_series_daily_adjusted(output_size='full'))
+    rets = analytics.returns(prices)
+    vol = analytics.rolling_volatility(rets, window=21)
+    beta = analytics.rolling_beta(rets, 'SPY', window=63)
+"""
+
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+# trading days per year, used to annualize daily statistics
+PERIODS_PER_YEAR = 252
+
+
+def price_matrix(prices: pd.DataFrame, column: str = 'adjusted_close', key: str = 'ticker') -> pd.DataFrame:
+    '''
+    Pivots a long price frame into a wide matrix with one column per ticker.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        long frame with a datetime index, e.g. Equities.get_time_series_daily_adjusted()
+        or ColumnStore.read_many('daily_adjusted')
+
+    column : str, optional
+        the price column to pivot. Default is 'adjusted_close'
+
+    key : str, optional
+        the column naming the ticker of each row. Default is 'ticker'
+
+    Returns
+    -------
+    pandas.DataFrame indexed by the union of all dates sorted ascending, one float64 column
+    per ticker in order of first appearance. Dates a ticker has no bar for are NaN.
+    '''
+    if prices.empty:
+        return pd.DataFrame(dtype='float64')
+
+    dates, date_pos = np.unique(prices.index.to_numpy(), return_inverse=True)
+    tickers = pd.Categorical(prices[key])
+    names = tickers.categories
+    if not isinstance(prices[key].dtype, pd.CategoricalDtype):
+        # keep the order tickers were fetched in rather than sorting them
+        names = pd.unique(prices[key].to_numpy())
+        tickers = pd.Categorical(prices[key], categories=names)
+
+    # scatter the values straight into the matrix, no groupby or pivot_table
+    matrix = np.full((len(dates), len(names)), np.nan)
+    matrix[date_pos.ravel(), tickers.codes] = prices[column].to_numpy(dtype='float64')
+    index = pd.DatetimeIndex(dates, name=prices.index.name) if dates.dtype.kind == 'M' \
+        else pd.Index(dates, name=prices.index.name)
+    return pd.DataFrame(matrix, index=index, columns=pd.Index(list(names), name=key), copy=False)
+
+
+def returns(prices: pd.DataFrame, kind: str = 'log') -> pd.DataFrame:
+    '''
+    Period returns of every column of a price matrix.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        wide price matrix sorted ascending, see price_matrix
+
+    kind : str, optional
+        'log' for log returns, 'simple' for simple returns. Default is 'log'
+
+    Returns
+    -------
+    pandas.DataFrame of the same shape, the first row and rows following a missing price are NaN
+    '''
+    values = prices.to_numpy(dtype='float64')
+    out = np.full(values.shape, np.nan)
+    if kind == 'log':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = np.log(values)
+        out[1:] = logs[1:] - logs[:-1]
+    elif kind == 'simple':
+        out[1:] = values[1:] / values[:-1] - 1
+    else:
+        raise ValueError(f"kind={kind} is not a valid option. Valid options are ['log', 'simple']")
+    return pd.DataFrame(out, index=prices.index, columns=prices.columns, copy=False)
+
+
+def rolling_volatility(rets: pd.DataFrame, window: int = 21, annualize: bool = True,
+                       periods_per_year: int = PERIODS_PER_YEAR, min_periods: int = None) -> pd.DataFrame:
+    '''
+    Rolling standard deviation of returns.
+
+    Parameters
+    ----------
+    rets : pandas.DataFrame
+        returns matrix, see returns
+
+    window : int, optional
+        number of periods in the window. Default is 21 (one trading month)
+
+    annualize : bool, optional
+        if True the volatility is scaled by sqrt(periods_per_year). Default is True
+
+    min_periods : int, optional
+        minimum number of returns in a window, default is window
+
+    Returns
+    -------
+    pandas.DataFrame of the same shape
+    '''
+    vol = rets.rolling(window, min_periods=min_periods).std()
+    return vol * np.sqrt(periods_per_year) if annualize else vol
+
+
+def _benchmark(rets: pd.DataFrame, benchmark) -> pd.Series:
+    if isinstance(benchmark, pd.Series):
+        return benchmark.reindex(rets.index)
+    if benchmark not in rets.columns:
+        raise KeyError(f'benchmark {benchmark} is not a column of the returns matrix')
+    return rets[benchmark]
+
+
+def rolling_beta(rets: pd.DataFrame, benchmark: Union[str, pd.Series] = 'SPY', window: int = 63,
+                 min_periods: int = None) -> pd.DataFrame:
+    '''
+    Rolling beta of every column against a benchmark, cov(r, b) / var(b) over each window.
+
+    Only periods where both the column and the benchmark have a return are used, so tickers
+    with shorter histories or gaps are still compared like for like.
+
+    Parameters
+    ----------
+    rets : pandas.DataFrame
+        returns matrix, see returns
+
+    benchmark : str or pandas.Series, optional
+        a column of rets, or a returns series indexed like rets. Default is 'SPY'
+
+    window : int, optional
+        number of periods in the window. Default is 63 (one trading quarter)
+
+    min_periods : int, optional
+        minimum number of paired returns in a window, default is window
+
+    Returns
+    -------
+    pandas.DataFrame of the same shape
+    '''
+    x, y, paired = _paired(rets, benchmark)
+    # rolling sums of the paired observations give the window means and covariances
+    sums = [pd.DataFrame(v).rolling(window, min_periods=1).sum().to_numpy()
+            for v in (paired.astype('float64'), x, y, x * y, y * y)]
+    out = _beta(*sums)
+    out[sums[0] < (window if min_periods is None else min_periods)] = np.nan
+    return pd.DataFrame(out, index=rets.index, columns=rets.columns, copy=False)
+
+
+def beta(rets: pd.DataFrame, benchmark: Union[str, pd.Series] = 'SPY') -> pd.Series:
+    '''Full period beta of every column against a benchmark, see rolling_beta.'''
+    x, y, paired = _paired(rets, benchmark)
+    sums = [v.sum(axis=0) for v in (paired.astype('float64'), x, y, x * y, y * y)]
+    return pd.Series(_beta(*sums), index=rets.columns)
+
+
+def _paired(rets: pd.DataFrame, benchmark):
+    # zero out periods where either the column or the benchmark has no return
+    b = _benchmark(rets, benchmark).to_numpy(dtype='float64')
+    r = rets.to_numpy(dtype='float64')
+    paired = ~np.isnan(r) & ~np.isnan(b)[:, None]
+    return np.where(paired, r, 0.0), np.where(paired, b[:, None], 0.0), paired
+
+
+def _beta(n, x, y, xy, yy):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (xy - x * y / n) / (yy - y ** 2 / n)
+
+
+def drawdown(prices: pd.DataFrame) -> pd.DataFrame:
+    '''Drawdown of every column from its running peak, 0 at a new high and negative below it.'''
+    return prices / prices.cummax() - 1
+
+
+def max_drawdown(prices: pd.DataFrame) -> pd.Series:
+    '''Largest peak to trough decline of every column of a price matrix, e.g. -0.35 for 35%.'''
+    return drawdown(prices).min()
+
+
+def sharpe_ratio(rets: pd.DataFrame, risk_free: float = 0.0,
+                 periods_per_year: int = PERIODS_PER_YEAR) -> pd.Series:
+    '''
+    Annualized Sharpe ratio of every column.
+
+    Parameters
+    ----------
+    rets : pandas.DataFrame
+        returns matrix, see returns
+
+    risk_free : float, optional
+        annual risk free rate, e.g. 0.04. Default is 0
+
+    Returns
+    -------
+    pandas.Series indexed by ticker
+    '''
+    excess = rets - risk_free / periods_per_year
+    return excess.mean() / excess.std() * np.sqrt(periods_per_year)
+
+
+def summary(prices: pd.DataFrame, benchmark: Union[str, pd.Series] = None, risk_free: float = 0.0,
+            periods_per_year: int = PERIODS_PER_YEAR) -> pd.DataFrame:
+    '''
+    One row of full period statistics per ticker: annualized return and volatility, Sharpe
+    ratio, max drawdown and, if a benchmark is given, beta.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        wide price matrix sorted ascending, see price_matrix
+
+    benchmark : str or pandas.Series, optional
+        a column of prices, or a returns series indexed like prices
+
+    risk_free : float, optional
+        annual risk free rate used for the Sharpe ratio. Default is 0
+
+    Returns
+    -------
+    pandas.DataFrame indexed by ticker
+    '''
+    rets = returns(prices, 'log')
+    out = pd.DataFrame({'annual_return': rets.mean() * periods_per_year,
+                        'annual_volatility': rets.std() * np.sqrt(periods_per_year),
+                        'sharpe': sharpe_ratio(rets, risk_free, periods_per_year),
+                        'max_drawdown': max_drawdown(prices)})
+    if benchmark is not None:
+        out['beta'] = beta(rets, benchmark)
+    return out
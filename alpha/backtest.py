@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized backtests of signal driven strategies over a wide price matrix.
+
+A strategy is a weight matrix shaped like the prices, one row per date and one column per
+ticker, the fraction of the portfolio each ticker should hold after that date's close. run
+applies the weights to the next period's returns (lag=1, so a signal computed from a close
+never trades on that same close), lets held weights drift with the returns and charges
+transaction costs on the turnover needed to get back to the target weights. Equity curves,
+turnover and costs are computed for every date and asset at once with NumPy.
+
+    prices = equities.price_matrix(output_size='full')
+    result = backtest.run(prices, backtest.moving_average_crossover(prices, fast=50, slow=200), cost_bps=5)
+    result.stats()
+
+sweep runs a strategy over a grid of parameters in parallel worker processes:
+
+    grid = [{'fast': f, 'slow': s} for f in range(10, 110, 10) for s in range(50, 300, 25) if f < s]
+    table = backtest.sweep(prices, backtest.moving_average_crossover, grid, cost_bps=5)
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from alpha import indicators as ind
+from alpha.analytics import PERIODS_PER_YEAR
+
+
+# statistics of a backtest, the columns sweep adds to every parameter combination
+STATS = ['total_return', 'annual_return', 'annual_volatility', 'sharpe', 'max_drawdown', 'annual_turnover',
+         'total_costs']
+
+
+def _simple_returns(prices: np.ndarray) -> np.ndarray:
+    # a missing price, or the first row, earns nothing rather than poisoning the portfolio
+    out = np.zeros(prices.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = prices[1:] / prices[:-1] - 1
+    out[~np.isfinite(out)] = 0.0
+    return out
+
+
+def _held(weights: np.ndarray, lag: int) -> np.ndarray:
+    # weights decided on date t are held over the returns of t + lag
+    held = np.zeros(weights.shape)
+    if lag < len(weights):
+        held[lag:] = weights[:len(weights) - lag]
+    held[np.isnan(held)] = 0.0
+    return held
+
+
+def _simulate(rets: np.ndarray, held: np.ndarray, cost: float):
+    '''Private. Portfolio returns, turnover and costs of held weights over simple returns.'''
+    gross = np.einsum('ij,ij->i', held, rets)
+    # between trades the weights drift with the returns of their assets, what is traded is
+    # the difference between the drifted weights and the next target
+    drifted = np.zeros_like(held)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drifted[1:] = held[:-1] * (1 + rets[:-1]) / (1 + gross[:-1, None])
+    drifted[~np.isfinite(drifted)] = 0.0
+    turnover = np.abs(held - drifted).sum(axis=1)
+    costs = turnover * cost
+    return gross - costs, turnover, costs
+
+
+def _stats(net: np.ndarray, turnover: np.ndarray, costs: np.ndarray, periods_per_year: int) -> dict:
+    equity = np.cumprod(1 + net)
+    years = len(net) / periods_per_year
+    std = net.std(ddof=1) if len(net) > 1 else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {'total_return': equity[-1] - 1 if len(net) else 0.0,
+                'annual_return': equity[-1] ** (1 / years) - 1 if len(net) else 0.0,
+                'annual_volatility': std * np.sqrt(periods_per_year),
+                'sharpe': net.mean() / std * np.sqrt(periods_per_year) if std > 0 else np.nan,
+                'max_drawdown': (equity / np.maximum.accumulate(equity) - 1).min() if len(net) else 0.0,
+                'annual_turnover': turnover.mean() * periods_per_year if len(net) else 0.0,
+                'total_costs': costs.sum()}
+
+
+@dataclass
+class BacktestResult:
+    '''
+    Outcome of a backtest, every series is indexed by the dates of the price matrix.
+
+    Attributes
+    ----------
+    equity : pandas.Series
+        portfolio value, starting from initial
+
+    returns : pandas.Series
+        net simple return of the portfolio over each date, after costs
+
+    weights : pandas.DataFrame
+        target weights held over each date's returns (the input weights lagged)
+
+    turnover : pandas.Series
+        sum of the absolute weight changes traded into each date, 2 is selling everything
+        and buying something else
+
+    costs : pandas.Series
+        transaction costs of each date as a fraction of the portfolio
+    '''
+    equity: pd.Series
+    returns: pd.Series
+    weights: pd.DataFrame
+    turnover: pd.Series
+    costs: pd.Series
+
+    def stats(self, periods_per_year: int = PERIODS_PER_YEAR) -> pd.Series:
+        '''Total and annualized return, annualized volatility, Sharpe ratio (no risk free rate),
+        max drawdown, annualized turnover and total costs.'''
+        return pd.Series(_stats(self.returns.to_numpy(), self.turnover.to_numpy(), self.costs.to_numpy(),
+                                periods_per_year))[STATS]
+
+
+def _align(prices: pd.DataFrame, weights) -> np.ndarray:
+    if isinstance(weights, pd.DataFrame):
+        return weights.reindex(index=prices.index, columns=prices.columns).to_numpy(dtype='float64')
+    weights = np.asarray(weights, dtype='float64')
+    if weights.shape != prices.shape:
+        raise ValueError(f'weights of shape {weights.shape} do not match prices of shape {prices.shape}')
+    return weights
+
+
+def run(prices: pd.DataFrame, weights: Union[pd.DataFrame, np.ndarray], cost_bps: float = 0.0, lag: int = 1,
+        initial: float = 1.0) -> BacktestResult:
+    '''
+    Backtests target weights over a wide price matrix.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        wide price matrix sorted ascending, see analytics.price_matrix or Equities.price_matrix
+
+    weights : pandas.DataFrame or numpy array
+        target weight of every ticker after each date's close. A frame is aligned to the
+        dates and tickers of prices, missing weights are 0. Weights don't need to sum to 1,
+        the rest is cash earning nothing (or borrowed if they sum to more)
+
+    cost_bps : float, optional
+        transaction cost in basis points of the value traded. Default is 0
+
+    lag : int, optional
+        dates between deciding a weight and holding it, 1 trades on the next close.
+        0 trades on the close the signal was computed from, which looks ahead. Default is 1
+
+    initial : float, optional
+        starting value of the portfolio. Default is 1
+
+    Returns
+    -------
+    BacktestResult
+    '''
+    if lag < 0:
+        raise ValueError('lag must be 0 or more')
+    held = _held(_align(prices, weights), lag)
+    net, turnover, costs = _simulate(_simple_returns(prices.to_numpy(dtype='float64')), held, cost_bps / 1e4)
+    index = prices.index
+    return BacktestResult(equity=pd.Series(initial * np.cumprod(1 + net), index=index, name='equity'),
+                          returns=pd.Series(net, index=index, name='returns'),
+                          weights=pd.DataFrame(held, index=index, columns=prices.columns, copy=False),
+                          turnover=pd.Series(turnover, index=index, name='turnover'),
+                          costs=pd.Series(costs, index=index, name='costs'))
+
+
+def _values(df) -> np.ndarray:
+    return df.to_numpy(dtype='float64') if isinstance(df, pd.DataFrame) else np.asarray(df, dtype='float64')
+
+
+def _like(values: np.ndarray, df):
+    # strategies return the same type as the prices they are given
+    if isinstance(df, pd.DataFrame):
+        return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+    return values
+
+
+def hold(weights, every: int):
+    '''
+    Rebalances only every `every` dates: each date holds the weights of the last
+    rebalancing date (the first row, then every every-th row).
+    '''
+    values = _values(weights)
+    return _like(values[(np.arange(len(values)) // every) * every], weights)
+
+
+def _equal_weight(selected: np.ndarray) -> np.ndarray:
+    count = selected.sum(axis=1, keepdims=True)
+    return np.where(count > 0, selected / np.maximum(count, 1), 0.0)
+
+
+def moving_average_crossover(prices: pd.DataFrame, fast: int = 50, slow: int = 200) -> pd.DataFrame:
+    '''
+    Equal weights across the tickers whose fast simple moving average is above their slow
+    one, nothing is held while no ticker is in an uptrend.
+    '''
+    if fast >= slow:
+        raise ValueError(f'fast={fast} must be shorter than slow={slow}')
+    with np.errstate(invalid='ignore'):
+        selected = _values(ind.sma(prices, fast)) > _values(ind.sma(prices, slow))
+    return _like(_equal_weight(selected), prices)
+
+
+def momentum(prices: pd.DataFrame, lookback: int = 126, top: int = 10, skip: int = 0,
+             every: int = 21) -> pd.DataFrame:
+    '''
+    Equal weights across the top tickers by trailing return, rebalanced every `every` dates.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        wide price matrix sorted ascending
+
+    lookback : int, optional
+        dates of the trailing return. Default is 126 (six months)
+
+    top : int, optional
+        tickers held. Default is 10
+
+    skip : int, optional
+        most recent dates left out of the trailing return, e.g. 21 to skip the last month's
+        reversal. Default is 0
+
+    every : int, optional
+        dates between rebalances. Default is 21 (monthly)
+    '''
+    values = _values(prices)
+    score = np.full(values.shape, np.nan)
+    end = lookback + skip
+    if end < len(values):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score[end:] = values[lookback:len(values) - skip] / values[:len(values) - end] - 1
+    score[~np.isfinite(score)] = -np.inf
+    # rank every row at once, 0 is the best trailing return
+    rank = np.argsort(np.argsort(-score, axis=1, kind='stable'), axis=1, kind='stable')
+    selected = (rank < top) & np.isfinite(score)
+    return hold(_like(_equal_weight(selected), prices), every)
+
+
+# state of a sweep worker process, set by _init_sweep. Only worker processes set it, a sweep
+# in the calling process passes its state to _run_params
+_sweep = {}
+
+
+def _sweep_state(prices: pd.DataFrame, strategy: Callable, cost: float, lag: int, periods_per_year: int) -> dict:
+    # the returns are computed once per sweep, not per combination
+    return dict(prices=prices, strategy=strategy, cost=cost, lag=lag, periods_per_year=periods_per_year,
+                returns=_simple_returns(prices.to_numpy(dtype='float64')))
+
+
+def _init_sweep(*options):
+    # the prices are sent once per worker
+    _sweep.update(_sweep_state(*options))
+
+
+def _run_params(params_list: list, state: Optional[dict] = None) -> list:
+    '''Backtests each parameter combination, with the worker's state by default, returns a row per combination.'''
+    state = _sweep if state is None else state
+    prices, rows = state['prices'], []
+    for params in params_list:
+        row = dict(params)
+        try:
+            held = _held(_align(prices, state['strategy'](prices, **params)), state['lag'])
+            row.update(_stats(*_simulate(state['returns'], held, state['cost']), state['periods_per_year']))
+            row['error'] = None
+        except Exception as e:
+            row.update(dict.fromkeys(STATS, np.nan), error=repr(e))
+        rows.append(row)
+    return rows
+
+
+def _combinations(grid) -> list:
+    if isinstance(grid, dict):
+        names = list(grid)
+        return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    return [dict(params) for params in grid]
+
+
+def sweep(prices: pd.DataFrame, strategy: Callable, grid: Union[dict, list], cost_bps: float = 0.0, lag: int = 1,
+          processes: Optional[int] = None, chunk_size: Optional[int] = None,
+          periods_per_year: int = PERIODS_PER_YEAR) -> pd.DataFrame:
+    '''
+    Backtests a strategy for every combination of parameters, in parallel processes.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        wide price matrix sorted ascending
+
+    strategy : callable
+        strategy(prices, **params) returning target weights, e.g. moving_average_crossover.
+        It must be picklable, a module level function or a functools.partial of one
+
+    grid : dict or list of dict
+        parameter name -> values, every combination is run. Or a list of parameter dicts,
+        e.g. to leave out combinations that make no sense
+
+    cost_bps, lag : optional
+        see run
+
+    processes : int, optional
+        worker processes, default is the cpu count. 0 runs every combination in this process
+
+    chunk_size : int, optional
+        combinations per task, default spreads them over about 4 tasks per process
+
+    Returns
+    -------
+    pandas.DataFrame with a row per combination in grid order: the parameters, the STATS
+    columns and error (None, or why the strategy failed for that combination)
+    '''
+    combos = _combinations(grid)
+    options = (prices, strategy, cost_bps / 1e4, lag, periods_per_year)
+    processes = os.cpu_count() if processes is None else processes
+
+    if processes == 0 or len(combos) <= 1:
+        rows = _run_params(combos, _sweep_state(*options))
+    else:
+        chunk_size = chunk_size or max(1, -(-len(combos) // (4 * processes)))
+        chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+        with ProcessPoolExecutor(max_workers=min(processes, len(chunks)), initializer=_init_sweep,
+                                 initargs=options) as pool:
+            rows = [row for chunk in pool.map(_run_params, chunks) for row in chunk]
+
+    return pd.DataFrame(rows, columns=list(dict.fromkeys(k for c in combos for k in c)) + STATS + ['error'])
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Batch refreshes of a universe of symbols into the local column store.
+
+The symbols are split into chunks and every (endpoint, chunk) task runs in a pool of worker
+processes, so the json decoding and parsing of thousands of responses uses every core.
+Inside a worker the chunk's symbols, or macro indicators, are fetched concurrently on
+threads. Every process draws from one SharedRateLimiter, so the whole run stays inside the
+api key's quota however many processes there are.
+
+Each finished (endpoint, symbol) is appended to a checkpoint file as its task completes.
+Running the same run id again skips what already succeeded and retries the rest, so an
+interrupted refresh resumes where it stopped:
+
+    python -m alpha refresh universe.txt --endpoints daily_adjusted,cash_flow,macro \\
+        --store ~/alpha-store --processes 4 --threads 8 --per-minute 75
+
+The same run from python:
+
+    report = batch.refresh(batch.read_universe('universe.txt'), ['daily_adjusted', 'macro'],
+                           api_key, store_root='~/alpha-store')
+"""
+
+import datetime
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from alpha import core_api
+from alpha.scheduler import SharedRateLimiter, fetch_concurrent
+from alpha.store import ColumnStore
+from alpha.transport import BASE_URL, Transport
+
+
+# endpoint -> Equities method and its arguments, each of them writes to the store.
+# daily adjusted prices are refreshed incrementally from the history kept in the store
+EQUITY_ENDPOINTS = {'daily_adjusted': ('get_time_series_daily_adjusted', {'incremental': True}),
+                    'cash_flow': ('get_cashflow', {}),
+                    'income_statement': ('get_income_statement', {}),
+                    'balance_sheet': ('get_balance_sheet', {}),
+                    'earnings': ('get_earnings', {})}
+
+# the macro endpoint fetches these Economics series once per run, not once per symbol
+MACRO = 'macro'
+MACRO_INDICATORS = core_api._MACRO_INDICATORS
+
+ENDPOINTS = list(EQUITY_ENDPOINTS) + [MACRO]
+
+
+def read_universe(path: str) -> list:
+    '''
+    Reads the symbols of a universe file: one symbol per line, or a csv whose first column
+    is the symbol (a header named symbol or ticker is skipped). Blank lines and lines
+    starting with # are ignored, duplicates keep their first position.
+    '''
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            symbols.append(line.split(',')[0].strip().strip('"'))
+    if symbols and symbols[0].lower() in ('symbol', 'ticker'):
+        symbols = symbols[1:]
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+class Checkpoint:
+    '''
+    Append-only json lines log of the (endpoint, key) pairs a run has attempted.
+
+    Parameters
+    ----------
+    path : str
+        the log file, created on the first record
+
+    Attributes
+    ----------
+    done : set
+        (endpoint, key) pairs that succeeded, in this or an earlier session of the run
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        # the last line of an interrupted write
+                        continue
+                    if row['ok']:
+                        self.done.add((row['endpoint'], row['key']))
+
+    def record(self, rows: Iterable[dict]):
+        '''Appends rows of endpoint, key, ok, error and latency and flushes them to disk.'''
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+                if row['ok']:
+                    self.done.add((row['endpoint'], row['key']))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# state of a worker process, set by _init_worker
+_worker = {}
+
+
+def _init_worker(api_key: str, store_root: str, limiter: SharedRateLimiter, threads: int, base_url: str):
+    _worker.update(api_key=api_key, store=ColumnStore(store_root), threads=threads,
+                   transport=Transport(rate_limiter=limiter, pool_maxsize=max(threads, 10), base_url=base_url))
+
+
+def _rows(endpoint: str, results: list) -> list:
+    return [{'endpoint': endpoint, 'key': r.key, 'ok': r.ok, 'error': None if r.ok else repr(r.error),
+             'latency': r.latency} for r in results]
+
+
+def _run_task(endpoint: str, keys: list) -> list:
+    '''Fetches keys of endpoint into the store inside a worker, returns a row per key.'''
+    if endpoint == MACRO:
+        econ = core_api.Economics(_worker['api_key'], transport=_worker['transport'], store=_worker['store'],
+                                  max_workers=_worker['threads'])
+        return _rows(endpoint, fetch_concurrent(lambda name: getattr(econ, name)(), keys,
+                                                max_workers=econ.max_workers))
+
+    method, kwargs = EQUITY_ENDPOINTS[endpoint]
+    equities = core_api.Equities(_worker['api_key'], keys, max_workers=_worker['threads'],
+                                 transport=_worker['transport'], store=_worker['store'])
+    getattr(equities, method)(**kwargs)
+    return _rows(endpoint, equities.last_fetch)
+
+
+def _tasks(symbols: list, endpoints: list, chunk_size: int, done: set) -> list:
+    tasks = []
+    for endpoint in endpoints:
+        keys = MACRO_INDICATORS if endpoint == MACRO else symbols
+        keys = [k for k in keys if (endpoint, k) not in done]
+        tasks.extend((endpoint, keys[i:i + chunk_size]) for i in range(0, len(keys), chunk_size))
+    return tasks
+
+
+def checkpoint_path(store_root: str, run_id: str) -> str:
+    '''Path of the checkpoint of run_id, kept next to the datasets of the store.'''
+    return os.path.join(store_root, '_runs', f'{run_id}.jsonl')
+
+
+def refresh(symbols: Iterable[str], endpoints: Iterable[str], api_key: str, store_root: Optional[str] = None,
+            processes: Optional[int] = None, threads: int = 8, chunk_size: int = 25, per_minute: int = 75,
+            per_day: Optional[int] = None, run_id: Optional[str] = None, restart: bool = False,
+            base_url: str = BASE_URL, progress: Optional[Callable] = None) -> pd.DataFrame:
+    '''
+    Fetches endpoints of every symbol into the store, sharded across worker processes.
+
+    Parameters
+    ----------
+    symbols : iterable of str
+        the universe, e.g. read_universe(path)
+
+    endpoints : iterable of str
+        names from ENDPOINTS
+
+    api_key : str
+        alpha vantage api key
+
+    store_root : str, optional
+        directory of the ColumnStore the results are written to. Default is the store's default
+
+    processes : int, optional
+        worker processes, default is the cpu count. 0 runs every task in this process
+
+    threads : int, optional
+        concurrent requests inside each worker. Default is 8
+
+    chunk_size : int, optional
+        symbols per task, also how much work an interruption can lose. Default is 25
+
+    per_minute, per_day : int, optional
+        request budget of the whole run, shared by every process. Default is 75 per minute
+
+    run_id : str, optional
+        names the checkpoint, default is today's date so a nightly job resumes the same
+        night's run and starts afresh the next night
+
+    restart : bool, optional
+        ignore the checkpoint and fetch everything again. Default is False
+
+    base_url : str, optional
+        api endpoint, e.g. a benchmarks.server.MockServer url
+
+    progress : callable, optional
+        called with the rows of every task as it completes
+
+    Returns
+    -------
+    pandas.DataFrame with a row per (endpoint, key) attempted in this session: endpoint,
+    key, ok, error and latency. Keys skipped thanks to the checkpoint are not included.
+    '''
+    endpoints = list(endpoints)
+    unknown = [e for e in endpoints if e not in ENDPOINTS]
+    if unknown:
+        raise ValueError(f'unknown endpoints {unknown}. Valid options are {ENDPOINTS}')
+
+    store_root = ColumnStore(store_root).root
+    run_id = run_id or datetime.date.today().isoformat()
+    path = checkpoint_path(store_root, run_id)
+    if restart and os.path.exists(path):
+        os.remove(path)
+    checkpoint = Checkpoint(path)
+    tasks = _tasks(list(dict.fromkeys(symbols)), endpoints, chunk_size, checkpoint.done)
+
+    rows = []
+
+    def finish(task_rows):
+        checkpoint.record(task_rows)
+        rows.extend(task_rows)
+        if progress is not None:
+            progress(task_rows)
+
+    processes = os.cpu_count() if processes is None else processes
+    if processes == 0 or not tasks:
+        _init_worker(api_key, store_root, SharedRateLimiter(per_minute, per_day), threads, base_url)
+        for endpoint, keys in tasks:
+            finish(_run_task(endpoint, keys))
+    else:
+        limiter = SharedRateLimiter(per_minute, per_day)
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks)), initializer=_init_worker,
+                                 initargs=(api_key, store_root, limiter, threads, base_url)) as pool:
+            futures = {pool.submit(_run_task, endpoint, keys): (endpoint, keys) for endpoint, keys in tasks}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        finish(future.result())
+                    except Exception as e:
+                        # e.g. a worker that died, its keys are retried by the next session
+                        endpoint, keys = futures[future]
+                        finish([{'endpoint': endpoint, 'key': k, 'ok': False, 'error': repr(e), 'latency': 0.0}
+                                for k in keys])
+            except BaseException:
+                # keep what finished in the checkpoint, drop the tasks that haven't started
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    return pd.DataFrame(rows, columns=['endpoint', 'key', 'ok', 'error', 'latency'])
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the fetch, parse and plot paths, run against a local stand-in for the
+alpha vantage api (no api key or network needed):
+
+    python -m alpha.benchmarks --tickers 1,10,50 --sizes 100,5000 --latency 0.02 \\
+        --output benchmarks.jsonl --label after --compare before
+"""
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Command line entry point of the benchmark suite, see python -m alpha.benchmarks --help
+"""
+
+import argparse
+import subprocess
+
+import pandas as pd
+
+from alpha.benchmarks import suite
+
+
+def _ints(value: str) -> list:
+    return [int(v) for v in value.split(',') if v]
+
+
+def _default_label() -> str:
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             check=True).stdout.strip()
+        return rev or 'dev'
+    except (OSError, subprocess.CalledProcessError):
+        return 'dev'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m alpha.benchmarks',
+                                     description='Times the alpha fetch, parse and plot paths against a local '
+                                                 'stand-in for the alpha vantage api.')
+    parser.add_argument('--tickers', type=_ints, default=[1, 10, 50], help='ticker counts, e.g. 1,10,50')
+    parser.add_argument('--sizes', type=_ints, default=[100, 5000], help='history sizes, e.g. 100,5000')
+    parser.add_argument('--only', default=None, help=f'comma separated benchmarks of {list(suite.BENCHMARKS)}')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the server delays each response')
+    parser.add_argument('--throttle-every', type=int, default=None, help='every n-th response is throttled')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    parser.add_argument('--recordings', default=None, help='directory of recorded responses to replay')
+    parser.add_argument('--output', default=None, help='json lines file the results are appended to')
+    parser.add_argument('--label', default=None, help='label of this run, default is the git commit')
+    parser.add_argument('--compare', default=None, help='label of an earlier run in --output to compare with')
+    args = parser.parse_args(argv)
+
+    def progress(row):
+        print(f"{row['benchmark']:>16} tickers={row['tickers']:<4} size={row['size']:<6} "
+              f"wall={row['wall'] * 1000:9.1f}ms peak={row['peak_mb']:8.1f}MB requests={row['requests']}")
+
+    results = suite.run(tickers=args.tickers, sizes=args.sizes, latency=args.latency,
+                        throttle_every=args.throttle_every, repeat=args.repeat, max_workers=args.workers,
+                        benchmarks=args.only.split(',') if args.only else None,
+                        recordings=args.recordings, progress=progress)
+
+    if args.output:
+        label = args.label or _default_label()
+        suite.save(results, args.output, label)
+        if args.compare:
+            with pd.option_context('display.width', 200, 'display.max_columns', 20):
+                print(suite.compare(args.output, args.compare, label))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Alpha vantage payloads for the benchmark server.
+
+Recorded responses are kept one json file per query in a directory and replayed as is.
+Queries without a recording get a synthetic payload with the same shape as the real
+response, sized by the bars / reports / points settings, so the benchmarks can sweep
+history sizes that no recording covers. Synthetic payloads are deterministic: the same
+query and size always give the same payload.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from alpha.cache import cache_key
+
+
+# last bar of the synthetic series
+END = '2024-12-31'
+
+_ECONOMIC_FREQ = {'REAL_GDP': 'QS', 'REAL_GDP_PER_CAPITA': 'QS', 'INFLATION': 'YS', 'TREASURY_YIELD': 'MS',
+                  'FEDERAL_FUNDS_RATE': 'MS', 'CPI': 'MS', 'RETAIL_SALES': 'MS', 'DURABLES': 'MS',
+                  'UNEMPLOYMENT': 'MS', 'NONFARM_PAYROLL': 'MS', 'CONSUMER_SENTIMENT': 'MS'}
+
+_CASH_FLOW_ITEMS = ('operatingCashflow', 'paymentsForOperatingActivities', 'changeInOperatingLiabilities',
+                    'changeInOperatingAssets', 'depreciationDepletionAndAmortization', 'capitalExpenditures',
+                    'changeInReceivables', 'changeInInventory', 'profitLoss', 'cashflowFromInvestment',
+                    'cashflowFromFinancing', 'dividendPayout', 'changeInCashAndCashEquivalents', 'netIncome')
+
+
+def _rng(*parts) -> np.random.Generator:
+    seed = int(hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()[:8], 16)
+    return np.random.default_rng(seed)
+
+
+def daily_adjusted(symbol: str, bars: int) -> dict:
+    '''A TIME_SERIES_DAILY_ADJUSTED response of symbol with bars daily bars, newest first.'''
+    dates = pd.bdate_range(end=END, periods=bars).strftime('%Y-%m-%d')[::-1]
+    close = 100 * np.exp(_rng(symbol, bars).normal(0, 0.01, bars).cumsum())
+    series = {d: {'1. open': f'{c * 0.995:.4f}', '2. high': f'{c * 1.01:.4f}', '3. low': f'{c * 0.99:.4f}',
+                  '4. close': f'{c:.4f}', '5. adjusted close': f'{c:.4f}', '6. volume': str(1000000 + i),
+                  '7. dividend amount': '0.0000', '8. split coefficient': '1.0'}
+              for i, (d, c) in enumerate(zip(dates, close))}
+    return {'Meta Data': {'1. Information': 'Daily Time Series with Splits and Dividend Events',
+                          '2. Symbol': symbol, '3. Last Refreshed': END},
+            'Time Series (Daily)': series}
+
+
+def cash_flow(symbol: str, reports: int) -> dict:
+    '''A CASH_FLOW response of symbol with reports annual and 4 * reports quarterly reports.'''
+    rng = _rng(symbol, reports)
+
+    def make(n, freq):
+        dates = pd.date_range(end=END, periods=n, freq=freq).strftime('%Y-%m-%d')[::-1]
+        return [dict({'fiscalDateEnding': d, 'reportedCurrency': 'USD'},
+                     **{k: str(int(v)) for k, v in zip(_CASH_FLOW_ITEMS, rng.integers(-10**9, 10**10, len(_CASH_FLOW_ITEMS)))})
+                for d in dates]
+
+    return {'symbol': symbol, 'annualReports': make(reports, 'YE'), 'quarterlyReports': make(4 * reports, 'QE')}
+
+
+def economic(function: str, points: int) -> dict:
+    '''A response of an economic indicator function with points observations, newest first.'''
+    freq = _ECONOMIC_FREQ.get(function, 'MS')
+    dates = pd.date_range(end=END, periods=points, freq=freq).strftime('%Y-%m-%d')[::-1]
+    values = 100 + _rng(function, points).normal(0, 1, points).cumsum()
+    return {'name': function, 'interval': freq, 'unit': 'index',
+            'data': [{'date': d, 'value': f'{v:.3f}'} for d, v in zip(dates, values)]}
+
+
+def economic_records(points: int) -> list:
+    '''The data records of an economic response, the input of core_api._build_dataframe.'''
+    return economic('CPI', points)['data']
+
+
+def _file_name(params: dict) -> str:
+    return hashlib.sha1(cache_key(params).encode()).hexdigest()[:16] + '.json'
+
+
+class Payloads:
+    '''
+    Serves the response body of a query, from recordings if there is one and synthetic
+    otherwise. Bodies are encoded (and gzipped) once and kept in memory.
+
+    Parameters
+    ----------
+    recordings : str, optional
+        directory of recorded responses, see record
+
+    bars : int, optional
+        bars of a synthetic daily adjusted response. Default is 100 (outputsize=compact)
+        and 5000 for outputsize=full
+
+    reports : int, optional
+        annual reports of a synthetic cash flow response. Default is 20
+
+    points : int, optional
+        observations of a synthetic economic response. Default is 300
+    '''
+
+    def __init__(self, recordings: Optional[str] = None, bars: Optional[int] = None, reports: int = 20,
+                 points: int = 300):
+        self.recordings = recordings
+        self.bars = bars
+        self.reports = reports
+        self.points = points
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def payload(self, params: dict) -> dict:
+        '''Returns the decoded response of a query.'''
+        if self.recordings is not None:
+            path = os.path.join(self.recordings, _file_name(params))
+            if os.path.exists(path):
+                with open(path) as f:
+                    return json.load(f)
+
+        function = params.get('function')
+        if function == 'TIME_SERIES_DAILY_ADJUSTED':
+            bars = self.bars or (5000 if params.get('outputsize') == 'full' else 100)
+            return daily_adjusted(params['symbol'], bars)
+        if function == 'CASH_FLOW':
+            return cash_flow(params['symbol'], self.reports)
+        if function in _ECONOMIC_FREQ:
+            return economic(function, self.points)
+        return {'Error Message': f'Invalid API call. No payload for {function}.'}
+
+    def body(self, params: dict, gzipped: bool = False) -> bytes:
+        '''Returns the encoded response of a query, built once per query.'''
+        key = (cache_key(params), gzipped)
+        with self._lock:
+            body = self._bodies.get(key)
+        if body is None:
+            body = json.dumps(self.payload(params)).encode('utf-8')
+            if gzipped:
+                body = gzip.compress(body, compresslevel=6)
+            with self._lock:
+                self._bodies[key] = body
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+
+
+def record(recordings: str, params: dict, payload: dict):
+    '''Saves a response to replay it later, e.g. one fetched with Transport.get_json.'''
+    os.makedirs(recordings, exist_ok=True)
+    with open(os.path.join(recordings, _file_name(params)), 'w') as f:
+        json.dump(payload, f)
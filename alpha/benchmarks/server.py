@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for the alpha vantage query endpoint.
+
+MockServer answers /query requests on localhost with payloads from a Payloads object,
+after a configurable latency, and can return throttle payloads like alpha vantage does
+when a key goes over its limit. Point a Transport at it with base_url:
+
+    with MockServer(latency=0.05, throttle_every=20) as server:
+        transport = Transport(base_url=server.url, rate_limiter=None)
+        equities = Equities('bench', tickers, transport=transport)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlparse
+
+from alpha.benchmarks.payloads import Payloads
+
+
+THROTTLE_NOTE = {'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is '
+                         '5 calls per minute and 500 calls per day.'}
+
+
+class MockServer:
+    '''
+    Threaded HTTP server replaying alpha vantage payloads on localhost.
+
+    Parameters
+    ----------
+    payloads : Payloads, optional
+        the responses, default is synthetic payloads of the default sizes
+
+    latency : float, optional
+        seconds each response is delayed by, requests are served concurrently. Default is 0
+
+    throttle_every : int, optional
+        every n-th request gets a throttle payload instead of data. Default is None, never
+
+    host : str, optional
+        interface to listen on. Default is '127.0.0.1'
+
+    port : int, optional
+        port to listen on, 0 picks a free port. Default is 0
+
+    Attributes
+    ----------
+    requests : int
+        number of requests served
+
+    throttled : int
+        number of throttle payloads served
+    '''
+
+    def __init__(self, payloads: Optional[Payloads] = None, latency: float = 0.0,
+                 throttle_every: Optional[int] = None, host: str = '127.0.0.1', port: int = 0):
+        self.payloads = payloads if payloads is not None else Payloads()
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/query'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, like the real endpoint, so pooled connections are reused
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, don't let nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/query':
+                    self.send_error(404)
+                    return
+                params = {k: v for k, v in parse_qsl(url.query) if k != 'apikey'}
+                if server.latency:
+                    time.sleep(server.latency)
+
+                with server._lock:
+                    server.requests += 1
+                    throttle = server.throttle_every and server.requests % server.throttle_every == 0
+                    if throttle:
+                        server.throttled += 1
+
+                gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+                if throttle:
+                    body = json.dumps(THROTTLE_NOTE).encode('utf-8')
+                    gzipped = False
+                else:
+                    body = server.payloads.body(params, gzipped)
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def reset(self):
+        '''Resets the request counters.'''
+        with self._lock:
+            self.requests = 0
+            self.throttled = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
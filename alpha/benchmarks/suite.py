@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+The benchmarks: fetch, parse and plot paths timed against a local MockServer.
+
+Every benchmark runs over a grid of ticker counts and history sizes. Each case is run
+`repeat` times for the wall time (best and median) and once more under tracemalloc for
+the peak memory allocated. Payloads are built and encoded before the timed runs, so only
+the client side is measured.
+
+The import benchmark times a cold `import` in a fresh interpreter instead, so the cost of
+the package's import graph (and whether it drags plotly in) shows up in the same results.
+
+Results are appended to a json lines file with a label (e.g. the release or commit), so
+runs before and after a change, or across releases, can be compared:
+
+    results = suite.run(tickers=(1, 10), sizes=(100, 5000), latency=0.02)
+    suite.save(results, 'benchmarks.jsonl', label='before')
+    ...
+    suite.compare('benchmarks.jsonl', 'before', 'after')
+"""
+
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from alpha import core_api, subplots
+from alpha.benchmarks.payloads import Payloads, economic_records
+from alpha.benchmarks.server import MockServer
+from alpha.transport import Transport
+
+
+# Economics methods timed by the economics benchmark
+ECONOMICS_METHODS = ['retail_sales', 'inflation', 'cpi', 'treasury_yield', 'consumer_sentiment',
+                     'nonfarm_payroll', 'federal_funds_rate', 'real_gdp']
+
+# statement timed by the import benchmark, what a fetch-only job imports
+IMPORT_STATEMENT = 'import alpha.core_api'
+
+# run in a fresh interpreter by cold_import, prints the import time, the peak resident
+# memory and which heavy dependencies the import loaded
+_COLD_IMPORT = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+seconds = time.perf_counter() - start
+try:
+    import resource
+    # kilobytes on linux, bytes on macos
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+except ImportError:
+    maxrss = 0
+print(json.dumps({'seconds': seconds, 'maxrss': maxrss,
+                  'loaded': [m for m in ('plotly', 'pandas', 'requests', 'aiohttp') if m in sys.modules]}))
+"""
+
+# result columns that identify a case
+CASE = ['benchmark', 'tickers', 'size']
+
+
+def measure(fn: Callable, repeat: int = 3) -> dict:
+    '''
+    Times fn() repeat times and runs it once more under tracemalloc.
+
+    Returns
+    -------
+    dict with wall (best of the runs, seconds), wall_median and peak_mb
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'wall': min(times), 'wall_median': statistics.median(times), 'peak_mb': peak / 2**20}
+
+
+def cold_import(statement: str = IMPORT_STATEMENT) -> dict:
+    '''
+    Runs statement in a fresh python interpreter and times it, e.g. 'import alpha.core_api'.
+
+    Returns
+    -------
+    dict with seconds (the statement only, not the interpreter start up), maxrss (peak
+    resident bytes of the interpreter, 0 where unknown) and loaded (which of plotly, pandas,
+    requests and aiohttp were imported)
+    '''
+    # time this copy of alpha, whether or not it is installed
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    out = subprocess.run([sys.executable, '-c', _COLD_IMPORT, statement], capture_output=True, text=True,
+                         check=True, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _tickers(n: int) -> list:
+    return [f'T{i:03d}' for i in range(n)]
+
+
+def _transport(server: MockServer) -> Transport:
+    # no cache or client side rate limiting, every call goes to the server
+    return Transport(base_url=server.url, rate_limiter=None, backoff=0.01)
+
+
+def _warm(payloads: Payloads, queries: Iterable[dict]):
+    for params in queries:
+        payloads.body(params, gzipped=True)
+
+
+def daily_adjusted(server: MockServer, tickers: int, size: int, repeat: int, max_workers: int) -> dict:
+    '''Equities.get_time_series_daily_adjusted of tickers tickers with size bars each.'''
+    server.payloads = Payloads(server.payloads.recordings, bars=size)
+    equities = core_api.Equities('bench', _tickers(tickers), max_workers=max_workers, transport=_transport(server))
+    _warm(server.payloads, ({'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': t, 'outputsize': 'full'}
+                            for t in equities.tickers))
+    return measure(lambda: equities.get_time_series_daily_adjusted(output_size='full'), repeat)
+
+
+def cashflow(server: MockServer, tickers: int, size: int, repeat: int, max_workers: int) -> dict:
+    '''Equities.get_cashflow of tickers tickers with size annual reports each.'''
+    server.payloads = Payloads(server.payloads.recordings, reports=size)
+    equities = core_api.Equities('bench', _tickers(tickers), max_workers=max_workers, transport=_transport(server))
+    _warm(server.payloads, ({'function': 'CASH_FLOW', 'symbol': t} for t in equities.tickers))
+    return measure(equities.get_cashflow, repeat)
+
+
+def economics(server: MockServer, tickers: int, size: int, repeat: int, max_workers: int) -> dict:
+    '''Every Economics indicator method once, each with size observations.'''
+    server.payloads = Payloads(server.payloads.recordings, points=size)
+    econ = core_api.Economics('bench', transport=_transport(server))
+
+    def run():
+        for method in ECONOMICS_METHODS:
+            getattr(econ, method)()
+
+    return measure(run, repeat)
+
+
+def build_dataframe(server: MockServer, tickers: int, size: int, repeat: int, max_workers: int) -> dict:
+    '''core_api._build_dataframe of size economic records, no requests.'''
+    records = economic_records(size)
+    return measure(lambda: core_api._build_dataframe(records), repeat)
+
+
+def build_subplots(server: MockServer, tickers: int, size: int, repeat: int, max_workers: int) -> dict:
+    '''subplots.build_subplots of one daily adjusted subplot per ticker with size bars each.'''
+    server.payloads = Payloads(server.payloads.recordings, bars=size)
+    equities = core_api.Equities('bench', _tickers(tickers), max_workers=max_workers, transport=_transport(server))
+    prices = equities.get_time_series_daily_adjusted(output_size='full')
+    data = [{'subplot': [{'series': df['adjusted_close'].rename('value'), 'legend-name': t,
+                          'max-trendline': {}, 'min-trendline': {}}], 'title': t}
+            for t, df in prices.groupby('ticker', sort=False)]
+    server.reset()
+    return measure(lambda: subplots.build_subplots(data), repeat)
+
+
+def import_time(server: MockServer, tickers: int, size: int, repeat: int, max_workers: int) -> dict:
+    '''Cold import of alpha.core_api in a fresh interpreter, peak_mb is its peak resident memory.'''
+    runs = [cold_import() for _ in range(repeat)]
+    times = [r['seconds'] for r in runs]
+    return {'wall': min(times), 'wall_median': statistics.median(times),
+            'peak_mb': max(r['maxrss'] for r in runs) / 2**20}
+
+
+# benchmark name -> (function, grid dimensions it varies over)
+BENCHMARKS = {'daily_adjusted': (daily_adjusted, ('tickers', 'size')),
+              'cashflow': (cashflow, ('tickers',)),
+              'economics': (economics, ('size',)),
+              'build_dataframe': (build_dataframe, ('size',)),
+              'build_subplots': (build_subplots, ('tickers', 'size')),
+              'import': (import_time, ())}
+
+# size used by benchmarks that don't vary it (annual reports for cashflow)
+_FIXED_SIZE = {'cashflow': 20}
+
+
+def run(tickers: Iterable[int] = (1, 10, 50), sizes: Iterable[int] = (100, 5000), latency: float = 0.0,
+        throttle_every: Optional[int] = None, repeat: int = 3, max_workers: int = 8,
+        benchmarks: Optional[Iterable[str]] = None, recordings: Optional[str] = None,
+        progress: Optional[Callable] = None) -> pd.DataFrame:
+    '''
+    Runs the benchmarks against a MockServer started for the run.
+
+    Parameters
+    ----------
+    tickers : iterable of int, optional
+        ticker counts. Default is (1, 10, 50)
+
+    sizes : iterable of int, optional
+        history sizes, bars for daily adjusted and subplots and observations for the
+        economic series. Default is (100, 5000)
+
+    latency : float, optional
+        seconds the server delays each response. Default is 0
+
+    throttle_every : int, optional
+        every n-th response is a throttle payload. Default is None
+
+    repeat : int, optional
+        timed runs per case. Default is 3
+
+    max_workers : int, optional
+        concurrent requests of the Equities benchmarks. Default is 8
+
+    benchmarks : iterable of str, optional
+        names from BENCHMARKS, default is all of them
+
+    recordings : str, optional
+        directory of recorded responses to replay, see payloads.record
+
+    progress : callable, optional
+        called with each result row as it is measured
+
+    Returns
+    -------
+    pandas.DataFrame with one row per case: benchmark, tickers, size, wall, wall_median,
+    peak_mb, requests and throttled
+    '''
+    names = list(BENCHMARKS) if benchmarks is None else list(benchmarks)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f'unknown benchmarks {unknown}. Valid options are {list(BENCHMARKS)}')
+
+    rows = []
+    with MockServer(Payloads(recordings), latency=latency, throttle_every=throttle_every) as server:
+        for name in names:
+            fn, dims = BENCHMARKS[name]
+            for n in (tickers if 'tickers' in dims else [1]):
+                for size in (sizes if 'size' in dims else [_FIXED_SIZE.get(name, 0)]):
+                    server.reset()
+                    row = {'benchmark': name, 'tickers': n, 'size': size}
+                    row.update(fn(server, n, size, repeat, max_workers))
+                    row.update(requests=server.requests, throttled=server.throttled)
+                    rows.append(row)
+                    if progress is not None:
+                        progress(row)
+    return pd.DataFrame(rows)
+
+
+def save(results: pd.DataFrame, path: str, label: str):
+    '''Appends results to a json lines file under label, with the date and python version.'''
+    meta = {'label': label, 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'pandas': pd.__version__}
+    with open(path, 'a') as f:
+        for row in results.to_dict('records'):
+            f.write(json.dumps(dict(meta, **row)) + '\n')
+
+
+def load(path: str) -> pd.DataFrame:
+    '''Reads every run saved to path.'''
+    return pd.read_json(path, lines=True)
+
+
+def compare(path: str, base: str, new: str) -> pd.DataFrame:
+    '''
+    Compares two labelled runs saved to path, the latest run of each label is used.
+
+    Returns
+    -------
+    pandas.DataFrame indexed by benchmark, tickers and size with the wall time and peak
+    memory of both runs and their ratios new / base (below 1 is an improvement)
+    '''
+    history = load(path)
+    runs = {}
+    for label in (base, new):
+        rows = history[history['label'] == label]
+        if rows.empty:
+            raise KeyError(f'no run labelled {label} in {path}')
+        runs[label] = rows[rows['date'] == rows['date'].max()].set_index(CASE)[['wall', 'peak_mb']]
+
+    out = runs[base].join(runs[new], lsuffix=f'_{base}', rsuffix=f'_{new}', how='inner')
+    out['wall_ratio'] = out[f'wall_{new}'] / out[f'wall_{base}']
+    out['peak_ratio'] = out[f'peak_mb_{new}'] / out[f'peak_mb_{base}']
+    return out
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent response cache shared by the Equities and Economics classes.
+
+Responses are stored in a SQLite database keyed on the query parameters sent to
+alpha vantage (function, symbol, interval, maturity, outputsize, ...), without the
+api key. Every function has its own time to live, e.g. intraday prices expire after
+a minute while quarterly gdp is kept for a week. When the cache grows past its size
+or entry limit the least recently used responses are evicted.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Optional
+
+
+# seconds a response is considered fresh, per alpha vantage function
+DEFAULT_TTL = {
+    'TIME_SERIES_INTRADAY': 60,
+    'TIME_SERIES_DAILY_ADJUSTED': 4 * 3600,
+    'OVERVIEW': 24 * 3600,
+    'INCOME_STATEMENT': 24 * 3600,
+    'BALANCE_SHEET': 24 * 3600,
+    'CASH_FLOW': 24 * 3600,
+    'EARNINGS': 24 * 3600,
+    'TREASURY_YIELD': 12 * 3600,
+    'FEDERAL_FUNDS_RATE': 12 * 3600,
+    'CPI': 24 * 3600,
+    'INFLATION': 24 * 3600,
+    'RETAIL_SALES': 24 * 3600,
+    'CONSUMER_SENTIMENT': 24 * 3600,
+    'NONFARM_PAYROLL': 24 * 3600,
+    'REAL_GDP': 7 * 24 * 3600,
+}
+
+# used for functions missing from the ttl table
+DEFAULT_TTL_FALLBACK = 3600
+
+# payload keys alpha vantage uses for throttling and errors, these are never cached
+ERROR_KEYS = ('Note', 'Information', 'Error Message')
+
+
+def default_cache_dir() -> str:
+    '''Returns the directory alpha keeps local data in, ~/.cache/alpha or $XDG_CACHE_HOME/alpha'''
+    root = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(root, 'alpha')
+
+
+def default_cache_path() -> str:
+    '''Returns the default location of the cache database, ~/.cache/alpha/responses.sqlite'''
+    return os.path.join(default_cache_dir(), 'responses.sqlite')
+
+
+def cache_key(params: dict) -> str:
+    '''Builds the cache key for a query, the api key is never part of the key.'''
+    return json.dumps({k: str(v) for k, v in sorted(params.items()) if k != 'apikey'},
+                      separators=(',', ':'))
+
+
+class ResponseCache:
+    '''
+    SQLite backed cache of decoded alpha vantage json responses.
+
+    Parameters
+    ----------
+    path : str, optional
+        location of the sqlite database, ':memory:' keeps the cache in memory.
+        Default is ~/.cache/alpha/responses.sqlite
+
+    ttl : dict, optional
+        seconds to live per alpha vantage function, merged over DEFAULT_TTL
+
+    max_bytes : int, optional
+        maximum total size of the stored (compressed) responses. Default is 512MB.
+
+    max_entries : int, optional
+        maximum number of stored responses, None means no limit
+
+    clock : callable, optional
+        wall clock, injectable for testing
+    '''
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[dict] = None,
+                 max_bytes: int = 512 * 2**20, max_entries: Optional[int] = None,
+                 clock: Callable = time.time):
+        self.path = path or default_cache_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                  key TEXT PRIMARY KEY,
+                                  function TEXT,
+                                  payload BLOB,
+                                  size INTEGER,
+                                  created REAL,
+                                  accessed REAL)''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def ttl_for(self, function: str) -> float:
+        return self.ttl.get(function, DEFAULT_TTL_FALLBACK)
+
+    def get(self, params: dict):
+        '''Returns the cached response for params, or None if missing or expired.'''
+        key = cache_key(params)
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute('SELECT payload, created FROM responses WHERE key = ?',
+                                     (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_for(params.get('function')):
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, params: dict, data) -> bool:
+        '''Stores a response, error and throttle payloads are not stored. Returns True if stored.'''
+        if isinstance(data, dict) and any(k in data for k in ERROR_KEYS):
+            return False
+        payload = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        now = self._clock()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                               (cache_key(params), params.get('function'), payload,
+                                len(payload), now, now))
+            self._evict()
+        return True
+
+    def _evict(self):
+        # drop least recently used rows until both limits are satisfied
+        while True:
+            count, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            over_size = self.max_bytes is not None and size > self.max_bytes
+            over_count = self.max_entries is not None and count > self.max_entries
+            if count <= 1 or not (over_size or over_count):
+                return
+            self._conn.execute('''DELETE FROM responses WHERE key =
+                                  (SELECT key FROM responses ORDER BY accessed LIMIT 1)''')
+
+    def purge_expired(self) -> int:
+        '''Deletes every expired response and returns the number of rows removed.'''
+        now = self._clock()
+        removed = 0
+        with self._lock:
+            for function, in self._conn.execute('SELECT DISTINCT function FROM responses').fetchall():
+                cur = self._conn.execute('DELETE FROM responses WHERE function IS ? AND created < ?',
+                                         (function, now - self.ttl_for(function)))
+                removed += cur.rowcount
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -8,33 +8,42 @@ Alpha is a module used to access data from alpha vantage and perform various com
 such as building subplots of various economic and equity based data. 
 """
 
-import requests
+import datetime
+
 import pandas as pd
-import plotly as plt
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
 import numpy as np
 from alpha import subplots
-
-
-
-_colors = plt.colors.DEFAULT_PLOTLY_COLORS
-
-
-def _build_dataframe(data, columns: list = ['value'], set_index: bool = True):
-    '''Private. Takes a list of dicts or dataframe and builds a dataframe while converting values to numeric,
-    and setting the index to date.
+from alpha import analytics
+from alpha import indicators as ind
+from alpha import history as hist
+from alpha import parsing
+from alpha import resample
+from alpha import streaming
+from alpha.cache import ResponseCache
+from alpha.panel import PricePanel, downcast
+from alpha.quota import quota_for
+from alpha.scheduler import RateLimiter, fetch_concurrent
+from alpha.screener import FundamentalsTable
+from alpha.store import ColumnStore, partition_name
+from alpha.transport import Transport, is_throttle_payload, payload_error
+
+
+# Economics methods that macro_panel can fetch
+_MACRO_INDICATORS = ['retail_sales', 'inflation', 'cpi', 'treasury_yield', 'consumer_sentiment',
+                     'nonfarm_payroll', 'federal_funds_rate', 'real_gdp']
+
+
+def _build_dataframe(data, schema: parsing.Schema = parsing.ECONOMIC):
+    '''Private. Takes a list of dicts and builds a typed dataframe indexed by date, see alpha.parsing.
       
     Parameters
     ----------
-    data : dataframe or list of dicts
-        holds data that should be converted into dataframe or used for converting to numeric.
+    data : list of dicts
+        records of the response e.g. response['data']
 
-    columns: list
-        A list of columns that should be converted to numeric.
-        
-    set_index: boolean
-        if True set the date columne to the index
+    schema : parsing.Schema, optional
+        declares the dtype and column name of each field. Default is parsing.ECONOMIC,
+        a float64 value column with a datetime64 date index.
         
     Returns
     -------
@@ -42,15 +51,88 @@ def _build_dataframe(data, columns: list = ['value'], set_index: bool = True):
         Returns a pandas dataframe.
 
     '''
-    if isinstance(data,list):
-        data = pd.DataFrame(data)
+    return parsing.parse_records(data, schema)
+
+
+def _daily_adjusted_frame(data, start=None, end=None):
+    '''Private. Builds a typed dataframe from a TIME_SERIES_DAILY_ADJUSTED response, keeping
+    only the bars between start and end.'''
+    return parsing.parse_time_series(data['Time Series (Daily)'], parsing.DAILY_ADJUSTED, start, end)
 
-    data[columns] = data[columns].apply(pd.to_numeric, errors='coerce')
 
-    if set_index == True:
-        data.set_index('date', inplace=True)
+def _empty_frame(schema: parsing.Schema) -> pd.DataFrame:
+    '''Private. The frame returned when no ticker was fetched, typed columns of schema and ticker.'''
+    empty = parsing.parse_time_series({}, schema)
+    empty['ticker'] = pd.Series(dtype=object)
+    return empty
+
+
+def _combine_tickers(results, dataframe=True, schema: parsing.Schema = parsing.DAILY_ADJUSTED):
+    '''Private. Concatenates the frames of the tickers that were fetched, adding a ticker
+    column, or lists their responses if dataframe is False. If no ticker was fetched the
+    frame is empty, with the columns of schema and ticker.'''
+    return_obj = []
+    for res in results:
+        if not res.ok:
+            continue
+
+        if dataframe:
+            df = res.value
+            df['ticker'] = res.key
+            return_obj.append(df)
+        else:
+            return_obj.append(res.value)
+
+    if dataframe:
+        if not return_obj:
+            return _empty_frame(schema)
+        return_df = pd.concat(return_obj)
+        return return_df
+    else:
+        return return_obj
+
+
+def _stitch(results, tickers):
+    '''Private. Concatenates the bars of (ticker, slice) results, sorted by ticker and time,
+    keeping one row per ticker and timestamp where slices overlap. Empty, with the intraday
+    columns, if every slice failed.'''
+    frames = [res.value.assign(ticker=res.key[0]) for res in results if res.ok]
+    if not frames:
+        return _empty_frame(parsing.INTRADAY)
+    df = pd.concat(frames)
+    codes = pd.Categorical(df['ticker'], categories=list(dict.fromkeys(tickers))).codes
+    ts = df.index.to_numpy()
+    order = np.lexsort((ts, codes))
+    codes, ts = codes[order], ts[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (ts[1:] != ts[:-1])
+    return df.iloc[order[keep]]
+
+
+def _end_of_day(end):
+    '''Private. Returns end, or the last moment of that day if end is a date without a time,
+    so a date-only end includes the bars of the whole day.'''
+    if end is None:
+        return None
+    if isinstance(end, str):
+        date_only = not any(c in end.strip() for c in 'T: ')
+    else:
+        date_only = isinstance(end, datetime.date) and not isinstance(end, datetime.datetime)
+    ts = pd.Timestamp(end)
+    return ts + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns') if date_only else ts
+
+
+def _intraday_dataset(interval, adjusted=True, extended_hours=True):
+    '''Private. Store dataset of intraday month slices, e.g. intraday_5min.'''
+    return f'intraday_{interval}' + ('' if adjusted else '_raw') + ('' if extended_hours else '_regular')
+
+
+def _check_daily_adjusted(t, data):
+    '''Private. Fails ticker t only, a throttle or error payload has no time series key.'''
+    if 'Time Series (Daily)' not in data:
+        raise payload_error(data, f'no daily time series returned for {t}',
+                            {'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': t})
 
-    return data
 
 class Equities():
 
@@ -61,11 +143,45 @@ class Equities():
     ...
     Attributes
     ----------
-    api_key : str
-        alpha_vantage api key
+    api_key : str or list of str
+        alpha_vantage api key, or several keys to rotate across with a quota.QuotaManager
+        (75 requests per minute each) when no transport is passed
     
     tickers : list
         list of stock symbols to be retrieved
+
+    max_workers : int
+        number of tickers fetched concurrently, 1 fetches the tickers serially
+
+    rate_limiter : RateLimiter
+        token bucket limiter that keeps concurrent fetches inside the alpha vantage
+        per-minute and per-day quotas
+
+    timeout : float
+        seconds to wait for a single response before the ticker is reported as failed
+
+    cache : ResponseCache
+        response cache shared with other Equities or Economics objects, None disables caching
+
+    transport : Transport
+        pooled request pipeline, pass the same transport to several Equities and Economics
+        objects to share one connection pool, cache and rate limiter. If passed, rate_limiter,
+        timeout and cache are ignored.
+
+    store : ColumnStore
+        columnar local store, if set full daily adjusted histories are saved to its
+        'daily_adjusted' dataset and cash flow reports to 'cash_flow', one partition per ticker
+
+    history : HistoryStore
+        local daily adjusted price history used by incremental refreshes, kept in store if set
+
+    last_refresh : dict
+        for each ticker of the most recent incremental refresh, 'compact' if only the new
+        bars were fetched or 'full' if the full history was downloaded
+
+    last_fetch : list
+        list of scheduler.FetchResult from the most recent multi-ticker call, holds the
+        latency and error (if any) of each ticker
     
     Methods
     -------
@@ -77,51 +193,236 @@ class Equities():
         creates a subplot of for each equity that as retrieved using plotly
     """
 
-    def __init__(self, api_key: str, tickers: list):
+    def __init__(self, api_key: str, tickers: list, max_workers: int = 8,
+                 rate_limiter: RateLimiter = None, timeout: float = 30, cache: ResponseCache = None,
+                 transport: Transport = None, history: hist.HistoryStore = None, store: ColumnStore = None):
         self.api_key = api_key
         self.tickers = tickers
-        self.base_url = 'https://www.alphavantage.co/query?'
+        self.max_workers = max_workers
+        self.store = store
+        if history is None and store is not None:
+            history = hist.HistoryStore(store=store)
+        self.history = history
+        self.last_refresh = {}
+        if transport is None:
+            quota = quota_for(api_key)
+            if rate_limiter is None and quota is None:
+                rate_limiter = RateLimiter()
+            transport = Transport(cache=cache, timeout=timeout, pool_maxsize=max(max_workers, 10),
+                                  rate_limiter=rate_limiter, quota=quota)
+        self.transport = transport
+        self.last_fetch = []
+
+    def _get(self, params: dict):
+        '''Private. Returns the json response for params through the shared transport.'''
+        return self.transport.get_json(params, self.api_key)
+
+    def _fetch_tickers(self, fetch, keys: list = None):
+        '''Private. Runs fetch(ticker) concurrently for every ticker (or every key of keys) and
+        returns the scheduler.FetchResult list in order, the list is also kept on last_fetch.'''
+        # the rate limiter is acquired per request in _get so cache hits don't wait on it
+        results = fetch_concurrent(fetch, self.tickers if keys is None else keys, max_workers=self.max_workers)
+        self.last_fetch = results
+        return results
+
+    def _fetch_each(self, params, parse, combine, keys: list = None):
+        '''Private. Sends one request per ticker and combines the parsed results.
+
+        params(t) builds the query of ticker t, parse(t, data) turns its response into the
+        ticker's result (raising fails that ticker only) and combine(results) builds the
+        return value from the scheduler.FetchResult list. Requests and parsing run on the
+        worker threads. AsyncEquities overrides this to await the requests instead, so every
+        method built on it has an async counterpart with the same parsing.
+
+        keys replaces the tickers, e.g. with (ticker, month) pairs. If params returns None the
+        key's data is available locally and parse(key, None) is called without a request.'''
+
+        def fetch(k):
+            p = params(k)
+            return parse(k, None if p is None else self._get(p))
+
+        return combine(self._fetch_tickers(fetch, keys))
+
+    def _save(self, dataset: str, t: str, df: pd.DataFrame):
+        '''Private. Writes the frame of ticker t to the store, if there is one.'''
+        if self.store is not None:
+            self.store.write(dataset, t, df)
+
+    def _get_fundamentals(self, function: str, dataset: str, period: str = 'both', start: str = None,
+                          end: str = None, schema: parsing.Schema = parsing.FUNDAMENTALS,
+                          containers: dict = None) -> pd.DataFrame:
+        '''Private. The pipeline shared by the fundamentals endpoints.
+
+        Every ticker is fetched concurrently and each of its reports is parsed once, in the
+        worker, straight into typed columns. The ticker frames are concatenated once at the
+        end. If there is a store, each ticker's full set of reports is written to dataset.
+
+        Parameters
+        ----------
+        function : str
+            alpha vantage function, e.g. 'INCOME_STATEMENT'
+
+        dataset : str
+            store dataset the reports are written to, e.g. 'income_statement'
+
+        period : str, optional
+            'annual', 'quarterly' or 'both'. Default is 'both'
+
+        start, end : str, optional
+            inclusive fiscalDateEnding range
 
-    # TODO - add income statement
-    def get_income_statement(self):
-        pass
+        schema : parsing.Schema, optional
+            schema of the reports
+
+        containers : dict, optional
+            response key of each period, default is annualReports and quarterlyReports
+
+        Returns
+        -------
+        pandas.DataFrame indexed by (ticker, fiscalDateEnding) with a period column
+        '''
+        containers = containers or {'annual': 'annualReports', 'quarterly': 'quarterlyReports'}
+        if period != 'both' and period not in containers:
+            raise ValueError(f"period={period} is not a valid option. Valid options are {list(containers) + ['both']}")
+        wanted = list(containers) if period == 'both' else [period]
+
+        def parse(t, data):
+            # fail this ticker only, a throttle or error payload has no reports
+            if not any(c in data for c in containers.values()):
+                raise payload_error(data, f'no {function} reports returned for {t}',
+                                    {'function': function, 'symbol': t})
+
+            # the store keeps every report, so parse every period when there is one.
+            # the periods are parsed as one list of records, no per period frames to concat
+            periods = list(containers) if self.store is not None else wanted
+            reports = [data.get(containers[p], []) for p in periods]
+            df = parsing.parse_records([r for rs in reports for r in rs], schema)
+            df['period'] = np.repeat(np.array(periods, dtype=object), [len(rs) for rs in reports])
+            self._save(dataset, t, df)
+
+            if self.store is not None and period != 'both':
+                df = df[df['period'] == period]
+            return parsing.slice_dates(df, start, end)
+
+        def combine(results):
+            frames = [res.value for res in results if res.ok]
+            if not frames:
+                return pd.DataFrame()
+            return pd.concat(frames, keys=[res.key for res in results if res.ok],
+                             names=['ticker', schema.index.name])
+
+        return self._fetch_each(lambda t: {'function': function, 'symbol': t}, parse, combine)
+
+    def get_income_statement(self, period: str = 'both', start: str = None, end: str = None):
+        '''
+        Gets the income statements of every ticker.
+
+        Parameters
+        ----------
+        period : str, optional
+            'annual', 'quarterly' or 'both'. The default is 'both'.
+
+        start : str, optional
+            ISO date, reports with a fiscalDateEnding before start are dropped
+
+        end : str, optional
+            ISO date, reports with a fiscalDateEnding after end are dropped
+
+        Returns
+        -------
+        Dataframe indexed by (ticker, fiscalDateEnding) with a period column ('annual' or
+        'quarterly'), reportedCurrency and one float column per line item
+        '''
+        return self._get_fundamentals('INCOME_STATEMENT', 'income_statement', period, start, end)
 
-    # TODO - add get overview
     def get_overview(self):
-        pass
+        '''
+        Gets the company overview of every ticker, e.g. name, sector, market capitalization
+        and valuation ratios.
+
+        Returns
+        -------
+        Dataframe indexed by ticker, text fields are strings, LatestQuarter, DividendDate and
+        ExDividendDate are dates and every other field is a float
+        '''
 
-    # TODO - add balance sheet
-    def get_balance_sheet(self):
-        pass
+        def parse(t, data):
+            if 'Symbol' not in data:
+                raise payload_error(data, f'no overview returned for {t}', {'function': 'OVERVIEW', 'symbol': t})
+            return data
 
-    def get_cashflow(self):
+        def combine(results):
+            records = [res.value for res in results if res.ok]
+            if not records:
+                return pd.DataFrame()
+            # all tickers are parsed together, one record each
+            return parsing.parse_records(records, parsing.OVERVIEW)
 
-        return_obj = []
-        for t in self.tickers:
-            url = f'{self.base_url}function=CASH_FLOW&symbol={t}&apikey={self.api_key}'
-            r = requests.get(url)
-            data = r.json()
-            if 'annualReports' in data:
-                df = pd.DataFrame(data['annualReports'])
-                df['ticker'] = t
+        return self._fetch_each(lambda t: {'function': 'OVERVIEW', 'symbol': t}, parse, combine)
+
+    def get_balance_sheet(self, period: str = 'both', start: str = None, end: str = None):
+        '''
+        Gets the balance sheets of every ticker, see get_income_statement for the parameters.
 
-                return_obj.append(df)
+        Returns
+        -------
+        Dataframe indexed by (ticker, fiscalDateEnding) with a period column
+        '''
+        return self._get_fundamentals('BALANCE_SHEET', 'balance_sheet', period, start, end)
 
-            df = pd.concat(return_obj)
+    def get_cashflow(self, period: str = 'both', start: str = None, end: str = None):
+        '''
+        Gets the cash flow reports of every ticker, see get_income_statement for the parameters.
 
-            columns = df.columns[2:-1]
+        Returns
+        -------
+        Dataframe indexed by (ticker, fiscalDateEnding) with a period column
+        '''
+        return self._get_fundamentals('CASH_FLOW', 'cash_flow', period, start, end)
 
-            df[columns] = df[columns].apply(pd.to_numeric, errors='coerce')
+    def get_earnings(self, period: str = 'both', start: str = None, end: str = None):
+        '''
+        Gets the reported earnings per share of every ticker, see get_income_statement for
+        the parameters.
 
-            df.set_index('fiscalDateEnding', inplace=True)
+        Returns
+        -------
+        Dataframe indexed by (ticker, fiscalDateEnding) with a period column and reportedEPS.
+        Quarterly rows also have reportedDate, estimatedEPS, surprise and surprisePercentage.
+        '''
+        return self._get_fundamentals('EARNINGS', 'earnings', period, start, end, schema=parsing.EARNINGS,
+                                      containers={'annual': 'annualEarnings', 'quarterly': 'quarterlyEarnings'})
 
-        return df
+    def fundamentals_table(self, period: str = 'annual', overview: bool = True,
+                           prices: pd.Series = None) -> FundamentalsTable:
+        '''
+        Fetches the income statements, balance sheets and cash flows (and overviews) of every
+        ticker and builds a screener.FundamentalsTable of the latest reports.
+
+        Parameters
+        ----------
+        period : str, optional
+            reports used, 'annual' or 'quarterly'. The default is 'annual'.
+
+        overview : bool, optional
+            if True the overviews are fetched for the market capitalization. The default is True.
 
-    # TODO - add earnings
-    def get_earnings(self):
-        pass
+        prices : pandas.Series, optional
+            latest price per ticker, used for the market capitalization without overviews
 
-    def get_time_series_daily_adjusted(self, dataframe: bool = True, output_size: str = 'compact'):
+        Returns
+        -------
+        screener.FundamentalsTable
+        '''
+        return FundamentalsTable.from_frames(income=self.get_income_statement(period=period),
+                                             balance=self.get_balance_sheet(period=period),
+                                             cashflow=self.get_cashflow(period=period),
+                                             overview=self.get_overview() if overview else None,
+                                             prices=prices, period=period)
+
+    def get_time_series_daily_adjusted(self, dataframe: bool = True, output_size: str = 'compact',
+                                       incremental: bool = False, stream: bool = False, start: str = None,
+                                       end: str = None):
         '''
         Gets daily stock value data with a adjusted column, showing the value adjusted for stock splits
 
@@ -134,41 +435,365 @@ class Equities():
             Controls the size of the data returned.
             output_size = 'compact' returns the last 100 days of data
             output_size = 'full' returns all available data 
+
+        incremental : bool, optional
+            If true the full history of each ticker is kept in the history store and only the
+            last 100 bars are fetched to extend it, output_size is ignored. The full history is
+            downloaded again when the gap since the last stored bar is too big or when a split or
+            dividend changed the adjusted close. Requires dataframe=True. The default is False.
+
+        stream : bool, optional
+            If true each response is decoded bar by bar while it is downloaded, straight into
+            the dataframe columns, instead of decoding the whole json first. Cuts peak memory on
+            output_size='full'. Streamed responses are read from the response cache but not
+            written to it. Requires dataframe=True. The default is False.
+
+        start : str, optional
+            ISO date, bars before start are dropped while parsing. With stream=True the download
+            stops as soon as the bars fall before start.
+
+        end : str, optional
+            ISO date, bars after end are dropped while parsing.
             
         Returns
         -------
         Dataframe or List of Dictionaries    
 
+        The dataframe has a datetime64 index and the columns open, high, low, close,
+        adjusted_close, volume (int64), dividend_amount, split_coefficient and ticker.
+        Tickers are fetched concurrently, tickers that fail are left out of the result
+        and reported in last_fetch.
+
         '''
-        return_obj = []
-        for t in self.tickers:
-            url = f'{self.base_url}function=TIME_SERIES_DAILY_ADJUSTED&symbol={t}&outputsize={output_size}&apikey={self.api_key}'
-            r = requests.get(url)
-            data = r.json()
-
-            if dataframe:
-                df = pd.DataFrame(data['Time Series (Daily)']).T
-                columns = df.columns
-                df = _build_dataframe(df, columns=columns, set_index=False)
-                df['ticker'] = t
-                return_obj.append(df)
-            else:
-                return_obj.append(data)
+        if (incremental or stream) and not dataframe:
+            raise ValueError('incremental and streamed fetches require dataframe=True')
+
+        def combine(results):
+            return _combine_tickers(results, dataframe)
+
+        if incremental:
+            if self.history is None:
+                self.history = hist.HistoryStore()
+            self.last_refresh = {}
+
+            def fetch(t):
+                return parsing.slice_dates(self._refresh_daily_adjusted(t), start, end)
+            return combine(self._fetch_tickers(fetch))
+        elif stream:
+            def fetch(t):
+                return self._stream_daily_adjusted(t, output_size, start, end)
+            return combine(self._fetch_tickers(fetch))
+
+        def parse(t, data):
+            if not dataframe:
+                _check_daily_adjusted(t, data)
+                return data
+            return self._parse_daily_adjusted(t, data, output_size, start, end)
+
+        return self._fetch_each(lambda t: {'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': t,
+                                           'outputsize': output_size}, parse, combine)
+
+    def _parse_daily_adjusted(self, t, data, output_size, start=None, end=None):
+        '''Private. Checks and parses a daily adjusted response, a full one is saved to the store.'''
+        _check_daily_adjusted(t, data)
+        # only a full response is a complete history, store it before slicing
+        if output_size == 'full' and self.store is not None:
+            df = _daily_adjusted_frame(data)
+            self._save(hist.HistoryStore.dataset, t, df)
+            return parsing.slice_dates(df, start, end)
+        return _daily_adjusted_frame(data, start, end)
+
+    def get_price_panel(self, output_size: str = 'compact', float32: bool = False, start: str = None,
+                        end: str = None) -> PricePanel:
+        '''
+        Gets daily adjusted prices as a PricePanel, a compact alternative to the long frame
+        of get_time_series_daily_adjusted: the ticker of each row is not stored, selecting a
+        ticker is a slice and prices can be float32.
 
-        if dataframe:
-            return_df = pd.concat(return_obj)
-            return return_df
+        Parameters
+        ----------
+        output_size : str, optional
+            'compact' for the last 100 days or 'full' for all available data.
+            The default is 'compact'.
+
+        float32 : bool, optional
+            If true the prices, dividends and split coefficients are float32, volume stays
+            int64. Each ticker is converted as soon as it is parsed. The default is False.
+
+        start : str, optional
+            ISO date, bars before start are dropped while parsing.
+
+        end : str, optional
+            ISO date, bars after end are dropped while parsing.
+
+        Returns
+        -------
+        PricePanel of the tickers that were fetched, in the order of tickers. Tickers that
+        fail are left out and reported in last_fetch.
+        '''
+        def parse(t, data):
+            df = self._parse_daily_adjusted(t, data, output_size, start, end)
+            return downcast(df) if float32 else df
+
+        def combine(results):
+            return PricePanel.from_frames((res.key, res.value) for res in results if res.ok)
+
+        return self._fetch_each(lambda t: {'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': t,
+                                           'outputsize': output_size}, parse, combine)
+
+    def price_matrix(self, column: str = 'adjusted_close', **kwargs) -> pd.DataFrame:
+        '''
+        Gets daily adjusted prices and pivots them into a wide matrix, one row per date
+        (ascending) and one column per ticker, ready for alpha.analytics.
+
+        Parameters
+        ----------
+        column : str, optional
+            the price column to use. Default is 'adjusted_close'
+
+        **kwargs
+            passed to get_time_series_daily_adjusted, e.g. output_size='full' or start
+
+        Returns
+        -------
+        pandas.DataFrame
+        '''
+        return analytics.price_matrix(self.get_time_series_daily_adjusted(**kwargs), column=column)
+
+    def get_time_series_intraday(self, interval: str = '5min', months: list = None, adjusted: bool = True,
+                                 extended_hours: bool = True, output_size: str = 'compact', start: str = None,
+                                 end: str = None):
+        '''
+        Gets intraday bars of every ticker, either the latest bars or whole months.
+
+        Month slices of every ticker are fetched concurrently and stitched into one frame.
+        With a store, every past month is kept in the store's 'intraday_<interval>' dataset
+        and read from there next time. A month that isn't stored at interval but is stored
+        at a finer interval which divides it, e.g. 1min bars for 15min, is resampled locally
+        instead of downloaded.
+
+        Parameters
+        ----------
+        interval : str, optional
+            '1min', '5min', '15min', '30min' or '60min'. The default is '5min'.
+
+        months : list of str, optional
+            months to fetch, e.g. ['2023-11', '2023-12']. If None and both start and end are
+            set, every month between them is fetched, otherwise the latest bars are fetched.
+
+        adjusted : bool, optional
+            If true the bars are adjusted for splits and dividends. The default is True.
+
+        extended_hours : bool, optional
+            If true pre and post market bars are included. The default is True.
+
+        output_size : str, optional
+            'compact' for the latest 100 bars or 'full' for the latest 30 days, only used
+            without months. The default is 'compact'.
+
+        start, end : str, optional
+            ISO dates or timestamps, bars outside the range are dropped. An end date without a
+            time includes the bars of that whole day
+
+        Returns
+        -------
+        Dataframe indexed by bar timestamp with open, high, low, close, volume (int64) and
+        ticker columns, sorted by ticker then time. Slices that fail are left out of the
+        result and reported in last_fetch, keyed by (ticker, month).
+        '''
+        if interval not in resample.INTERVALS:
+            raise ValueError(f"interval={interval} is not a valid option. Valid options are {list(resample.INTERVALS)}")
+        if months is None and start is not None and end is not None:
+            months = [str(m) for m in pd.period_range(start, end, freq='M')]
+        dataset = _intraday_dataset(interval, adjusted, extended_hours)
+        # the current month is still growing, only past months are stored
+        current = pd.Timestamp.today().strftime('%Y-%m')
+        local = {}
+
+        def params(job):
+            t, month = job
+            if month is not None and month < current:
+                df = self._local_intraday(t, month, interval, adjusted, extended_hours)
+                if df is not None:
+                    local[job] = df
+                    return None
+            p = {'function': 'TIME_SERIES_INTRADAY', 'symbol': t, 'interval': interval,
+                 'adjusted': str(adjusted).lower(), 'extended_hours': str(extended_hours).lower(),
+                 'outputsize': output_size if month is None else 'full'}
+            if month is not None:
+                p['month'] = month
+            return p
+
+        def parse(job, data):
+            t, month = job
+            if data is None:
+                return local.pop(job)
+            container = f'Time Series ({interval})'
+            if container not in data:
+                raise payload_error(data, f'no {interval} intraday bars returned for {t} {month or ""}'.strip())
+            df = parsing.parse_time_series(data[container], parsing.INTRADAY)
+            if month is not None and month < current:
+                self._save(dataset, f'{t}_{month}', df)
+            return df
+
+        def combine(results):
+            return parsing.slice_dates(_stitch(results, self.tickers), start, _end_of_day(end))
+
+        jobs = [(t, m) for t in self.tickers for m in (months or [None])]
+        return self._fetch_each(params, parse, combine, keys=jobs)
+
+    def _local_intraday(self, t, month, interval, adjusted, extended_hours):
+        '''Private. Returns the stored bars of ticker t for month at interval, resampled from the
+        coarsest stored finer interval if needed, or None if nothing usable is stored.'''
+        if self.store is None:
+            return None
+        minutes = resample.INTERVALS[interval]
+        sources = sorted((i for i, m in resample.INTERVALS.items() if m <= minutes and minutes % m == 0),
+                         key=resample.INTERVALS.get, reverse=True)
+        for source in sources:
+            df = self.store.read(_intraday_dataset(source, adjusted, extended_hours), f'{t}_{month}', mmap=False)
+            if df is not None:
+                return df if source == interval else resample.resample_bars(df, interval)
+        return None
+
+    def get_time_series_weekly_adjusted(self, dataframe: bool = True, start: str = None, end: str = None):
+        '''
+        Gets weekly bars with an adjusted close and the dividends paid in the week.
+
+        A ticker whose daily history in the history store is current is resampled locally
+        instead of downloaded, labelled with the last trading day of each week like alpha
+        vantage does.
+
+        Parameters
+        ----------
+        dataframe : bool, optional
+            If true the function returns a dataframe. The default is True.
+
+        start, end : str, optional
+            ISO dates, bars outside the range are dropped
+
+        Returns
+        -------
+        Dataframe or List of Dictionaries, the dataframe has open, high, low, close,
+        adjusted_close, volume, dividend_amount and ticker columns
+        '''
+        return self._get_period_adjusted('W', parsing.WEEKLY_ADJUSTED, 'TIME_SERIES_WEEKLY_ADJUSTED',
+                                         dataframe, start, end)
+
+    def get_time_series_monthly_adjusted(self, dataframe: bool = True, start: str = None, end: str = None):
+        '''
+        Gets monthly bars with an adjusted close and the dividends paid in the month, see
+        get_time_series_weekly_adjusted.
+        '''
+        return self._get_period_adjusted('M', parsing.MONTHLY_ADJUSTED, 'TIME_SERIES_MONTHLY_ADJUSTED',
+                                         dataframe, start, end)
+
+    def _get_period_adjusted(self, rule, schema, function, dataframe, start, end):
+        '''Private. The weekly and monthly pipeline, bars are derived from the current daily
+        history where there is one and fetched otherwise.'''
+        local = {}
+
+        def params(t):
+            if dataframe and self.history is not None:
+                daily = self.history.load(t)
+                if daily is not None and not daily.empty and hist.is_current(daily):
+                    local[t] = daily
+                    return None
+            return {'function': function, 'symbol': t}
+
+        def parse(t, data):
+            if data is None:
+                # newest bar first, like the response
+                df = resample.resample_bars(local.pop(t), rule, label='last')[schema.columns].iloc[::-1]
+                return parsing.slice_dates(df, start, end)
+            if schema.container not in data:
+                raise payload_error(data, f'no {function} series returned for {t}', {'function': function, 'symbol': t})
+            return data if not dataframe else parsing.parse_time_series(data[schema.container], schema, start, end)
+
+        return self._fetch_each(params, parse, lambda results: _combine_tickers(results, dataframe, schema))
+
+    def _get_daily_adjusted(self, t, output_size):
+        '''Private. Returns the TIME_SERIES_DAILY_ADJUSTED json response of ticker t.'''
+        data = self._get({'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': t,
+                          'outputsize': output_size})
+        _check_daily_adjusted(t, data)
+        return data
+
+    def _stream_daily_adjusted(self, t, output_size, start=None, end=None):
+        '''Private. Streams the TIME_SERIES_DAILY_ADJUSTED response of ticker t into a dataframe,
+        skipping bars after end and stopping at the first bar before start.'''
+        params = {'function': 'TIME_SERIES_DAILY_ADJUSTED', 'symbol': t, 'outputsize': output_size}
+
+        data = self.transport.cached(params)
+        if data is None:
+            stop_before = None if start is None else pd.Timestamp(start).strftime('%Y-%m-%d')
+            skip_after = None if end is None else pd.Timestamp(end).strftime('%Y-%m-%d')
+
+            def decode(chunks):
+                return streaming.stream_time_series(chunks, parsing.DAILY_ADJUSTED, stop_before=stop_before,
+                                                    skip_after=skip_after)
+            try:
+                df = self.transport.stream(params, self.api_key, decode, variant=(stop_before, skip_after))
+                # the frame may be shared with an identical concurrent stream, the ticker column
+                # is added to a shallow copy
+                return df.copy(deep=False)
+            except streaming.ContainerNotFound as e:
+                if not is_throttle_payload(e.payload):
+                    raise payload_error(e.payload, f'no daily time series returned for {t}', params)
+            # throttled, go through the regular pipeline which backs off and retries
+            data = self._get_daily_adjusted(t, output_size)
+
+        return _daily_adjusted_frame(data, start, end)
+
+    def _refresh_daily_adjusted(self, t):
+        '''Private. Extends the stored history of t with the last 100 bars, or downloads the
+        full history if the stored history can't be extended. Returns the full history.'''
+        stored = self.history.load(t)
+        mode = 'full'
+
+        if stored is None or stored.empty or hist.gap_too_big(stored):
+            df = _daily_adjusted_frame(self._get_daily_adjusted(t, 'full'))
         else:
-            return return_obj
+            compact = _daily_adjusted_frame(self._get_daily_adjusted(t, 'compact'))
+            if hist.needs_full_refresh(stored, compact):
+                df = _daily_adjusted_frame(self._get_daily_adjusted(t, 'full'))
+            else:
+                df = hist.merge_tail(stored, compact)
+                mode = 'compact'
 
-    def cashflow_subplot(self, columns: list = ['operatingCashflow', 'netIncome', 'changeInCashAndCashEquivalents']):
-        # TODO add docstring
-        cf = self.get_cashflow()
-        
+        self.history.save(t, df)
+        self.last_refresh[t] = mode
+        return df
+
+    def cashflow_subplot(self, columns: list = ['operatingCashflow', 'netIncome', 'changeInCashAndCashEquivalents'],
+                         period: str = 'annual'):
+        '''
+        Builds a subplot per ticker of cash flow line items.
+
+        Parameters
+        ----------
+        columns : list, optional
+            cash flow line items to draw. The default is operatingCashflow, netIncome
+            and changeInCashAndCashEquivalents.
+
+        period : str, optional
+            'annual' or 'quarterly' reports. The default is 'annual'.
+
+        Returns
+        -------
+        Plotly figure
+        '''
+        return self._cashflow_figure(self.get_cashflow(period=period), columns)
+
+    def _cashflow_figure(self, cf: pd.DataFrame, columns: list):
+        '''Private. Builds the cashflow_subplot figure from the get_cashflow frame.'''
+        colors = subplots.default_colors()
         subplot_data = []
+        # the frame is indexed by ticker first, so each ticker is a cheap index lookup
+        tickers = cf.index.unique('ticker') if not cf.empty else []
         for t in self.tickers:
-            df = cf[cf['ticker']==t]
-            if not df.empty:               
+            if t in tickers:
+                df = cf.xs(t, level='ticker')
                 subplot = {'subplot': [],
                            'title': t}
                 
@@ -177,7 +802,7 @@ class Equities():
                     series = series.rename('value')
                     subplot['subplot'].append({'series':series,
                                                'legend-name':v,
-                                               'line-color':_colors[i],
+                                               'line-color':colors[i],
                                                },
                                               )
                 subplot_data.append(subplot)
@@ -187,7 +812,9 @@ class Equities():
         return fig
         
 
-    def daily_adjusted_subplot(self, series_type: str = 'daily_adjusted', output_size: str = 'compact', start_end_dates=()):
+    def daily_adjusted_subplot(self, series_type: str = 'daily_adjusted', output_size: str = 'compact', start_end_dates=(),
+                               incremental: bool = False, stream: bool = False,
+                               webgl_threshold: int = None, max_points: int = None, indicators: list = None):
         
         '''
         Uses the get_time_series_daily_adjusted method to generate data for stocks and create a 
@@ -205,8 +832,27 @@ class Equities():
            default is 'compact'
         
         start_end_dates : Tuple, optional
-            for each series selects sub selects between the start date and the end date.
-            First tuple element is start date, second is end date().
+            for each series selects sub selects between the start date and the end date, both
+            inclusive. First tuple element is start date, second is end date(). Bars outside
+            the range are dropped while the responses are parsed.
+
+        incremental : bool, optional
+            if True only new bars are fetched to extend the locally stored history,
+            see get_time_series_daily_adjusted
+
+        stream : bool, optional
+            if True responses are decoded while they download and the download stops at
+            start_end_dates[0], see get_time_series_daily_adjusted
+
+        webgl_threshold, max_points : int, optional
+            passed to subplots.build_subplots, series longer than webgl_threshold are drawn
+            with WebGL and series longer than max_points are downsampled
+
+        indicators : list, optional
+            indicators computed with alpha.indicators for all tickers at once, e.g.
+            ['sma_50', 'bollinger', 'rsi']. Moving averages and bollinger bands are drawn
+            over the price, rsi, macd and atr get their own subplot after each ticker.
+            Default is None
 
         Returns
         -------
@@ -216,34 +862,48 @@ class Equities():
         '''
 
         # TODO add docstring
-        price = self.get_time_series_daily_adjusted(output_size=output_size)
-
-        if start_end_dates:
-            price = price[(price.index > start_end_dates[0]) &
-                          (price.index <= start_end_dates[1])]
+        start, end = start_end_dates if start_end_dates else (None, None)
+        price = self.get_time_series_daily_adjusted(output_size=output_size, incremental=incremental, stream=stream,
+                                                    start=start, end=end)
 
-        if series_type == 'daily_adjusted':
-            price_df = price[['5. adjusted close', 'ticker']]
-            price_df = price_df.rename(columns={"5. adjusted close": "value"})
-
-        else:
-            price_df = price[['4. close', 'ticker']]
-            price_df = price_df.rename(columns={"4. close": "value"})
+        return self._daily_adjusted_figure(price, series_type, indicators, webgl_threshold, max_points)
 
-        price_df = price_df.rename(columns={"1. open": "value"})
+    def _daily_adjusted_figure(self, price: pd.DataFrame, series_type: str = 'daily_adjusted',
+                               indicators: list = None, webgl_threshold: int = None, max_points: int = None):
+        '''Private. Builds the daily_adjusted_subplot figure from the get_time_series_daily_adjusted frame.'''
+        value = 'adjusted_close' if series_type == 'daily_adjusted' else 'close'
+        if indicators:
+            price = ind.compute(price, indicators, price=value)
 
+        colors = subplots.default_colors()
         subplot_data = []
+        # split the frame by ticker once instead of filtering it for every ticker
+        by_ticker = dict(tuple(price.groupby('ticker', sort=False)))
         for t in self.tickers:
-            # each subplot will have one series which is the equity
-            series_df = price_df[price_df['ticker'] == t]
-            subplot = {'subplot': [{'series': series_df,
-                                    'legend-name': t,
-                                    'max-trendline': {},
-                                    'min-trendline': {}}],
-                       'title': t}
-            subplot_data.append(subplot)
+            if t not in by_ticker:
+                continue
+            price_df = by_ticker[t]
 
-        fig = subplots.build_subplots(subplot_data)
+            # each subplot will have one series which is the equity
+            series = [{'series': price_df[value].rename('value'),
+                       'legend-name': t,
+                       'max-trendline': {},
+                       'min-trendline': {}}]
+            oscillators = []
+            for spec in indicators or []:
+                columns = ind.output_columns(spec)
+                lines = [{'series': price_df[c], 'legend-name': f'{t} {c}',
+                          'line-color': colors[(j + 1) % len(colors)]}
+                         for j, c in enumerate(columns) if c != 'macd_hist']
+                if ind.parse_spec(spec)[0] in ind.OVERLAYS:
+                    series.extend(lines)
+                else:
+                    oscillators.append({'subplot': lines, 'title': f'{t} {spec}'})
+
+            subplot_data.append({'subplot': series, 'title': t})
+            subplot_data.extend(oscillators)
+
+        fig = subplots.build_subplots(subplot_data, webgl_threshold=webgl_threshold, max_points=max_points)
         return fig
 
 class Economics:
@@ -255,8 +915,31 @@ class Economics:
     ...
     Attributes
     ----------
-    api_key : str
-        alpha_vantage api key
+    api_key : str or list of str
+        alpha_vantage api key, or several keys to rotate across with a quota.QuotaManager
+        (75 requests per minute each) when no transport is passed
+
+    cache : ResponseCache
+        response cache shared with other Equities or Economics objects, None disables caching
+
+    timeout : float
+        seconds to wait for a single response
+
+    rate_limiter : RateLimiter
+        token bucket limiter for the alpha vantage quotas
+
+    transport : Transport
+        pooled request pipeline, see Equities. If passed, cache, timeout and rate_limiter are ignored.
+
+    store : ColumnStore
+        columnar local store, if set every series is saved to its 'economic' dataset with one
+        partition per query, e.g. TREASURY_YIELD-monthly-10year
+
+    max_workers : int
+        number of indicators macro_panel fetches concurrently
+
+    last_fetch : list
+        list of scheduler.FetchResult from the most recent macro_panel call
     
     Methods
     -------
@@ -283,14 +966,56 @@ class Economics:
         
     real_gdp(interval: str = 'quarterly', dataframe: bool = True)
         returns either a dataframe or a dictionary of real gdp data 
+
+    macro_panel(specs: list, freq: str = 'MS', fill: str = 'ffill')
+        fetches several indicators concurrently and returns one wide dataframe aligned on a
+        common date index
+
+    Every method also takes start and end ISO dates, observations outside the range are
+    dropped while the response is parsed.
     
     """
 
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache: ResponseCache = None, timeout: float = 30,
+                 rate_limiter: RateLimiter = None, transport: Transport = None, store: ColumnStore = None,
+                 max_workers: int = 8):
         self.api_key = api_key
-        self.base_url = 'https://www.alphavantage.co/query?'
+        self.store = store
+        self.max_workers = max_workers
+        if transport is None:
+            quota = quota_for(api_key)
+            if rate_limiter is None and quota is None:
+                rate_limiter = RateLimiter()
+            transport = Transport(cache=cache, timeout=timeout, pool_maxsize=max(max_workers, 10),
+                                  rate_limiter=rate_limiter, quota=quota)
+        self.transport = transport
+        self.last_fetch = []
+
+    def _get(self, params: dict):
+        '''Private. Returns the json response for params through the shared transport.'''
+        return self.transport.get_json(params, self.api_key)
+
+    def _fetch(self, params: dict, dataframe: bool = True, start: str = None, end: str = None):
+        '''Private. Fetches an economic series and returns it as a dataframe between start and end,
+        or the raw response if dataframe is False. Series are saved whole to the store's 'economic'
+        dataset if there is one.'''
+        return self._parse(params, self._get(params), dataframe, start, end)
+
+    def _parse(self, params: dict, data: dict, dataframe: bool = True, start: str = None, end: str = None):
+        '''Private. Parses the response of an economic series, see _fetch.'''
+        if not dataframe:
+            return data
+        if 'data' not in data:
+            raise payload_error(data, f"no {params['function']} data returned", params)
+
+        if self.store is None:
+            return parsing.parse_records(data['data'], parsing.ECONOMIC, start, end)
 
-    def retail_sales(self, dataframe: bool = True):
+        df = _build_dataframe(data['data'])
+        self.store.write('economic', partition_name(params), df)
+        return parsing.slice_dates(df, start, end)
+
+    def retail_sales(self, dataframe: bool = True, start: str = None, end: str = None):
         ''' retrieves monthly US retail sales data via alphavantage 
         
         Parameters
@@ -298,24 +1023,20 @@ class Economics:
         dataframe : bool, optional
             if True the method will return a dataframe
             if False the method will return a dictionary
-            
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         Dictionary or Dataframe of US monthly US retails sales data.
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=RETAIL_SALES&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
-
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
+        return self._fetch({'function': 'RETAIL_SALES'}, dataframe, start, end)
 
-    def inflation(self, dataframe: bool = True):
+    def inflation(self, dataframe: bool = True, start: str = None, end: str = None):
         ''' retrieves monthly US inflation data via alphavantage 
         
         Parameters
@@ -323,24 +1044,20 @@ class Economics:
         dataframe : bool, optional | default = True
             if True the method will return a dataframe
             if False the method will return a dictionary
-            
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         Dictionary or Dataframe of US monthly US inflation data.
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=INFLATION&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
+        return self._fetch({'function': 'INFLATION'}, dataframe, start, end)
 
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
-
-    def cpi(self, dataframe: bool = True, interval: str = 'monthly'):
+    def cpi(self, dataframe: bool = True, interval: str = 'monthly', start: str = None, end: str = None):
         ''' retrieves monthly or semiannual consumer price index (CPI) for the US 
         
         Parameters
@@ -352,24 +1069,20 @@ class Economics:
         interval : str, optional | default = 'monthly'
             if 'monthly' returns monthly cpi data
             if 'semiannual' returns data for twice a year
-            
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         Dictionary or Dataframe of US monthly US inflation data.
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=CPI&interval={interval}&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
+        return self._fetch({'function': 'CPI', 'interval': interval}, dataframe, start, end)
 
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
-
-    def treasury_yield(self, interval: str = 'monthly', maturity: str = '10year', dataframe: bool = True):
+    def treasury_yield(self, interval: str = 'monthly', maturity: str = '10year', dataframe: bool = True, start: str = None, end: str = None):
         ''' retrieves monthly, daily, or weekly US yield given maturity of 3 months or 2,5,7,10,30 years 
         
         Parameters
@@ -389,94 +1102,78 @@ class Economics:
             '5year' 
             '10year'
             '30year'
-            
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         Dictionary or Dataframe of treasury yield data.
         '''
 
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=TREASURY_YIELD&interval={interval}&maturity={maturity}&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
+        return self._fetch({'function': 'TREASURY_YIELD', 'interval': interval, 'maturity': maturity}, dataframe, start, end)
 
-    def consumer_sentiment(self, dataframe: bool = True):
+    def consumer_sentiment(self, dataframe: bool = True, start: str = None, end: str = None):
         ''' TODO - Update docstring
         Parameters
         ----------
         dataframe : bool, optional
             DESCRIPTION. The default is True.
-    
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         None.
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=CONSUMER_SENTIMENT&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
-
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
+        return self._fetch({'function': 'CONSUMER_SENTIMENT'}, dataframe, start, end)
 
-    def nonfarm_payroll(self, dataframe: bool = True):
+    def nonfarm_payroll(self, dataframe: bool = True, start: str = None, end: str = None):
         ''' TODO - Update docstring
         Parameters
         ----------
         dataframe : bool, optional
             DESCRIPTION. The default is True.
-    
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         None.
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=NONFARM_PAYROLL&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
-
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
+        return self._fetch({'function': 'NONFARM_PAYROLL'}, dataframe, start, end)
 
-    def federal_funds_rate(self, interval: str = 'monthly', dataframe: bool = True):
+    def federal_funds_rate(self, interval: str = 'monthly', dataframe: bool = True, start: str = None, end: str = None):
         ''' TODO - Update docstring
         Parameters
         ----------
         dataframe : bool, optional
             DESCRIPTION. The default is True.
-    
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         -------
         None.
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=FEDERAL_FUNDS_RATE&interval={interval}&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
-
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
+        return self._fetch({'function': 'FEDERAL_FUNDS_RATE', 'interval': interval}, dataframe, start, end)
 
-    def real_gdp(self, interval: str = 'quarterly', dataframe: bool = True):
+    def real_gdp(self, interval: str = 'quarterly', dataframe: bool = True, start: str = None, end: str = None):
         '''
         Retrieves real quarterly or annual gdp using alphavantage api.
         
@@ -487,27 +1184,111 @@ class Economics:
          
         dataframe: bool, optional
             if True return a pandas dataframe else return a dictionary
-         
-        
+
+        start : str, optional
+            ISO date, observations before start are dropped while parsing
+
+        end : str, optional
+            ISO date, observations after end are dropped while parsing
+
         Returns
         --------
         dictionary or dataframe of real gdp data
         
         '''
-        # build url and call request
-        # https://www.alphavantage.co/query?function=REAL_GDP&interval=annual&apikey=demo'
-        url = f'{self.base_url}function=REAL_GDP&interval={interval}&apikey={self.api_key}'
-        r = requests.get(url)
-        data = r.json()
+        return self._fetch({'function': 'REAL_GDP', 'interval': interval}, dataframe, start, end)
 
-        if dataframe:
-            df = _build_dataframe(data['data'])
-            return df
-        else:
-            return data
+
+    def macro_panel(self, specs: list, freq: str = 'MS', fill: str = 'ffill', agg: str = 'last',
+                    start: str = None, end: str = None):
+        '''
+        Fetches several economic indicators concurrently and aligns them into one wide dataframe.
+
+        Parameters
+        ----------
+        specs : list
+            indicators to fetch. Each item is either the name of an Economics method, e.g. 'cpi',
+            or a dict with the method name under 'indicator', an optional column 'name' and the
+            method's keyword arguments, e.g.
+            {'indicator': 'treasury_yield', 'maturity': '2year', 'name': 'Two Year Yield'}.
+            The default column name is the method name followed by its argument values,
+            e.g. treasury_yield_2year.
+
+        freq : str, optional
+            pandas frequency every series is resampled to, e.g. 'D', 'W', 'MS' or 'QS'. None keeps
+            the union of the original dates. Default is 'MS' (start of month).
+
+        fill : str, optional
+            how gaps left by lower frequency series are filled: 'ffill' carries the last observation
+            forward, 'interpolate' interpolates linearly in time, None leaves NaN. Default is 'ffill'.
+
+        agg : str, optional
+            how a higher frequency series is aggregated when resampled to freq, e.g. 'last' or 'mean'.
+            Default is 'last'.
+
+        start : str, optional
+            ISO date, the panel starts at start
+
+        end : str, optional
+            ISO date, the panel ends at end
+
+        Returns
+        -------
+        Dataframe with one column per indicator on a common date index. Indicators that fail
+        are left out and reported in last_fetch.
+        '''
+        jobs = self._panel_jobs(specs)
+
+        def fetch(name):
+            indicator, kwargs = jobs[name]
+            # no start here, so the last observation before start can be carried forward
+            return getattr(self, indicator)(end=end, **kwargs)['value']
+
+        results = fetch_concurrent(fetch, jobs, max_workers=self.max_workers)
+        self.last_fetch = results
+        return self._build_panel(results, freq, fill, agg, start, end)
+
+    @staticmethod
+    def _panel_jobs(specs: list) -> dict:
+        '''Private. Returns {column name: (indicator, kwargs)} for the macro_panel specs.'''
+        jobs = {}
+        for spec in specs:
+            spec = {'indicator': spec} if isinstance(spec, str) else dict(spec)
+            indicator = spec.pop('indicator')
+            if indicator not in _MACRO_INDICATORS:
+                raise ValueError(f'indicator={indicator} is not a valid option. Valid options are {_MACRO_INDICATORS}')
+            name = spec.pop('name', '_'.join([indicator] + [str(v) for v in spec.values()]))
+            if name in jobs:
+                raise ValueError(f'duplicate indicator column {name}, pass a name in the spec')
+            jobs[name] = (indicator, spec)
+        return jobs
+
+    @staticmethod
+    def _build_panel(results: list, freq: str, fill: str, agg: str, start: str = None, end: str = None):
+        '''Private. Aligns the fetched series of macro_panel into one wide dataframe.'''
+        columns = {}
+        for res in results:
+            if not res.ok:
+                continue
+            series = res.value.sort_index()
+            series = series[~series.index.duplicated(keep='last')]
+            if freq is not None:
+                series = series.resample(freq).agg(agg)
+            columns[res.key] = series
+
+        panel = pd.DataFrame(columns)
+        panel.index.name = 'date'
+        if fill == 'ffill':
+            panel = panel.ffill()
+        elif fill == 'interpolate':
+            panel = panel.interpolate(method='time', limit_area='inside')
+        elif fill is not None:
+            raise ValueError(f"fill={fill} is not a valid option. Valid options are ['ffill', 'interpolate', None]")
+
+        return parsing.slice_dates(panel, start, end)
 
 
 if __name__ == "__main__":
     
     print(__name__)
-    
\ No newline at end of file
+    
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Incrementally updated covariance and correlation matrices of ticker returns.
+
+Recomputing an N x N covariance over a rolling window at every date costs O(N^2 W).
+RollingCovariance instead keeps running sums of the returns and of their outer products
+and updates them one bar at a time, so each new day costs O(N^2) whatever the window.
+Both a fixed window and an exponentially weighted window are supported.
+
+Missing returns (a ticker that did not trade, or has a shorter history) are handled
+pairwise: every pair of tickers is estimated over the bars where both have a return.
+
+    cov = RollingCovariance(rets.columns, halflife=63)
+    cov.update_many(analytics.returns(prices))
+    ...
+    cov.update(todays_returns)
+    sigma = cov.shrunk()
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class RollingCovariance:
+    '''
+    Running covariance matrix of returns over a fixed or exponentially weighted window.
+
+    Parameters
+    ----------
+    columns : list
+        ticker of each column, rows passed as Series are aligned to these
+
+    window : int, optional
+        number of bars in a fixed window. Exactly one of window and halflife is required.
+
+    halflife : float, optional
+        half life in bars of an exponentially weighted window
+
+    min_periods : int, optional
+        pairs estimated over fewer bars (or less total weight) are NaN. Default is 2
+    '''
+
+    def __init__(self, columns: Iterable, window: Optional[int] = None, halflife: Optional[float] = None,
+                 min_periods: int = 2):
+        if (window is None) == (halflife is None):
+            raise ValueError('exactly one of window and halflife is required')
+        self.columns = pd.Index(columns)
+        self.window = window
+        self.halflife = halflife
+        self.decay = 1.0 if halflife is None else 0.5 ** (1.0 / halflife)
+        self.min_periods = min_periods
+        self.last = None
+        self.count = 0
+
+        n = len(self.columns)
+        # pairwise sums, entry [i, j] only counts bars where both i and j have a return:
+        # number (or weight) of bars, sum of x_i, sum of x_i^2, sum of x_i * x_j and
+        # sum of (x_i * x_j)^2, the last one is used for the shrinkage intensity
+        self._sums = [np.zeros((n, n)) for _ in range(5)]
+        if window is not None:
+            self._buffer = np.full((window, n), np.nan)
+
+    def _row(self, row) -> np.ndarray:
+        if isinstance(row, pd.Series):
+            row = row.reindex(self.columns)
+        row = np.asarray(row, dtype='float64')
+        if row.shape != (len(self.columns),):
+            raise ValueError(f'expected {len(self.columns)} returns, got shape {row.shape}')
+        return row
+
+    @staticmethod
+    def _block(rows: np.ndarray, weights: Optional[np.ndarray] = None) -> list:
+        # the pairwise sums of a block of rows as matrix products, weights scale each row
+        mask = (~np.isnan(rows)).astype('float64')
+        x = np.where(mask > 0, rows, 0.0)
+        xx = x * x
+        w = np.ones(len(rows)) if weights is None else weights
+        mw, xw, xxw = mask * w[:, None], x * w[:, None], xx * w[:, None]
+        return [mw.T @ mask, xw.T @ mask, xxw.T @ mask, xw.T @ x, xxw.T @ xx]
+
+    def update(self, row, date=None):
+        '''
+        Adds one bar of returns, dropping the oldest bar of a fixed window. O(N^2).
+
+        Parameters
+        ----------
+        row : pandas.Series or array
+            returns of the bar, a Series is aligned to columns by ticker, NaN is a missing return
+
+        date : optional
+            label of the bar, kept in last
+        '''
+        row = self._row(row)
+
+        if self.window is None:
+            for s in self._sums:
+                s *= self.decay
+        else:
+            pos = self.count % self.window
+            if self.count >= self.window:
+                for s, d in zip(self._sums, self._block(self._buffer[pos:pos + 1])):
+                    s -= d
+            self._buffer[pos] = row
+
+        for s, d in zip(self._sums, self._block(row[None, :])):
+            s += d
+        self.count += 1
+        self.last = date
+
+        if self.window is not None and self.count % self.window == 0:
+            # adding and subtracting accumulates rounding error, rebuild from the buffer
+            # once per window, which keeps the amortized cost per bar at O(N^2)
+            self._sums = self._block(self._buffer)
+
+    def update_many(self, rets: pd.DataFrame):
+        '''
+        Adds a block of bars, oldest first, e.g. the returns matrix of analytics.returns.
+        The block is added with matrix products rather than one bar at a time.
+        '''
+        rets = rets.reindex(columns=self.columns)
+        rows = rets.to_numpy(dtype='float64')
+        if len(rows) == 0:
+            return
+
+        if self.window is None:
+            weights = self.decay ** np.arange(len(rows) - 1, -1, -1, dtype='float64')
+            scale = self.decay ** len(rows)
+            self._sums = [s * scale + b for s, b in zip(self._sums, self._block(rows, weights))]
+            self.count += len(rows)
+        elif self.count == 0 or len(rows) >= self.window:
+            # only the last window bars matter, they fill the buffer from the start
+            tail = rows[-self.window:]
+            self._buffer[:] = np.nan
+            self._buffer[:len(tail)] = tail
+            self.count = len(tail)
+            self._sums = self._block(tail)
+        else:
+            for row in rows:
+                self.update(row)
+        self.last = rets.index[-1]
+
+    @property
+    def periods(self) -> pd.DataFrame:
+        '''Number (or total weight) of bars behind each pair.'''
+        return pd.DataFrame(self._sums[0], index=self.columns, columns=self.columns)
+
+    def _cov(self) -> np.ndarray:
+        n, sx, _, sxy, _ = self._sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the exponentially weighted covariance is not bias corrected
+            cov = (sxy - sx * sx.T / n) / (n if self.window is None else n - 1)
+        cov[n < self.min_periods] = np.nan
+        return cov
+
+    def covariance(self) -> pd.DataFrame:
+        '''The current covariance matrix.'''
+        return pd.DataFrame(self._cov(), index=self.columns, columns=self.columns)
+
+    def correlation(self) -> pd.DataFrame:
+        '''The current correlation matrix, each pair uses the variances over its own bars.'''
+        n, sx, sx2, sxy, _ = self._sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # var_i[i, j] is the variance of i over the bars where j also has a return
+            var_i = sx2 - sx ** 2 / n
+            corr = (sxy - sx * sx.T / n) / np.sqrt(var_i * var_i.T)
+        corr[n < self.min_periods] = np.nan
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+    def shrinkage_intensity(self) -> float:
+        '''
+        Ledoit-Wolf intensity for shrinking the covariance towards a scaled identity,
+        between 0 (sample covariance) and 1 (target).
+
+        The variance of the sample estimate is taken from the running sums of squared
+        outer products, using second moments rather than centered ones, which is accurate
+        for daily returns whose mean is small next to their volatility.
+        '''
+        cov = np.nan_to_num(self._cov())
+        n, _, _, sxy, sxy2 = self._sums
+        target = np.trace(cov) / len(cov) * np.eye(len(cov))
+        d2 = np.sum((cov - target) ** 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b2 = np.nansum((sxy2 / n - (sxy / n) ** 2) / n)
+        if d2 == 0:
+            return 1.0
+        return float(min(max(b2, 0.0), d2) / d2)
+
+    def shrunk(self, intensity: Optional[float] = None) -> pd.DataFrame:
+        '''
+        The covariance shrunk towards a scaled identity, (1 - a) * cov + a * mean_var * I.
+        A shrunk matrix is well conditioned even with more tickers than bars.
+
+        Parameters
+        ----------
+        intensity : float, optional
+            shrinkage between 0 and 1, default is the Ledoit-Wolf estimate
+        '''
+        a = self.shrinkage_intensity() if intensity is None else intensity
+        cov = np.nan_to_num(self._cov())
+        target = np.trace(cov) / len(cov) * np.eye(len(cov))
+        return pd.DataFrame((1 - a) * cov + a * target, index=self.columns, columns=self.columns)
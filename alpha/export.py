@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Offline export of many figures to html, json and static image files.
+
+Figures are rendered in a pool of worker processes, one figure per task, so a day of
+report figures is written with every core. A figure can also be passed as a callable that
+builds it (e.g. functools.partial of a module level function), then building the figure
+runs in the worker too.
+
+html files share one plotly.js bundle written next to them instead of each inlining the
+~4 MB library. Nothing here touches plotly's global state (plotly.io.renderers or
+templates), files are written with the plotly.io writers directly, so exports can run
+next to other plotting code and in several processes at once:
+
+    figures = {t: functools.partial(report_figure, t) for t in tickers}
+    report = export.export_figures(figures, 'reports/2024-06-03', formats=('html', 'png'))
+
+png, jpeg, webp, svg and pdf need kaleido, an optional dependency: pip install alpha[export]
+"""
+
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from alpha.store import safe_name
+
+
+IMAGE_FORMATS = ('png', 'jpeg', 'webp', 'svg', 'pdf')
+FORMATS = ('html', 'json') + IMAGE_FORMATS
+
+# how html files get plotly.js, see export_figures
+PLOTLYJS_OPTIONS = ('shared', 'cdn', 'inline')
+
+
+def write_plotlyjs(directory: str) -> str:
+    '''
+    Writes the plotly.js bundle to directory, once per plotly.js version, and returns its
+    file name for include_plotlyjs of plotly.io.write_html.
+    '''
+    from plotly import offline
+
+    name = f'plotly-{offline.get_plotlyjs_version()}.min.js'
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        # write to a temporary file first, a reader never sees half a bundle
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(offline.get_plotlyjs())
+        os.replace(tmp, path)
+    return name
+
+
+def _render(name: str, figure, directory: str, formats: list, include_plotlyjs, width: Optional[int],
+            height: Optional[int], scale: float) -> list:
+    '''Writes figure in every format, returns a row per format. Runs in the workers.'''
+    import plotly.io as pio
+
+    rows = []
+    try:
+        if callable(figure):
+            figure = figure()
+        # a plain dict is written as is, without validating it again or applying a template
+        fig = figure.to_dict() if hasattr(figure, 'to_dict') else figure
+    except Exception as e:
+        return [{'name': name, 'format': fmt, 'path': None, 'seconds': 0.0, 'error': repr(e)} for fmt in formats]
+
+    for fmt in formats:
+        path = os.path.join(directory, f'{safe_name(name)}.{fmt}')
+        start = time.perf_counter()
+        try:
+            if fmt == 'html':
+                pio.write_html(fig, path, include_plotlyjs=include_plotlyjs, full_html=True, validate=False,
+                               auto_open=False)
+            elif fmt == 'json':
+                pio.write_json(fig, path, validate=False)
+            else:
+                pio.write_image(fig, path, format=fmt, width=width, height=height, scale=scale, validate=False)
+            error = None
+        except Exception as e:
+            error = repr(e)
+        rows.append({'name': name, 'format': fmt, 'path': path if error is None else None,
+                     'seconds': time.perf_counter() - start, 'error': error})
+    return rows
+
+
+def export_figures(figures: dict, directory: str, formats: Iterable[str] = ('html',), processes: Optional[int] = None,
+                   plotlyjs: str = 'shared', width: Optional[int] = None, height: Optional[int] = None,
+                   scale: float = 1, progress: Optional[Callable] = None) -> pd.DataFrame:
+    '''
+    Writes every figure to directory as <name>.<format>, rendered in parallel processes.
+
+    Parameters
+    ----------
+    figures : dict
+        name -> plotly figure, figure dict, or a picklable callable returning either. Callables
+        are called in the workers
+
+    directory : str
+        output directory, created if missing
+
+    formats : str or iterable of str, optional
+        formats of FORMATS to write every figure in, at least one. Default is ('html',)
+
+    processes : int, optional
+        worker processes, default is the cpu count. 0 renders every figure in this process
+
+    plotlyjs : str, optional
+        how html files load plotly.js: 'shared' writes one bundle into directory that every
+        file references, 'cdn' references the plotly cdn (the files need a network
+        connection to open) and 'inline' embeds the bundle in every file. Default is 'shared'
+
+    width, height : int, optional
+        pixel size of static images, default is the figure's layout size
+
+    scale : float, optional
+        scale factor of static images, e.g. 2 for high dpi png. Default is 1
+
+    progress : callable, optional
+        called with the rows of every figure as it is written
+
+    Returns
+    -------
+    pandas.DataFrame with a row per figure and format: name, format, path, seconds and error.
+    A figure that fails is reported there and the rest are still written.
+
+    Raises
+    ------
+    ValueError for no or an unknown format or plotlyjs option, or figure names that map to the
+    same file name (e.g. 'BRK/B' and 'BRK_B'). ImportError if an image format is asked for and
+    kaleido is not installed
+    '''
+    # every check runs before anything is rendered, a single format may be passed as a string
+    formats = list(dict.fromkeys([formats] if isinstance(formats, str) else formats))
+    if not formats:
+        raise ValueError(f'no formats to export. Valid options are {list(FORMATS)}')
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        raise ValueError(f'unknown formats {unknown}. Valid options are {list(FORMATS)}')
+    if plotlyjs not in PLOTLYJS_OPTIONS:
+        raise ValueError(f'plotlyjs={plotlyjs} is not a valid option. Valid options are {list(PLOTLYJS_OPTIONS)}')
+    files = {}
+    for name in figures:
+        # compared case-insensitively, 'IBM' and 'ibm' are one file on some file systems
+        files.setdefault(safe_name(name).casefold(), []).append(name)
+    clashes = [names for names in files.values() if len(names) > 1]
+    if clashes:
+        raise ValueError(f'figure names {clashes} would be written to the same file, rename them')
+    images = [f for f in formats if f in IMAGE_FORMATS]
+    if images and importlib.util.find_spec('kaleido') is None:
+        raise ImportError(f'exporting {images} requires kaleido, install it with pip install alpha[export]')
+
+    os.makedirs(directory, exist_ok=True)
+    include_plotlyjs = {'shared': None, 'cdn': 'cdn', 'inline': True}[plotlyjs]
+    if 'html' in formats and plotlyjs == 'shared':
+        include_plotlyjs = write_plotlyjs(directory)
+    options = (directory, formats, include_plotlyjs, width, height, scale)
+
+    done = {}
+
+    def finish(name, figure_rows):
+        done[name] = figure_rows
+        if progress is not None:
+            progress(figure_rows)
+
+    processes = os.cpu_count() if processes is None else processes
+    if processes == 0 or len(figures) <= 1:
+        for name, figure in figures.items():
+            finish(name, _render(name, figure, *options))
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(figures))) as pool:
+            # figures are sent as dicts, the workers don't rebuild and revalidate them
+            futures = {pool.submit(_render, name, figure if callable(figure) or isinstance(figure, dict)
+                                   else figure.to_dict(), *options): name
+                       for name, figure in figures.items()}
+            for future in as_completed(futures):
+                try:
+                    finish(futures[future], future.result())
+                except Exception as e:
+                    # e.g. a callable that can't be pickled or a worker that died
+                    name = futures[future]
+                    finish(name, [{'name': name, 'format': fmt, 'path': None, 'seconds': 0.0, 'error': repr(e)}
+                                  for fmt in formats])
+
+    rows = [row for name in figures for row in done[name]]
+    return pd.DataFrame(rows, columns=['name', 'format', 'path', 'seconds', 'error'])
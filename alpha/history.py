@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Local price history used for incremental refreshes of daily adjusted prices.
+
+A full TIME_SERIES_DAILY_ADJUSTED response holds 20+ years of bars, while a compact
+response holds the last 100. Once a symbol's history is stored locally, a refresh only
+needs the compact response: its bars are appended to the stored history. A full
+download is only needed when the gap since the last stored bar is larger than a compact
+response covers, or when a split or dividend rewrote the adjusted close of earlier bars.
+"""
+
+import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from alpha.store import ColumnStore
+
+
+# number of bars alpha vantage returns for outputsize=compact
+COMPACT_BARS = 100
+
+ADJUSTED_CLOSE = 'adjusted_close'
+DIVIDEND = 'dividend_amount'
+SPLIT = 'split_coefficient'
+
+
+class HistoryStore:
+    '''
+    Keeps the daily adjusted price history of each symbol in the 'daily_adjusted' dataset
+    of a ColumnStore.
+
+    Parameters
+    ----------
+    root : str, optional
+        directory of the column store, ignored if store is passed.
+        Default is ~/.cache/alpha/store
+
+    store : ColumnStore, optional
+        column store to keep the history in
+    '''
+
+    dataset = 'daily_adjusted'
+
+    def __init__(self, root: Optional[str] = None, store: Optional[ColumnStore] = None):
+        self.store = store if store is not None else ColumnStore(root)
+
+    def load(self, symbol: str) -> Optional[pd.DataFrame]:
+        '''Returns the stored history of symbol newest bar first, or None if nothing is stored.'''
+        df = self.store.read(self.dataset, symbol, mmap=False)
+        return None if df is None else df.iloc[::-1]
+
+    def save(self, symbol: str, df: pd.DataFrame):
+        self.store.write(self.dataset, symbol, df)
+
+    def delete(self, symbol: str):
+        self.store.delete(self.dataset, symbol)
+
+    def symbols(self) -> list:
+        return self.store.partitions(self.dataset)
+
+
+def gap_too_big(stored: pd.DataFrame, today: Optional[datetime.date] = None) -> bool:
+    '''Returns True if a compact response can not reach back to the last stored bar.'''
+    last = pd.Timestamp(stored.index.max()).date()
+    today = today or datetime.date.today()
+    # business days over count the trading days (holidays), which errs towards a full refresh
+    return np.busday_count(last, today) >= COMPACT_BARS
+
+
+def is_current(stored: pd.DataFrame, today: Optional[datetime.date] = None) -> bool:
+    '''Returns True if the stored history reaches the last business day before today.'''
+    last = pd.Timestamp(stored.index.max()).date()
+    today = today or datetime.date.today()
+    return np.busday_count(last, today) <= 1
+
+
+def needs_full_refresh(stored: pd.DataFrame, compact: pd.DataFrame, rtol: float = 1e-6) -> bool:
+    '''
+    Returns True if the stored history can't be extended with the compact bars.
+
+    Parameters
+    ----------
+    stored : pandas.DataFrame
+        stored daily adjusted history of a symbol
+
+    compact : pandas.DataFrame
+        the last 100 bars of the same symbol
+
+    rtol : float, optional
+        relative tolerance used when comparing adjusted closes of overlapping bars
+
+    Returns
+    -------
+    True if the bars don't overlap, if a new bar has a dividend or split, or if the
+    adjusted close of any overlapping bar has changed.
+    '''
+    last = stored.index.max()
+    if compact.empty or compact.index.min() > last:
+        return True
+
+    new = compact[compact.index > last]
+    if (new[DIVIDEND] != 0).any() or (new[SPLIT] != 1).any():
+        return True
+
+    overlap = compact.index.intersection(stored.index)
+    old_close = stored.loc[overlap, ADJUSTED_CLOSE].to_numpy(dtype=float)
+    new_close = compact.loc[overlap, ADJUSTED_CLOSE].to_numpy(dtype=float)
+    return not np.allclose(old_close, new_close, rtol=rtol, equal_nan=True)
+
+
+def merge_tail(stored: pd.DataFrame, compact: pd.DataFrame) -> pd.DataFrame:
+    '''Appends the compact bars newer than the stored history, newest bar first.'''
+    new = compact[compact.index > stored.index.max()]
+    return pd.concat([new, stored]).sort_index(ascending=False)
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Technical indicators computed for every ticker at once.
+
+The kernels work on wide matrices, one row per date (ascending) and one column per
+ticker. Moving averages and rolling deviations use cumulative sums, so their cost does
+not grow with the window, and the exponential averages (EMA, Wilder smoothing used by
+RSI and ATR) run one recursive step per date over the whole row of tickers. There is no
+per-ticker groupby or apply.
+
+compute() takes the long frame returned by Equities.get_time_series_daily_adjusted,
+pivots the price columns once, runs the requested indicators and returns the frame with
+one extra column per indicator output, in the original row order. The pivot puts each
+ticker's bars one after the other in its column, so tickers with different calendars
+(exchanges, halts, listings) get windows over their own bars, not over dates.
+
+    df = indicators.compute(equities.get_time_series_daily_adjusted(output_size='full'),
+                            ['sma_50', 'ema_20', 'rsi', 'macd', 'bollinger', 'atr'])
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+# default parameter of each indicator when compute() gets a bare name, e.g. 'rsi'
+DEFAULTS = {'sma': 20, 'ema': 20, 'rsi': 14, 'bollinger': 20, 'atr': 14}
+
+# indicators drawn on the price axes, the others are drawn on their own subplot
+OVERLAYS = ('sma', 'ema', 'bollinger')
+
+
+def _values(df) -> np.ndarray:
+    return df.to_numpy(dtype='float64') if isinstance(df, pd.DataFrame) else np.asarray(df, dtype='float64')
+
+
+def _like(values: np.ndarray, df):
+    if isinstance(df, pd.DataFrame):
+        return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+    return values
+
+
+def _rolling_sum(x: np.ndarray, window: int):
+    # window sums from cumulative sums, windows holding a NaN are NaN
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=0)
+    ccount = np.cumsum(valid, axis=0)
+    total, count = csum.copy(), ccount.copy()
+    total[window:] -= csum[:-window]
+    count[window:] -= ccount[:-window]
+    total[count < window] = np.nan
+    return total
+
+
+def sma(prices, window: int = 20):
+    '''
+    Simple moving average of every column.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame or numpy array
+        wide price matrix sorted ascending, see analytics.price_matrix
+
+    window : int, optional
+        number of bars. Default is 20
+
+    Returns
+    -------
+    same type and shape as prices, NaN until a full window of prices is available
+    '''
+    return _like(_rolling_sum(_values(prices), window) / window, prices)
+
+
+def rolling_std(prices, window: int = 20):
+    '''Rolling population standard deviation of every column, see sma.'''
+    x = _values(prices)
+    # center each column on its first price so the sums of squares don't lose precision
+    first = x[np.argmax(~np.isnan(x), axis=0), np.arange(x.shape[1])] if x.ndim == 2 else x[~np.isnan(x)][:1]
+    x = x - first
+    mean = _rolling_sum(x, window) / window
+    var = _rolling_sum(x * x, window) / window - mean ** 2
+    return _like(np.sqrt(np.maximum(var, 0.0)), prices)
+
+
+def _ema(x: np.ndarray, alpha: float) -> np.ndarray:
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t-1], seeded with each column's first value.
+    # One step per date over all columns, a missing price carries the previous average.
+    out = np.empty_like(x)
+    prev = np.full(x.shape[1:], np.nan)
+    step = np.empty_like(prev)
+    for t in range(len(x)):
+        row = x[t]
+        np.multiply(prev, 1 - alpha, out=step)
+        step += alpha * row
+        # step is NaN where either the price or the average is missing
+        np.copyto(prev, step, where=~np.isnan(step))
+        np.copyto(prev, row, where=np.isnan(prev))
+        out[t] = prev
+    return out
+
+
+def ema(prices, span: int = 20):
+    '''
+    Exponential moving average of every column with alpha = 2 / (span + 1), equal to
+    pandas ewm(span=span, adjust=False, ignore_na=True).mean() column by column.
+    '''
+    return _like(_ema(_values(prices), 2.0 / (span + 1)), prices)
+
+
+def rsi(prices, window: int = 14):
+    '''
+    Relative strength index of every column, with Wilder smoothing (alpha = 1 / window)
+    of the gains and losses. Between 0 and 100.
+    '''
+    x = _values(prices)
+    diff = np.full(x.shape, np.nan)
+    diff[1:] = x[1:] - x[:-1]
+    gain = _ema(np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0)), 1.0 / window)
+    loss = _ema(np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0)), 1.0 / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100 - 100 / (1 + gain / loss)
+    out[(loss == 0) & (gain > 0)] = 100
+    return _like(out, prices)
+
+
+def macd(prices, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, object]:
+    '''
+    Moving average convergence divergence of every column.
+
+    Returns
+    -------
+    dict with 'macd' (fast EMA - slow EMA), 'macd_signal' (EMA of macd) and 'macd_hist'
+    (macd - signal), each the same type and shape as prices
+    '''
+    x = _values(prices)
+    line = _ema(x, 2.0 / (fast + 1)) - _ema(x, 2.0 / (slow + 1))
+    sig = _ema(line, 2.0 / (signal + 1))
+    return {'macd': _like(line, prices), 'macd_signal': _like(sig, prices),
+            'macd_hist': _like(line - sig, prices)}
+
+
+def bollinger(prices, window: int = 20, k: float = 2.0) -> Dict[str, object]:
+    '''
+    Bollinger bands of every column, the simple moving average plus and minus k rolling
+    standard deviations.
+
+    Returns
+    -------
+    dict with 'bb_mid', 'bb_upper' and 'bb_lower'
+    '''
+    mid, std = _values(sma(prices, window)), _values(rolling_std(prices, window))
+    return {'bb_mid': _like(mid, prices), 'bb_upper': _like(mid + k * std, prices),
+            'bb_lower': _like(mid - k * std, prices)}
+
+
+def atr(high, low, close, window: int = 14):
+    '''
+    Average true range of every column, Wilder smoothing of
+    max(high - low, |high - previous close|, |low - previous close|).
+    '''
+    h, l, c = _values(high), _values(low), _values(close)
+    prev = np.full(c.shape, np.nan)
+    prev[1:] = c[:-1]
+    tr = np.fmax(h - l, np.fmax(np.abs(h - prev), np.abs(l - prev)))
+    return _like(_ema(tr, 1.0 / window), close)
+
+
+def parse_spec(spec: str):
+    '''Splits an indicator spec like 'sma_50' into ('sma', 50), a bare name gets its default.'''
+    name, _, param = spec.partition('_')
+    if name not in DEFAULTS and name != 'macd':
+        raise ValueError(f"indicator={spec} is not a valid option. Valid options are "
+                         f"{sorted(list(DEFAULTS) + ['macd'])}")
+    return name, int(param) if param else DEFAULTS.get(name)
+
+
+def output_columns(spec: str) -> list:
+    '''Names of the columns compute() adds for spec.'''
+    name, param = parse_spec(spec)
+    if name == 'macd':
+        return ['macd', 'macd_signal', 'macd_hist']
+    if name == 'bollinger':
+        return ['bb_mid', 'bb_upper', 'bb_lower']
+    return [f'{name}_{param}']
+
+
+def compute(prices: pd.DataFrame, indicators: list, price: str = 'adjusted_close',
+            key: str = 'ticker') -> pd.DataFrame:
+    '''
+    Adds indicator columns to a long multi-ticker price frame.
+
+    Parameters
+    ----------
+    prices : pandas.DataFrame
+        long frame with a datetime index and a ticker column, e.g. the frame returned by
+        Equities.get_time_series_daily_adjusted, in any row order
+
+    indicators : list of str
+        'sma', 'ema', 'rsi', 'bollinger' and 'atr' with an optional window, e.g. 'sma_50',
+        and 'macd'. See output_columns for the names of the added columns.
+
+    price : str, optional
+        column the indicators are computed on, atr always uses high, low and close.
+        Default is 'adjusted_close'
+
+    key : str, optional
+        the ticker column. Default is 'ticker'
+
+    Returns
+    -------
+    a copy of prices with the indicator columns added
+    '''
+    out = prices.copy()
+    if prices.empty:
+        return out
+
+    # pivot each needed column once, the same positions scatter rows in and gather them back.
+    # A ticker's row is its bar number, not the date, so a date another ticker trades on
+    # but it doesn't leaves no gap in its windows
+    cols = pd.Categorical(prices[key]).codes
+    order = np.lexsort((prices.index.to_numpy(), cols))
+    counts = np.bincount(cols)
+    rows = np.empty(len(prices), dtype=np.intp)
+    rows[order] = np.arange(len(prices)) - np.repeat(np.cumsum(counts) - counts, counts)
+    shape = (counts.max(), len(counts))
+
+    wide = {}
+
+    def matrix(column):
+        if column not in wide:
+            m = np.full(shape, np.nan)
+            m[rows, cols] = prices[column].to_numpy(dtype='float64')
+            wide[column] = m
+        return wide[column]
+
+    for spec in indicators:
+        name, param = parse_spec(spec)
+        if name == 'sma':
+            result = {f'sma_{param}': sma(matrix(price), param)}
+        elif name == 'ema':
+            result = {f'ema_{param}': ema(matrix(price), param)}
+        elif name == 'rsi':
+            result = {f'rsi_{param}': rsi(matrix(price), param)}
+        elif name == 'macd':
+            result = macd(matrix(price))
+        elif name == 'bollinger':
+            result = bollinger(matrix(price), param)
+        else:
+            result = {f'atr_{param}': atr(matrix('high'), matrix('low'), matrix('close'), param)}
+
+        for column, values in result.items():
+            out[column] = values[rows, cols]
+
+    return out
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+A compact in-memory layout for the bars of many tickers.
+
+get_time_series_daily_adjusted returns one long frame with the ticker name repeated on
+every row in an object column. A PricePanel keeps the same bars as flat NumPy columns
+sorted by ticker and then date, with the start offset of each ticker's block. Selecting a
+ticker is a slice of those columns (no scan of the other tickers' rows), tickers are only
+stored once, and the prices can be kept as float32:
+
+    panel = equities.get_price_panel(output_size='full', float32=True)
+    ibm = panel['IBM']
+    prices = panel.wide('adjusted_close')
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    '''Returns df with its float64 columns as float32, other columns are kept as they are.'''
+    floats = [c for c in df.columns if df[c].dtype == np.float64]
+    return df.astype(dict.fromkeys(floats, np.float32)) if floats else df
+
+
+class PricePanel:
+    '''
+    Bars of many tickers in flat column arrays, sorted by ticker and then date ascending.
+    The rows of tickers[i] are offsets[i]:offsets[i + 1] of every array.
+
+    Build one with from_frames or from_frame rather than the constructor.
+
+    Parameters
+    ----------
+    tickers : list
+        the tickers, in block order
+
+    offsets : numpy.ndarray
+        int64 start of each ticker's block, with the total row count appended
+
+    dates : numpy.ndarray
+        datetime64 date of every row
+
+    columns : dict
+        column name -> numpy.ndarray of every row
+    '''
+
+    def __init__(self, tickers: list, offsets: np.ndarray, dates: np.ndarray, columns: dict):
+        self.tickers = list(tickers)
+        self.offsets = offsets
+        self.dates = dates
+        self.columns = columns
+        self._position = {t: i for i, t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frames(cls, frames: Iterable, float32: bool = False) -> 'PricePanel':
+        '''
+        Builds a panel from (ticker, frame) pairs, e.g. the frames of single tickers as
+        parsed from the api. Frames can be in any date order and share the same columns.
+
+        Parameters
+        ----------
+        frames : iterable of (str, pandas.DataFrame)
+            frames with a datetime index, a ticker that appears twice keeps its first frame
+
+        float32 : bool, optional
+            store float64 columns as float32, halving their memory. Default is False
+
+        Returns
+        -------
+        PricePanel
+        '''
+        tickers, blocks, seen = [], [], set()
+        for t, df in frames:
+            if t in seen or df is None:
+                continue
+            seen.add(t)
+            if not df.index.is_monotonic_increasing:
+                df = df.iloc[np.argsort(df.index.to_numpy(), kind='stable')]
+            tickers.append(t)
+            blocks.append(downcast(df) if float32 else df)
+
+        offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        np.cumsum([len(df) for df in blocks], out=offsets[1:])
+        if not blocks:
+            return cls([], offsets, np.array([], dtype='datetime64[s]'), {})
+
+        names = [c for c in blocks[0].columns if c != 'ticker']
+        dates = np.concatenate([df.index.to_numpy() for df in blocks])
+        columns = {c: np.concatenate([df[c].to_numpy() for df in blocks]) for c in names}
+        return cls(tickers, offsets, dates, columns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, key: str = 'ticker', float32: bool = False) -> 'PricePanel':
+        '''
+        Builds a panel from a long frame with a ticker column, e.g. the frame of
+        get_time_series_daily_adjusted. Tickers keep the order they first appear in.
+        '''
+        if df.empty:
+            return cls.from_frames([], float32)
+        if float32:
+            df = downcast(df)
+        names = pd.unique(df[key].to_numpy())
+        codes = pd.Categorical(df[key], categories=names).codes
+        order = np.lexsort((df.index.to_numpy(), codes))
+        offsets = np.searchsorted(codes[order], np.arange(len(names) + 1)).astype(np.int64)
+        columns = {c: df[c].to_numpy()[order] for c in df.columns if c != key}
+        return cls(list(names), offsets, df.index.to_numpy()[order], columns)
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._position
+
+    def __iter__(self):
+        return iter(self.tickers)
+
+    def __repr__(self) -> str:
+        return f'PricePanel({len(self.tickers)} tickers, {len(self)} rows, {self.nbytes / 2**20:.1f} MB)'
+
+    @property
+    def nbytes(self) -> int:
+        '''Bytes of the dates, columns and offsets arrays.'''
+        return self.dates.nbytes + self.offsets.nbytes + sum(a.nbytes for a in self.columns.values())
+
+    def _block(self, ticker) -> slice:
+        try:
+            i = self._position[ticker]
+        except KeyError:
+            raise KeyError(f'{ticker} is not in the panel') from None
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def select(self, ticker: str, columns: Optional[list] = None) -> pd.DataFrame:
+        '''
+        Returns the bars of one ticker, dates ascending. The frame is built on views of the
+        panel's arrays, copy it before modifying it in place.
+
+        Raises
+        ------
+        KeyError if the ticker is not in the panel
+        '''
+        block = self._block(ticker)
+        names = list(self.columns) if columns is None else columns
+        index = pd.DatetimeIndex(self.dates[block], name='date')
+        return pd.DataFrame({c: self.columns[c][block] for c in names}, index=index, copy=False)
+
+    __getitem__ = select
+
+    def column(self, name: str, ticker: str) -> np.ndarray:
+        '''Returns a view of one column of one ticker.'''
+        return self.columns[name][self._block(ticker)]
+
+    def wide(self, column: str = 'adjusted_close') -> pd.DataFrame:
+        '''
+        Returns column as a matrix indexed by the union of all dates ascending, one column
+        per ticker in panel order, NaN where a ticker has no bar. Same layout as
+        analytics.price_matrix.
+        '''
+        if not self.tickers:
+            return pd.DataFrame(dtype='float64')
+        all_dates = np.unique(self.dates)
+        values = self.columns[column]
+        dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+        out = np.full((len(all_dates), len(self.tickers)), np.nan, dtype=dtype)
+        for i in range(len(self.tickers)):
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            out[np.searchsorted(all_dates, self.dates[lo:hi]), i] = values[lo:hi]
+        return pd.DataFrame(out, index=pd.DatetimeIndex(all_dates, name='date'),
+                            columns=pd.Index(self.tickers, name='ticker'))
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Returns the long frame of every ticker, in the layout of
+        get_time_series_daily_adjusted but with a categorical ticker column.
+        '''
+        codes = np.repeat(np.arange(len(self.tickers)), np.diff(self.offsets))
+        df = pd.DataFrame(dict(self.columns), index=pd.DatetimeIndex(self.dates, name='date'))
+        df['ticker'] = pd.Categorical.from_codes(codes, categories=self.tickers)
+        return df
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Schema driven parsing of alpha vantage json responses into typed dataframes.
+
+Each endpoint has a declared Schema listing the json field, the short column name and
+the dtype of every column. Columns are built straight from the json records into NumPy
+arrays of the declared dtype, without building an object dataframe first, transposing
+it or converting it column by column with pd.to_numeric.
+"""
+
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Field(NamedTuple):
+    '''A single column of a schema: the json key, the column name and the dtype.'''
+    source: str
+    name: str
+    dtype: str = 'float64'
+
+
+class Schema:
+    '''
+    Describes how a response is turned into a dataframe.
+
+    Parameters
+    ----------
+    index : Field
+        the field used as the index, a datetime64 dtype gives a DatetimeIndex
+
+    fields : list of Field
+        the columns of the dataframe
+
+    container : str, optional
+        the key of the response holding the records, e.g. 'Time Series (Daily)' or 'data'
+
+    default_dtype : str, optional
+        dtype of record keys that are not declared in fields, None drops undeclared keys.
+        Undeclared keys keep their json name.
+    '''
+
+    def __init__(self, index: Field, fields: List[Field], container: Optional[str] = None,
+                 default_dtype: Optional[str] = None):
+        self.index = index
+        self.fields = list(fields)
+        self.container = container
+        self.default_dtype = default_dtype
+
+    @property
+    def columns(self) -> list:
+        return [f.name for f in self.fields]
+
+    def resolve(self, record: dict) -> List[Field]:
+        '''Returns the fields of a record (or of a dict holding the keys of several records),
+        declared fields first then undeclared ones.'''
+        if self.default_dtype is None:
+            return self.fields
+        declared = {f.source for f in self.fields} | {self.index.source}
+        return self.fields + [Field(k, k, self.default_dtype) for k in record if k not in declared]
+
+
+DAILY_ADJUSTED = Schema(index=Field('date', 'date', 'datetime64[s]'),
+                        container='Time Series (Daily)',
+                        fields=[Field('1. open', 'open'),
+                                Field('2. high', 'high'),
+                                Field('3. low', 'low'),
+                                Field('4. close', 'close'),
+                                Field('5. adjusted close', 'adjusted_close'),
+                                Field('6. volume', 'volume', 'int64'),
+                                Field('7. dividend amount', 'dividend_amount'),
+                                Field('8. split coefficient', 'split_coefficient')])
+
+# the container of an intraday response names its interval, e.g. 'Time Series (5min)'
+INTRADAY = Schema(index=Field('date', 'date', 'datetime64[s]'),
+                  fields=[Field('1. open', 'open'),
+                          Field('2. high', 'high'),
+                          Field('3. low', 'low'),
+                          Field('4. close', 'close'),
+                          Field('5. volume', 'volume', 'int64')])
+
+_PERIOD_ADJUSTED = [Field('1. open', 'open'),
+                    Field('2. high', 'high'),
+                    Field('3. low', 'low'),
+                    Field('4. close', 'close'),
+                    Field('5. adjusted close', 'adjusted_close'),
+                    Field('6. volume', 'volume', 'int64'),
+                    Field('7. dividend amount', 'dividend_amount')]
+
+WEEKLY_ADJUSTED = Schema(index=Field('date', 'date', 'datetime64[s]'),
+                         container='Weekly Adjusted Time Series', fields=_PERIOD_ADJUSTED)
+
+MONTHLY_ADJUSTED = Schema(index=Field('date', 'date', 'datetime64[s]'),
+                          container='Monthly Adjusted Time Series', fields=_PERIOD_ADJUSTED)
+
+ECONOMIC = Schema(index=Field('date', 'date', 'datetime64[s]'),
+                  container='data',
+                  fields=[Field('value', 'value')])
+
+FUNDAMENTALS = Schema(index=Field('fiscalDateEnding', 'fiscalDateEnding', 'datetime64[s]'),
+                      fields=[Field('reportedCurrency', 'reportedCurrency', 'str')],
+                      default_dtype='float64')
+
+EARNINGS = Schema(index=Field('fiscalDateEnding', 'fiscalDateEnding', 'datetime64[s]'),
+                  fields=[Field('reportedDate', 'reportedDate', 'datetime64[s]')],
+                  default_dtype='float64')
+
+# OVERVIEW is one flat record per symbol, text fields are declared and the rest are numbers
+OVERVIEW = Schema(index=Field('Symbol', 'ticker', 'str'),
+                  fields=[Field(k, k, 'str') for k in
+                          ('AssetType', 'Name', 'Description', 'CIK', 'Exchange', 'Currency', 'Country',
+                           'Sector', 'Industry', 'Address', 'OfficialSite', 'FiscalYearEnd')] +
+                         [Field(k, k, 'datetime64[s]') for k in ('LatestQuarter', 'DividendDate', 'ExDividendDate')],
+                  default_dtype='float64')
+
+
+def to_array(values: list, dtype: str) -> np.ndarray:
+    '''
+    Converts a list of json strings to an array of dtype. Values that are not numbers
+    (alpha vantage uses 'None', '.' and '-') become NaN, integer columns holding such
+    values fall back to float64. Dates that can't be parsed become NaT.
+    '''
+    if dtype == 'str':
+        return np.array(values, dtype=object)
+    if dtype.startswith('datetime64'):
+        # dates that are missing ('None') become NaT
+        return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='ISO8601').to_numpy(dtype=dtype)
+    try:
+        return np.array(values, dtype=dtype)
+    except (ValueError, TypeError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype='float64')
+
+
+def _index(keys: list, field: Field) -> pd.Index:
+    if field.dtype.startswith('datetime64'):
+        return pd.DatetimeIndex(np.array(keys, dtype=field.dtype), name=field.name)
+    return pd.Index(to_array(keys, field.dtype), name=field.name)
+
+
+def date_positions(index, start=None, end=None):
+    '''
+    Returns the positions of index that fall within [start, end], both inclusive.
+
+    A sorted index (ascending or descending, as alpha vantage returns it) is searched with
+    a binary search and a slice is returned, an unsorted index falls back to a boolean mask.
+
+    Parameters
+    ----------
+    index : pandas.DatetimeIndex or datetime64 array
+
+    start, end : str or datetime, optional
+        bounds of the range, None leaves that side open
+
+    Returns
+    -------
+    slice or numpy boolean array usable with iloc or to index an array
+    '''
+    values = np.asarray(index)
+    n = len(values)
+    if start is None and end is None:
+        return slice(0, n)
+    lo_val = np.datetime64(pd.Timestamp(start)) if start is not None else None
+    hi_val = np.datetime64(pd.Timestamp(end)) if end is not None else None
+
+    if not isinstance(index, pd.DatetimeIndex):
+        index = pd.DatetimeIndex(values)
+    if index.is_monotonic_increasing:
+        lo = 0 if lo_val is None else int(np.searchsorted(values, lo_val, side='left'))
+        hi = n if hi_val is None else int(np.searchsorted(values, hi_val, side='right'))
+        return slice(lo, max(lo, hi))
+    if index.is_monotonic_decreasing:
+        rev = values[::-1]
+        lo = 0 if hi_val is None else n - int(np.searchsorted(rev, hi_val, side='right'))
+        hi = n if lo_val is None else n - int(np.searchsorted(rev, lo_val, side='left'))
+        return slice(lo, max(lo, hi))
+
+    mask = np.ones(n, dtype=bool)
+    if lo_val is not None:
+        mask &= values >= lo_val
+    if hi_val is not None:
+        mask &= values <= hi_val
+    return mask
+
+
+def slice_dates(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    '''Returns the rows of df whose datetime index falls within [start, end].'''
+    if start is None and end is None:
+        return df
+    return df.iloc[date_positions(df.index, start, end)]
+
+
+def _build(keys: list, records: list, schema: Schema, start=None, end=None) -> pd.DataFrame:
+    index = _index(keys, schema.index)
+    if start is not None or end is not None:
+        # drop out of range records before any value is converted
+        pos = date_positions(index, start, end)
+        index = index[pos]
+        records = records[pos] if isinstance(pos, slice) else [r for r, keep in zip(records, pos) if keep]
+    if schema.default_dtype is not None and records:
+        # records may not all have the same keys, e.g. annual and quarterly earnings
+        fields = schema.resolve(dict.fromkeys(k for r in records for k in r))
+    else:
+        fields = schema.fields
+    columns = {f.name: to_array([r.get(f.source) for r in records], f.dtype) for f in fields}
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def parse_time_series(series: dict, schema: Schema = DAILY_ADJUSTED, start=None, end=None) -> pd.DataFrame:
+    '''
+    Parses a time series object, a dict of {timestamp: {field: value}}, into a typed dataframe.
+
+    Parameters
+    ----------
+    series : dict
+        e.g. response['Time Series (Daily)']
+
+    schema : Schema, optional
+        the schema of the records, default is DAILY_ADJUSTED
+
+    start, end : str or datetime, optional
+        inclusive date range, records outside it are dropped before their values are parsed
+
+    Returns
+    -------
+    pandas.DataFrame indexed by timestamp, in the order of the response (newest first)
+    '''
+    return _build(list(series), list(series.values()), schema, start, end)
+
+
+def parse_records(records: list, schema: Schema = ECONOMIC, start=None, end=None) -> pd.DataFrame:
+    '''
+    Parses a list of json records, e.g. response['data'] or response['annualReports'],
+    into a typed dataframe indexed by schema.index.
+
+    Parameters
+    ----------
+    records : list of dicts
+
+    schema : Schema, optional
+        the schema of the records, default is ECONOMIC
+
+    start, end : str or datetime, optional
+        inclusive date range, records outside it are dropped before their values are parsed
+
+    Returns
+    -------
+    pandas.DataFrame
+    '''
+    return _build([r.get(schema.index.source) for r in records], list(records), schema, start, end)
+
+
+def parse_response(data: dict, schema: Schema, start=None, end=None) -> pd.DataFrame:
+    '''Parses a full response using schema.container to find the records.'''
+    records = data[schema.container]
+    if isinstance(records, dict):
+        return parse_time_series(records, schema, start, end)
+    return parse_records(records, schema, start, end)
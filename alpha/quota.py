@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Quota accounting and adaptive throttling across one or more alpha vantage api keys.
+
+A QuotaManager hands out an api key for every request sent to alpha vantage. Each key
+has its own per-minute and per-day token buckets, so requests are spaced out before a
+limit is reached rather than after alpha vantage starts answering with throttle payloads.
+Keys are used in turn, and a request waits only when every key is out of tokens.
+
+When a throttle payload ("Note" / "Information") comes back anyway, e.g. because another
+process uses the same key, the key is put on a cooldown that doubles with every
+consecutive throttle and its per-minute rate is halved. Successful requests raise the
+rate back step by step (additive increase, multiplicative decrease).
+
+    quota = QuotaManager(['KEY1', 'KEY2'], per_minute=75, per_day=None)
+    transport = Transport(quota=quota)
+    ...
+    quota.usage()   # calls in the last minute and day, remaining budget per key
+"""
+
+import asyncio
+import bisect
+import collections
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+
+from alpha.scheduler import TokenBucket
+from alpha.transport import AlphaVantageError
+
+
+class QuotaExhausted(AlphaVantageError):
+    '''Raised when no api key has quota left within max_wait seconds.'''
+
+
+class _KeyState:
+
+    def __init__(self, key, per_minute, per_day, clock):
+        self.key = key
+        self.minute = TokenBucket(per_minute / 60.0, per_minute, clock) if per_minute else None
+        self.day = TokenBucket(per_day / 86400.0, per_day, clock) if per_day else None
+        # send times, for the calls in the last minute and day counters
+        self.sent = collections.deque()
+        self.calls = 0
+        self.throttled = 0
+        self.strikes = 0
+        self.cooldown_until = 0.0
+
+    def buckets(self):
+        return [b for b in (self.minute, self.day) if b is not None]
+
+
+class QuotaManager:
+    '''
+    Tracks and spaces the requests sent with each of several alpha vantage api keys.
+
+    Parameters
+    ----------
+    keys : str or list of str
+        api keys to rotate across
+
+    per_minute : int, optional
+        requests allowed per minute for each key. Default is 75, the smallest premium tier
+
+    per_day : int, optional
+        requests allowed per day for each key, None means no daily quota (premium keys).
+        Free keys allow 25.
+
+    backoff : float, optional
+        cooldown in seconds after a key's first throttle payload, doubled for every
+        consecutive one. Default is 1
+
+    max_backoff : float, optional
+        longest cooldown in seconds. Default is 60
+
+    max_wait : float, optional
+        if every key would have to wait longer than max_wait seconds for quota, acquire
+        raises QuotaExhausted instead of waiting, e.g. when the daily quota of every key is
+        spent. None waits as long as needed. Default is None
+    '''
+
+    def __init__(self, keys, per_minute: Optional[int] = 75, per_day: Optional[int] = None,
+                 backoff: float = 1.0, max_backoff: float = 60.0, max_wait: Optional[float] = None,
+                 clock: Callable = time.monotonic, sleep: Callable = time.sleep):
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        if not keys:
+            raise ValueError('at least one api key is required')
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._states = {k: _KeyState(k, per_minute, per_day, clock) for k in keys}
+        self._order = keys
+        self._next = 0
+
+    @property
+    def keys(self) -> list:
+        return list(self._order)
+
+    def _try_acquire(self):
+        # returns (key, 0) after taking a token of the next key with quota left, or
+        # (None, seconds until the first key has quota again)
+        with self._lock:
+            now = self._clock()
+            wait = float('inf')
+            n = len(self._order)
+            for i in range(n):
+                state = self._states[self._order[(self._next + i) % n]]
+                key_wait = max(state.cooldown_until - now,
+                               max([(1 - b.available) / b.rate for b in state.buckets()], default=0.0))
+                if key_wait <= 0:
+                    for b in state.buckets():
+                        b.try_acquire(1)
+                    self._prune(state, now)
+                    state.sent.append(now)
+                    state.calls += 1
+                    self._next = (self._next + i + 1) % n
+                    return state.key, 0.0
+                wait = min(wait, key_wait)
+
+        if self.max_wait is not None and wait > self.max_wait:
+            raise QuotaExhausted(f'no api key has quota for the next {wait:.0f} seconds')
+        return None, wait
+
+    def acquire(self) -> str:
+        '''Blocks until one of the keys may send a request and returns it.'''
+        while True:
+            key, wait = self._try_acquire()
+            if key is not None:
+                return key
+            self._sleep(wait)
+
+    async def acquire_async(self, sleep: Callable = asyncio.sleep) -> str:
+        '''Waits without blocking the event loop until one of the keys may send a request.'''
+        while True:
+            key, wait = self._try_acquire()
+            if key is not None:
+                return key
+            await sleep(wait)
+
+    def record(self, key: str, throttled: bool = False):
+        '''
+        Records the outcome of a request sent with key. A throttle payload puts the key on
+        a cooldown and halves its per-minute rate, a success raises the rate back by a
+        tenth of the configured one.
+        '''
+        with self._lock:
+            state = self._states[key]
+            if not throttled:
+                state.strikes = 0
+                if state.minute is not None:
+                    base = self.per_minute / 60.0
+                    state.minute.rate = min(base, state.minute.rate + base / 10)
+                return
+
+            state.throttled += 1
+            state.strikes += 1
+            state.cooldown_until = self._clock() + min(self.max_backoff, self.backoff * 2 ** (state.strikes - 1))
+            if state.minute is not None:
+                state.minute.rate = max(state.minute.rate / 2, 1 / 60.0)
+
+    def _prune(self, state, now):
+        while state.sent and state.sent[0] <= now - 86400:
+            state.sent.popleft()
+
+    def usage(self) -> pd.DataFrame:
+        '''
+        Returns one row per api key with the calls sent in the last minute and day, the
+        budget left under each quota, the current adaptive per-minute rate, the number of
+        throttle payloads received and the seconds left on the key's cooldown.
+        '''
+        rows = []
+        with self._lock:
+            now = self._clock()
+            for k in self._order:
+                state = self._states[k]
+                self._prune(state, now)
+                minute = len(state.sent) - bisect.bisect_right(state.sent, now - 60)
+                day = len(state.sent)
+                rows.append({'key': k, 'calls': state.calls, 'calls_minute': minute, 'calls_day': day,
+                             'remaining_minute': None if self.per_minute is None else max(self.per_minute - minute, 0),
+                             'remaining_day': None if self.per_day is None else max(self.per_day - day, 0),
+                             'rate_per_minute': None if state.minute is None else state.minute.rate * 60,
+                             'throttled': state.throttled,
+                             'cooldown': max(state.cooldown_until - now, 0.0)})
+        return pd.DataFrame(rows).set_index('key')
+
+    @property
+    def remaining_today(self) -> Optional[int]:
+        '''Requests left under the daily quota of all keys together, None without a daily quota.'''
+        if self.per_day is None:
+            return None
+        return int(self.usage()['remaining_day'].sum())
+
+
+def quota_for(api_key) -> Optional[QuotaManager]:
+    '''Returns a QuotaManager rotating across api_key if it is a list of keys, otherwise None.'''
+    if isinstance(api_key, Iterable) and not isinstance(api_key, str):
+        return QuotaManager(api_key)
+    return None
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Resampling of OHLCV bars into coarser bars, e.g. 1min bars into 15min, hourly or daily
+bars, or daily bars into weekly and monthly bars.
+
+resample_bars sorts the bars once by ticker and time, finds where each (ticker, bin)
+group starts and aggregates every column with one numpy reduceat over the whole frame,
+so there is no per-ticker or per-bin python loop however many tickers and bars there are.
+
+    bars = equities.get_time_series_intraday('1min', months=['2024-01', '2024-02'])
+    hourly = resample.resample_bars(bars, '60min')
+"""
+
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# minutes per bar of each alpha vantage intraday interval
+INTERVALS = {'1min': 1, '5min': 5, '15min': 15, '30min': 30, '60min': 60}
+
+# how each bar column is aggregated, columns not listed keep their last value
+AGGREGATIONS = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'adjusted_close': 'last',
+                'volume': 'sum', 'dividend_amount': 'sum', 'split_coefficient': 'prod'}
+
+_FIXED = re.compile(r'^(\d*)(min|h|D)$')
+
+
+def bins(index, rule: str) -> np.ndarray:
+    '''
+    Returns the start of the bin each timestamp falls in.
+
+    Parameters
+    ----------
+    index : pandas.DatetimeIndex or datetime64 array
+
+    rule : str
+        'Nmin', 'Nh' or 'D' for fixed width bins aligned on midnight, e.g. '15min', 'W' for
+        weeks starting on monday and 'M' for calendar months
+
+    Returns
+    -------
+    datetime64[ns] array
+    '''
+    ts = np.asarray(index, dtype='datetime64[ns]')
+    if rule == 'M':
+        return ts.astype('datetime64[M]').astype('datetime64[ns]')
+    if rule == 'W':
+        # 1970-01-01 was a thursday, shift so weeks start on monday
+        days = ts.astype('datetime64[D]').astype('int64')
+        return ((days + 3) // 7 * 7 - 3).astype('datetime64[D]').astype('datetime64[ns]')
+    m = _FIXED.match(rule)
+    if m is None:
+        raise ValueError(f"rule={rule} is not a valid option. Valid options are 'Nmin', 'Nh', 'D', 'W' and 'M'")
+    step = pd.Timedelta(int(m.group(1) or 1), unit=m.group(2)).value
+    return (ts.astype('int64') // step * step).astype('datetime64[ns]')
+
+
+def _reduce(values: np.ndarray, how: str, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    if how == 'first':
+        return values[starts]
+    if how == 'last':
+        return values[ends]
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+    if how == 'sum':
+        return np.add.reduceat(np.where(np.isnan(values), 0, values) if values.dtype.kind == 'f' else values,
+                               starts)
+    if how == 'prod':
+        return np.multiply.reduceat(np.where(np.isnan(values), 1, values), starts)
+    raise ValueError(f"how={how} is not a valid option. Valid options are ['first', 'last', 'max', 'min', 'sum', 'prod']")
+
+
+def resample_bars(bars: pd.DataFrame, rule: str, key: str = 'ticker', label: str = 'left',
+                  how: Optional[dict] = None) -> pd.DataFrame:
+    '''
+    Aggregates bars into coarser bars, for every ticker at once.
+
+    Parameters
+    ----------
+    bars : pandas.DataFrame
+        bars with a datetime index in any order, e.g. the frame returned by
+        Equities.get_time_series_intraday, with a key column if it holds several tickers
+
+    rule : str
+        the coarser bar, see bins
+
+    key : str, optional
+        the ticker column, bars without it are treated as one ticker. Default is 'ticker'
+
+    label : str, optional
+        'left' labels each bar with the start of its bin, 'last' with the timestamp of the
+        last bar in it, which is how alpha vantage labels weekly and monthly bars.
+        Default is 'left'
+
+    how : dict, optional
+        aggregation of each column ('first', 'last', 'max', 'min', 'sum' or 'prod'),
+        merged over AGGREGATIONS
+
+    Returns
+    -------
+    pandas.DataFrame with the same columns, sorted by ticker then time. Bins without any
+    bar are left out.
+    '''
+    if label not in ('left', 'last'):
+        raise ValueError(f"label={label} is not a valid option. Valid options are ['left', 'last']")
+    if bars.empty:
+        return bars.copy()
+    how = dict(AGGREGATIONS, **(how or {}))
+
+    ts = np.asarray(bars.index, dtype='datetime64[ns]')
+    labels = bins(ts, rule)
+    if key in bars.columns:
+        tickers = pd.Categorical(bars[key])
+        codes = tickers.codes
+    else:
+        tickers, codes = None, np.zeros(len(bars), dtype='int8')
+
+    # sort once by ticker, bin and time, a group starts wherever ticker or bin changes
+    order = np.lexsort((ts, labels, codes))
+    codes, labels = codes[order], labels[order]
+    change = np.empty(len(order), dtype=bool)
+    change[0] = True
+    change[1:] = (codes[1:] != codes[:-1]) | (labels[1:] != labels[:-1])
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], len(order)) - 1
+
+    columns = {}
+    for c in bars.columns:
+        if c == key:
+            continue
+        values = bars[c].to_numpy()[order]
+        agg = how.get(c, 'last')
+        if values.dtype.kind not in 'fiub' and agg not in ('first', 'last'):
+            agg = 'last'
+        columns[c] = _reduce(values, agg, starts, ends)
+    if tickers is not None:
+        columns[key] = pd.Categorical.from_codes(codes[starts], categories=tickers.categories)
+        if not isinstance(bars[key].dtype, pd.CategoricalDtype):
+            columns[key] = np.asarray(columns[key], dtype=object)
+
+    index = pd.DatetimeIndex(labels[starts] if label == 'left' else ts[order][ends], name=bars.index.name)
+    if isinstance(bars.index, pd.DatetimeIndex):
+        index = index.as_unit(bars.index.unit)
+    return pd.DataFrame(columns, index=index, columns=list(bars.columns), copy=False)
@@ -17,41 +17,32 @@ api_key = '296ULICGSB63VL7A'
 econ = a.Economics(api_key)
 
 # ten year treasury yield
-ty_ten = econ.treasury_yield()
-ty_ten = ty_ten[(ty_ten.index > '2002-01-01')]
+ty_ten = econ.treasury_yield(start='2002-01-01')
 
 # seven year treasury yield
-ty_seven = econ.treasury_yield(maturity='7year')
-ty_seven = ty_seven[(ty_seven.index > '2002-01-01')]
+ty_seven = econ.treasury_yield(maturity='7year', start='2002-01-01')
 
 # two year treasury yield
-ty_two = econ.treasury_yield(maturity='2year')
-ty_two = ty_two[(ty_two.index > '2002-01-01')]
+ty_two = econ.treasury_yield(maturity='2year', start='2002-01-01')
 
-# get real gdp data - do date filtering outside of function call
-rgdp = econ.real_gdp()
-rgdp = rgdp[(rgdp.index > '2018-01-01')]
+# get real gdp data - dates outside start/end are dropped while parsing
+rgdp = econ.real_gdp(start='2018-01-01')
 
 # get non farm payroll data
-nfpr = econ.nonfarm_payroll()
-nfpr = nfpr[(nfpr.index > '2018-01-01')]
-#rgdp = rgdp[(rgdp['date'] > '2019-01-01') & (rgdp['date'] <= '2022-10-05')]
+nfpr = econ.nonfarm_payroll(start='2018-01-01')
 
 # get federal funds rate
 ffr = econ.federal_funds_rate()
 #ffr = ffr[(ffr.index > '2018-01-01')]
 
 # get cpi
-cpi = econ.cpi()
-cpi = cpi[(cpi.index > '2018-01-01')]
+cpi = econ.cpi(start='2018-01-01')
 
 # get consumer sentiment
-cs = econ.consumer_sentiment()
-cs = cs[(cs.index > '2018-01-01')]
+cs = econ.consumer_sentiment(start='2018-01-01')
 
 # get inflation
-infl = econ.inflation()
-infl = infl[(infl.index > '2018-01-01')]
+infl = econ.inflation(start='2018-01-01')
 
 
 # -----MANUALLY CALL SUBPLOT
@@ -84,3 +75,14 @@ fig = subplots.build_subplots(data=[{'subplot': [{'series': ty_ten,
 
 fig.show()
 
+
+# -----MACRO PANEL
+
+# fetch every indicator concurrently into one monthly frame, lower frequency
+# series (e.g. quarterly gdp) are carried forward
+panel = econ.macro_panel([{'indicator': 'treasury_yield', 'maturity': '10year', 'name': 'Ten Year Yield'},
+                          {'indicator': 'treasury_yield', 'maturity': '7year', 'name': 'Seven Year Yield'},
+                          {'indicator': 'treasury_yield', 'maturity': '2year', 'name': 'Two Year Yield'},
+                          'real_gdp', 'nonfarm_payroll', 'federal_funds_rate', 'cpi',
+                          'consumer_sentiment', 'inflation'],
+                         freq='MS', fill='ffill', start='2018-01-01')
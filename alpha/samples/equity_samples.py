@@ -34,8 +34,12 @@ equities = a.Equities(api_key=api_key, tickers=tickers)
 
 # ---- E#QUITY DATAFRAMES ----
 
-# cashflows
+# fundamentals, indexed by (ticker, fiscalDateEnding) with a period column
 cf = equities.get_cashflow()
+income = equities.get_income_statement()
+balance = equities.get_balance_sheet(period='annual')
+earnings = equities.get_earnings()
+overview = equities.get_overview()
 
 # get time series daily adjusted
 tsa_df = equities.get_time_series_daily_adjusted()
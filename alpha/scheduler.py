@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent fetch engine for batches of alpha vantage requests.
+
+Alpha Vantage enforces a per-minute and a per-day request quota, so every
+concurrent batch is run under a RateLimiter that composes one token bucket
+per quota. Results are returned in the same order as the keys passed in,
+together with the latency and any error raised for each key, so one slow or
+failing symbol never takes the rest of the batch down with it.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+import pandas as pd
+
+
+class TokenBucket:
+    '''
+    A thread-safe token bucket. Tokens refill continuously at `rate` tokens per
+    second up to `capacity`; acquire blocks until enough tokens are available.
+
+    Parameters
+    ----------
+    rate : float
+        tokens added per second
+
+    capacity : float
+        maximum number of tokens the bucket can hold, this is the burst size
+
+    clock : callable, optional
+        monotonic clock, injectable for testing
+
+    sleep : callable, optional
+        sleep function, injectable for testing
+    '''
+
+    def __init__(self, rate: float, capacity: float, clock: Callable = time.monotonic,
+                 sleep: Callable = time.sleep):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError('rate and capacity must be positive')
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        '''Takes tokens if available and returns 0, otherwise returns the seconds to wait.'''
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        '''Blocks until `tokens` tokens have been taken from the bucket.'''
+        if tokens > self.capacity:
+            raise ValueError(f'cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}')
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return
+            self._sleep(wait)
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class RateLimiter:
+    '''
+    Enforces the Alpha Vantage per-minute and (optionally) per-day request quotas.
+
+    Parameters
+    ----------
+    per_minute : int, optional
+        requests allowed per minute, default is 75 which is the smallest premium tier
+
+    per_day : int, optional
+        requests allowed per day, None means no daily quota
+    '''
+
+    def __init__(self, per_minute: Optional[int] = 75, per_day: Optional[int] = None,
+                 clock: Callable = time.monotonic, sleep: Callable = time.sleep):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._buckets = []
+        if per_minute:
+            self._buckets.append(TokenBucket(per_minute / 60.0, per_minute, clock, sleep))
+        if per_day:
+            self._buckets.append(TokenBucket(per_day / 86400.0, per_day, clock, sleep))
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        '''Takes a token from every bucket if all have one and returns 0, otherwise takes
+        nothing and returns the seconds to wait.'''
+        # take from all buckets atomically so a caller never holds a minute token
+        # while it waits for the daily bucket
+        with self._lock:
+            wait = max([self._wait_for(b) for b in self._buckets], default=0.0)
+            if wait == 0:
+                for b in self._buckets:
+                    b.try_acquire(1)
+            return wait
+
+    def acquire(self):
+        '''Blocks until a request may be sent under every configured quota.'''
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            self._sleep(wait)
+
+    async def acquire_async(self, sleep: Callable = asyncio.sleep):
+        '''Waits without blocking the event loop until a request may be sent. Shares the
+        buckets with acquire, so threaded and asyncio callers can use one limiter.'''
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            await sleep(wait)
+
+    @staticmethod
+    def _wait_for(bucket: TokenBucket) -> float:
+        available = bucket.available
+        return 0.0 if available >= 1 else (1 - available) / bucket.rate
+
+
+class SharedRateLimiter(RateLimiter):
+    '''
+    A RateLimiter whose buckets live in shared memory, so every process it is handed to
+    (e.g. through a process pool initializer) draws from one per-minute and per-day budget.
+    time.monotonic is one clock for all processes of a machine, so refills agree.
+
+    Parameters
+    ----------
+    per_minute : int, optional
+        requests allowed per minute across every process, default is 75
+
+    per_day : int, optional
+        requests allowed per day across every process, None means no daily quota
+
+    context : multiprocessing context, optional
+        context the shared state is created in, use the one the processes are started with
+    '''
+
+    def __init__(self, per_minute: Optional[int] = 75, per_day: Optional[int] = None, context=None,
+                 clock: Callable = time.monotonic, sleep: Callable = time.sleep):
+        ctx = context or multiprocessing.get_context()
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._rates = [q / s for q, s in ((per_minute, 60.0), (per_day, 86400.0)) if q]
+        self._capacity = [float(q) for q in (per_minute, per_day) if q]
+        self._clock = clock
+        self._sleep = sleep
+        # tokens of every bucket followed by the time each was last refilled
+        self._state = ctx.Array('d', self._capacity + [clock()] * len(self._capacity))
+
+    def try_acquire(self) -> float:
+        n = len(self._rates)
+        with self._state.get_lock():
+            now = self._clock()
+            tokens = [min(self._capacity[i], self._state[i] + (now - self._state[n + i]) * self._rates[i])
+                      for i in range(n)]
+            wait = max([(1 - t) / r for t, r in zip(tokens, self._rates) if t < 1], default=0.0)
+            for i in range(n):
+                self._state[i] = tokens[i] - (1 if wait == 0 else 0)
+                self._state[n + i] = now
+            return wait
+
+
+@dataclass
+class FetchResult:
+    '''
+    Outcome of fetching a single key (usually a ticker).
+
+    Attributes
+    ----------
+    key : Any
+        the key passed to the fetch function
+
+    value : Any
+        the value returned by the fetch function, None if it failed
+
+    latency : float
+        wall time in seconds spent in the fetch function
+
+    error : Exception
+        the exception raised by the fetch function, None if it succeeded
+    '''
+    key: Any
+    value: Any = None
+    latency: float = 0.0
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def fetch_concurrent(fetch: Callable[[Any], Any], keys: Iterable, max_workers: int = 8,
+                     limiter: Optional[RateLimiter] = None) -> List[FetchResult]:
+    '''
+    Calls `fetch(key)` for every key on a thread pool and returns the results in key order.
+
+    Parameters
+    ----------
+    fetch : callable
+        function taking a single key, usually it sends one request to alpha vantage
+
+    keys : iterable
+        keys to fetch, e.g. a list of tickers
+
+    max_workers : int, optional
+        size of the thread pool, 1 runs the keys serially. Default is 8.
+
+    limiter : RateLimiter, optional
+        if passed, a token is acquired before each call to fetch
+
+    Returns
+    -------
+    List of FetchResult, one per key and in the same order as keys.
+    '''
+    keys = list(keys)
+
+    def run(key):
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            value = fetch(key)
+        except Exception as e:
+            return FetchResult(key, None, time.perf_counter() - start, e)
+        return FetchResult(key, value, time.perf_counter() - start)
+
+    if max_workers <= 1 or len(keys) <= 1:
+        return [run(k) for k in keys]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as pool:
+        return list(pool.map(run, keys))
+
+
+async def gather_results(fetch: Callable[[Any], Awaitable], keys: Iterable,
+                         max_concurrency: Optional[int] = None) -> List[FetchResult]:
+    '''
+    Awaits `fetch(key)` for every key concurrently with asyncio.gather and returns the
+    results in key order, the asyncio counterpart of fetch_concurrent.
+
+    Parameters
+    ----------
+    fetch : coroutine function
+        function taking a single key
+
+    keys : iterable
+        keys to fetch, e.g. a list of tickers
+
+    max_concurrency : int, optional
+        maximum number of fetches awaited at once, None means no limit
+
+    Returns
+    -------
+    List of FetchResult, one per key and in the same order as keys.
+    '''
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def run(key):
+        start = time.perf_counter()
+        try:
+            if semaphore is None:
+                value = await fetch(key)
+            else:
+                async with semaphore:
+                    value = await fetch(key)
+        except Exception as e:
+            return FetchResult(key, None, time.perf_counter() - start, e)
+        return FetchResult(key, value, time.perf_counter() - start)
+
+    return list(await asyncio.gather(*(run(k) for k in keys)))
+
+
+class SingleFlight:
+    '''
+    Coalesces identical concurrent calls from threads. While a call for a key is in flight,
+    other callers with the same key wait for it and get its result (or its exception)
+    instead of running their own.
+
+        flights = SingleFlight()
+        data = flights.do(cache_key(params), lambda: send(params))
+
+    Attributes
+    ----------
+    shared : int
+        number of calls that were served by another caller's call
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0
+
+    def do(self, key, fn: Callable[[], Any]):
+        '''Calls fn() unless a call for key is already in flight, then waits for that one.'''
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class AsyncSingleFlight:
+    '''
+    The asyncio counterpart of SingleFlight, identical concurrent coroutines share one
+    task. In flight calls are tracked per event loop. Cancelling one waiting caller
+    doesn't cancel the shared call while others still wait on it.
+    '''
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+        self.shared = 0
+
+    async def do(self, key, fn: Callable[[], Awaitable]):
+        '''Awaits fn() unless a call for key is already in flight, then awaits that one.'''
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+
+def report_frame(results: List[FetchResult]) -> pd.DataFrame:
+    '''Builds a dataframe of key, latency, ok and error from a list of FetchResult.'''
+    return pd.DataFrame({'key': [r.key for r in results],
+                         'latency': [r.latency for r in results],
+                         'ok': [r.ok for r in results],
+                         'error': [None if r.ok else repr(r.error) for r in results]}).set_index('key')
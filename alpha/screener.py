@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Screening engine over the latest fundamentals of many tickers.
+
+FundamentalsTable keeps one row per ticker, the latest income statement, balance sheet and
+cash flow report plus the previous year's values needed for growth rates, as a columnar
+table of NumPy arrays. Common ratios (P/E, FCF yield, debt/equity, growth, ...) are
+computed once for all tickers when the table is built, and each of them gets a sorted
+index, so a comparison like `pe < 15` is a binary search instead of a scan.
+
+Screens are written as expressions over column and ratio names and evaluated vectorized
+across every ticker:
+
+    table = equities.fundamentals_table()
+    table.screen('pe < 15 and fcf_yield > 0.05 and debt_to_equity < 1')
+"""
+
+import ast
+import functools
+import operator
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from alpha.store import ColumnStore
+
+
+# statement fields used by the ratios, values of the previous report get a _prev suffix
+GROWTH_FIELDS = ('totalRevenue', 'netIncome', 'operatingCashflow')
+
+
+def _div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.asarray(a, dtype='float64') / b
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def _debt(c: dict) -> np.ndarray:
+    # total debt when reported, else long plus short term debt
+    total = c['shortLongTermDebtTotal']
+    return np.where(np.isnan(total), c['longTermDebt'] + np.nan_to_num(c['shortTermDebt']), total)
+
+
+def _positive(a: np.ndarray) -> np.ndarray:
+    return np.where(a > 0, a, np.nan)
+
+
+# ratios computed for every ticker when a table is built, each is indexed.
+# pe is NaN for tickers without positive earnings, so they never pass a pe screen
+RATIOS = {
+    'pe': lambda c: _div(c['market_cap'], _positive(c['netIncome'])),
+    'pb': lambda c: _div(c['market_cap'], c['totalShareholderEquity']),
+    'ps': lambda c: _div(c['market_cap'], c['totalRevenue']),
+    'fcf': lambda c: c['operatingCashflow'] - c['capitalExpenditures'],
+    'fcf_yield': lambda c: _div(c['operatingCashflow'] - c['capitalExpenditures'], c['market_cap']),
+    'debt_to_equity': lambda c: _div(_debt(c), c['totalShareholderEquity']),
+    'current_ratio': lambda c: _div(c['totalCurrentAssets'], c['totalCurrentLiabilities']),
+    'net_margin': lambda c: _div(c['netIncome'], c['totalRevenue']),
+    'roe': lambda c: _div(c['netIncome'], c['totalShareholderEquity']),
+    'revenue_growth': lambda c: _div(c['totalRevenue'], c['totalRevenue_prev']) - 1,
+    'earnings_growth': lambda c: _div(c['netIncome'], np.abs(c['netIncome_prev'])) - np.sign(c['netIncome_prev']),
+    'cashflow_growth': lambda c: _div(c['operatingCashflow'], c['operatingCashflow_prev']) - 1,
+}
+
+
+class _SortedIndex:
+    '''Positions of a column sorted by value, NaN values are left out.'''
+
+    def __init__(self, values: np.ndarray):
+        order = np.argsort(values, kind='stable')
+        valid = int(np.count_nonzero(~np.isnan(values)))
+        self.order = order[:valid]
+        self.values = values[self.order]
+
+    def positions(self, op: str, value: float) -> np.ndarray:
+        ss = self.values.searchsorted
+        if op == '<':
+            return self.order[:ss(value, 'left')]
+        if op == '<=':
+            return self.order[:ss(value, 'right')]
+        if op == '>':
+            return self.order[ss(value, 'right'):]
+        if op == '>=':
+            return self.order[ss(value, 'left'):]
+        if op == '==':
+            return self.order[ss(value, 'left'):ss(value, 'right')]
+        # '!=', everything but the equal run
+        return np.concatenate([self.order[:ss(value, 'left')], self.order[ss(value, 'right'):]])
+
+
+_COMPARE = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!='}
+_FLIP = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+_NUMPY_COMPARE = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+                  '==': operator.eq, '!=': operator.ne}
+_ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: _div}
+
+
+@functools.lru_cache(maxsize=256)
+def _parse(expression: str) -> ast.AST:
+    return ast.parse(expression, mode='eval').body
+
+
+class FundamentalsTable:
+    '''
+    Latest fundamentals of many tickers as a columnar table with indexed ratios.
+
+    Parameters
+    ----------
+    tickers : list
+        ticker of each row
+
+    columns : dict
+        column name to a float64 array with one value per ticker
+
+    as_of : array, optional
+        fiscalDateEnding of the latest report of each ticker
+    '''
+
+    def __init__(self, tickers, columns: Dict[str, np.ndarray], as_of=None):
+        self.tickers = pd.Index(tickers, name='ticker')
+        self.as_of = np.full(len(self.tickers), np.datetime64('NaT'), dtype='datetime64[s]') \
+            if as_of is None else np.asarray(as_of, dtype='datetime64[s]')
+        self.columns = {k: np.asarray(v, dtype='float64') for k, v in columns.items()}
+        missing = np.full(len(self.tickers), np.nan)
+
+        needed = {k: self.columns.get(k, missing) for k in
+                  ('market_cap', 'netIncome', 'totalShareholderEquity', 'totalRevenue', 'operatingCashflow',
+                   'capitalExpenditures', 'shortLongTermDebtTotal', 'longTermDebt', 'shortTermDebt',
+                   'totalCurrentAssets', 'totalCurrentLiabilities') + tuple(f'{f}_prev' for f in GROWTH_FIELDS)}
+        for name, ratio in RATIOS.items():
+            if name not in self.columns:
+                self.columns[name] = ratio(needed)
+
+        self._indexes = {name: _SortedIndex(self.columns[name]) for name in RATIOS}
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @classmethod
+    def from_frames(cls, income: Optional[pd.DataFrame] = None, balance: Optional[pd.DataFrame] = None,
+                    cashflow: Optional[pd.DataFrame] = None, overview: Optional[pd.DataFrame] = None,
+                    prices: Optional[pd.Series] = None, period: str = 'annual') -> 'FundamentalsTable':
+        '''
+        Builds a table from the frames returned by the Equities fundamentals methods.
+
+        Parameters
+        ----------
+        income, balance, cashflow : pandas.DataFrame, optional
+            frames indexed by (ticker, fiscalDateEnding), e.g. Equities.get_income_statement()
+
+        overview : pandas.DataFrame, optional
+            Equities.get_overview(), used for the market capitalization
+
+        prices : pandas.Series, optional
+            latest price per ticker, the market capitalization of tickers missing from the
+            overview is price * commonStockSharesOutstanding
+
+        period : str, optional
+            reports used, 'annual' or 'quarterly'. Growth rates compare the latest report
+            with the one before it. Default is 'annual'
+
+        Returns
+        -------
+        FundamentalsTable
+        '''
+        latest, previous, as_of = [], [], []
+        for df in (income, balance, cashflow):
+            if df is None or df.empty:
+                continue
+            if 'period' in df.columns:
+                df = df[df['period'] == period]
+            df = df.select_dtypes('number').sort_index()
+            # last and second to last report of every ticker, one groupby pass each
+            grouped = df.groupby(level='ticker', sort=False)
+            last = grouped.nth(-1)
+            as_of.append(last.index.to_frame(index=False).set_index('ticker').iloc[:, 0])
+            latest.append(last.droplevel(1))
+            previous.append(grouped.nth(-2).droplevel(1))
+
+        frame = pd.concat(latest, axis=1) if latest else pd.DataFrame()
+        # a field reported by two statements (e.g. netIncome) keeps the first
+        frame = frame.loc[:, ~frame.columns.duplicated()]
+        prev = pd.concat(previous, axis=1) if previous else pd.DataFrame()
+        prev = prev.loc[:, ~prev.columns.duplicated()]
+
+        tickers = frame.index.union(overview.index if overview is not None else []).unique()
+        frame = frame.reindex(tickers)
+        columns = {c: frame[c].to_numpy(dtype='float64') for c in frame.columns}
+        for f in GROWTH_FIELDS:
+            if f in prev.columns:
+                columns[f'{f}_prev'] = prev[f].reindex(tickers).to_numpy(dtype='float64')
+
+        market_cap = np.full(len(tickers), np.nan)
+        if overview is not None and 'MarketCapitalization' in overview.columns:
+            market_cap = overview['MarketCapitalization'].reindex(tickers).to_numpy(dtype='float64')
+        if prices is not None and 'commonStockSharesOutstanding' in columns:
+            from_price = prices.reindex(tickers).to_numpy(dtype='float64') * columns['commonStockSharesOutstanding']
+            market_cap = np.where(np.isnan(market_cap), from_price, market_cap)
+        columns['market_cap'] = market_cap
+
+        dates = pd.concat(as_of, axis=1).max(axis=1).reindex(tickers) if as_of else None
+        return cls(tickers, columns, None if dates is None else dates.to_numpy(dtype='datetime64[s]'))
+
+    def index_column(self, name: str):
+        '''Builds a sorted index on a column so comparisons on it use a binary search.'''
+        self._indexes[name] = _SortedIndex(self._column(name))
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise KeyError(f'{name} is not a column of the table, columns are {sorted(self.columns)}')
+        return self.columns[name]
+
+    def _mask(self, node) -> np.ndarray:
+        if isinstance(node, ast.BoolOp):
+            masks = [self._mask(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return functools.reduce(combine, masks)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            # a missing value fails the negated comparison too, not only the comparison
+            return ~self._mask(node.operand) & self._known(node.operand)
+        if isinstance(node, ast.Compare):
+            mask = None
+            left = node.left
+            for op, right in zip(node.ops, node.comparators):
+                if type(op) not in _COMPARE:
+                    raise ValueError(f'unsupported comparison in screen: {ast.unparse(node)}')
+                m = self._compare(left, _COMPARE[type(op)], right)
+                mask = m if mask is None else mask & m
+                left = right
+            return mask
+        raise ValueError(f'a screen must be made of comparisons, got: {ast.unparse(node)}')
+
+    def _known(self, node) -> np.ndarray:
+        '''Tickers with a value in every column node refers to.'''
+        known = np.ones(len(self), dtype=bool)
+        for name in {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}:
+            known &= ~np.isnan(self._column(name))
+        return known
+
+    def _compare(self, left, op: str, right) -> np.ndarray:
+        # column <op> number uses the sorted index of the column when there is one
+        if isinstance(left, ast.Constant) and isinstance(right, ast.Name):
+            left, right, op = right, left, _FLIP[op]
+        if isinstance(left, ast.Name) and isinstance(right, ast.Constant) and left.id in self._indexes:
+            mask = np.zeros(len(self), dtype=bool)
+            mask[self._indexes[left.id].positions(op, float(right.value))] = True
+            return mask
+        with np.errstate(invalid='ignore'):
+            # NaN compares False, except for != which is left out explicitly
+            a, b = self._value(left), self._value(right)
+            return _NUMPY_COMPARE[op](a, b) & ~np.isnan(a) & ~np.isnan(b)
+
+    def _value(self, node):
+        if isinstance(node, ast.Name):
+            return self._column(node.id)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return np.full(len(self), float(node.value))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self._value(node.operand)
+        if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+            return _ARITHMETIC[type(node.op)](self._value(node.left), self._value(node.right))
+        raise ValueError(f'unsupported expression in screen: {ast.unparse(node)}')
+
+    def mask(self, expression: str) -> np.ndarray:
+        '''Evaluates a screen expression, returns a boolean array with one value per ticker.'''
+        return self._mask(_parse(expression))
+
+    def screen(self, expression: str, columns: Optional[list] = None, sort: Optional[str] = None,
+               ascending: bool = True, limit: Optional[int] = None) -> pd.DataFrame:
+        '''
+        Returns the tickers passing a screen.
+
+        Parameters
+        ----------
+        expression : str
+            comparisons of columns, ratios and numbers joined with and, or and not, e.g.
+            'pe < 15 and fcf_yield > 0.05 and (debt_to_equity < 1 or current_ratio > 2)'.
+            Arithmetic between columns is allowed, e.g. 'fcf > 0.5 * netIncome'. Tickers
+            with a missing value fail every comparison on it, negated or not.
+
+        columns : list, optional
+            columns of the result, default is every ratio
+
+        sort : str, optional
+            column to sort the result by
+
+        ascending : bool, optional
+            sort order. Default is True
+
+        limit : int, optional
+            maximum number of rows returned
+
+        Returns
+        -------
+        pandas.DataFrame indexed by ticker
+        '''
+        positions = np.flatnonzero(self.mask(expression))
+        if sort is not None:
+            values = self._column(sort)[positions]
+            # NaN sorts last either way
+            order = np.argsort(values if ascending else -values, kind='stable')
+            positions = positions[order]
+        if limit is not None:
+            positions = positions[:limit]
+        names = list(RATIOS) if columns is None else columns
+        return pd.DataFrame({c: self._column(c)[positions] for c in names},
+                            index=self.tickers[positions])
+
+    def to_frame(self) -> pd.DataFrame:
+        '''The whole table, one row per ticker.'''
+        df = pd.DataFrame(self.columns, index=self.tickers)
+        df.insert(0, 'as_of', self.as_of)
+        return df
+
+    def save(self, store: ColumnStore, partition: str = 'latest'):
+        '''Writes the table to the 'fundamentals_table' dataset of a column store.'''
+        df = pd.DataFrame(self.columns)
+        df.insert(0, 'ticker', np.asarray(self.tickers, dtype=object))
+        df.index = pd.DatetimeIndex(self.as_of, name='as_of')
+        store.write('fundamentals_table', partition, df)
+
+    @classmethod
+    def load(cls, store: ColumnStore, partition: str = 'latest') -> Optional['FundamentalsTable']:
+        '''Reads a table written with save, or None if there is none.'''
+        df = store.read('fundamentals_table', partition, mmap=False)
+        if df is None:
+            return None
+        columns = {c: df[c].to_numpy() for c in df.columns if c != 'ticker'}
+        return cls(df['ticker'].to_numpy(), columns, df.index.to_numpy())
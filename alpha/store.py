@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar local store for fetched equity and economic series.
+
+Every dataset (e.g. 'daily_adjusted', 'cash_flow', 'economic') is split into one
+partition per symbol or series. A partition is a directory holding one .npy file per
+column plus the sorted datetime index, so readers memory-map only the columns they ask
+for and slice a date range with a binary search on the index, without parsing any json.
+
+Parquet/Arrow would need pyarrow, which alpha does not depend on; .npy files give the
+same column pruning and zero-copy memory-mapped reads with numpy alone.
+
+    root/
+        daily_adjusted/
+            IBM/
+                _meta.json
+                _index.npy
+                open.npy
+                adjusted_close.npy
+                currency.npy
+                currency.na.npy     missing values of a string column, if it has any
+                ...
+"""
+
+import json
+import os
+import re
+import shutil
+import uuid
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from alpha.cache import default_cache_dir
+
+
+_META = '_meta.json'
+_INDEX = '_index.npy'
+# boolean mask of the missing values of a string column, next to its column file
+_MISSING = '{}.na.npy'
+
+
+def partition_name(params: dict) -> str:
+    '''Builds a partition name from query parameters, e.g. TREASURY_YIELD-monthly-10year.'''
+    parts = [str(params['function'])] + [str(v) for k, v in sorted(params.items())
+                                         if k not in ('function', 'apikey')]
+    return '-'.join(parts)
+
+
+def safe_name(name) -> str:
+    '''Makes a name portable as a file or directory name, other characters become _.'''
+    return re.sub(r'[^A-Za-z0-9._=-]', '_', str(name))
+
+
+class ColumnStore:
+    '''
+    Stores dataframes with a datetime index as memory-mappable columns, one partition
+    per symbol or series.
+
+    Parameters
+    ----------
+    root : str, optional
+        directory of the store. Default is ~/.cache/alpha/store
+    '''
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.path.join(default_cache_dir(), 'store')
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, dataset: str, partition: str) -> str:
+        return os.path.join(self.root, safe_name(dataset), safe_name(partition))
+
+    def write(self, dataset: str, partition: str, df: pd.DataFrame):
+        '''
+        Writes df as the partition, replacing it if it exists. Rows are stored sorted by
+        the index, string columns are stored as fixed width unicode so they can be mapped,
+        with a mask of their missing values so those are read back as missing.
+
+        Parameters
+        ----------
+        dataset : str
+            e.g. 'daily_adjusted'
+
+        partition : str
+            e.g. the ticker
+
+        df : pandas.DataFrame
+            frame with a datetime index
+        '''
+        df = df.sort_index(kind='stable')
+        path = self._path(dataset, partition)
+        tmp = f'{path}.tmp-{uuid.uuid4().hex}'
+        os.makedirs(tmp)
+
+        np.save(os.path.join(tmp, _INDEX), np.asarray(df.index.values))
+        missing = []
+        for c in df.columns:
+            values = df[c].to_numpy()
+            if values.dtype == object:
+                na = pd.isna(values)
+                if na.any():
+                    # astype(str) would store None and nan as the strings 'None' and 'nan'
+                    values = np.where(na, '', values)
+                    np.save(os.path.join(tmp, _MISSING.format(c)), na)
+                    missing.append(str(c))
+                values = values.astype(str)
+            np.save(os.path.join(tmp, f'{c}.npy'), values)
+        with open(os.path.join(tmp, _META), 'w') as f:
+            json.dump({'index': df.index.name, 'columns': [str(c) for c in df.columns],
+                       'missing': missing, 'rows': len(df)}, f)
+
+        # swap the new partition in, then drop the old one
+        old = f'{path}.old-{uuid.uuid4().hex}'
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def exists(self, dataset: str, partition: str) -> bool:
+        return os.path.exists(os.path.join(self._path(dataset, partition), _META))
+
+    def read(self, dataset: str, partition: str, columns: Optional[list] = None,
+             start=None, end=None, mmap: bool = True) -> Optional[pd.DataFrame]:
+        '''
+        Reads a partition, or None if it doesn't exist.
+
+        Parameters
+        ----------
+        columns : list, optional
+            columns to load, default is all columns
+
+        start, end : str or datetime, optional
+            inclusive bounds of the index, found with a binary search
+
+        mmap : bool, optional
+            if True the columns are memory mapped (read only) instead of read into memory
+
+        Returns
+        -------
+        pandas.DataFrame sorted by its index
+        '''
+        path = self._path(dataset, partition)
+        try:
+            with open(os.path.join(path, _META)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        mode = 'r' if mmap else None
+        index = np.load(os.path.join(path, _INDEX), mmap_mode=mode)
+        lo, hi = 0, len(index)
+        if start is not None:
+            lo = int(np.searchsorted(index, np.datetime64(pd.Timestamp(start)), side='left'))
+        if end is not None:
+            hi = int(np.searchsorted(index, np.datetime64(pd.Timestamp(end)), side='right'))
+
+        data = {}
+        missing = set(meta.get('missing', ()))
+        for c in (meta['columns'] if columns is None else columns):
+            values = np.load(os.path.join(path, f'{c}.npy'), mmap_mode=mode)[lo:hi]
+            if values.dtype.kind == 'U':
+                values = values.astype(object)
+                if c in missing:
+                    values[np.load(os.path.join(path, _MISSING.format(c)), mmap_mode=mode)[lo:hi]] = None
+            data[c] = values
+
+        return pd.DataFrame(data, index=pd.DatetimeIndex(index[lo:hi], name=meta['index']), copy=False)
+
+    def read_many(self, dataset: str, partitions: Optional[Iterable[str]] = None, columns: Optional[list] = None,
+                  start=None, end=None, key: str = 'ticker', mmap: bool = True) -> pd.DataFrame:
+        '''
+        Reads several partitions into one long frame with a categorical key column naming the
+        partition. Partitions that don't exist are skipped. Default is every partition of the dataset.
+        '''
+        frames, names = [], []
+        for p in (self.partitions(dataset) if partitions is None else partitions):
+            df = self.read(dataset, p, columns=columns, start=start, end=end, mmap=mmap)
+            if df is not None:
+                frames.append(df)
+                names.append(p)
+        if not frames:
+            return pd.DataFrame()
+
+        out = pd.concat(frames)
+        # a categorical key stores each partition name once instead of once per row
+        codes = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+        out[key] = pd.Categorical.from_codes(codes, categories=names)
+        return out
+
+    def partitions(self, dataset: str) -> list:
+        path = os.path.join(self.root, safe_name(dataset))
+        if not os.path.isdir(path):
+            return []
+        return sorted(p for p in os.listdir(path)
+                      if '.tmp-' not in p and '.old-' not in p and os.path.exists(os.path.join(path, p, _META)))
+
+    def delete(self, dataset: str, partition: str):
+        shutil.rmtree(self._path(dataset, partition), ignore_errors=True)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming decoder for large time series responses.
+
+A full TIME_SERIES_DAILY_ADJUSTED response is several megabytes. Decoding it with
+r.json() keeps the whole dict tree alive next to the dataframe built from it. The
+decoder here reads the response body chunk by chunk, decodes one bar at a time out
+of the time series object and writes its values into preallocated NumPy columns, so
+only the current chunk and the columns are held in memory. Because alpha vantage
+returns the newest bar first, reading can stop as soon as bars fall before a start date.
+"""
+
+import codecs
+import json
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from alpha import parsing
+
+
+_WHITESPACE = ' \t\n\r'
+
+
+class ContainerNotFound(Exception):
+    '''Raised when the response has no time series object, e.g. a throttle or error payload.'''
+
+    def __init__(self, payload):
+        super().__init__(f'time series not found in response: {payload}')
+        self.payload = payload
+
+
+class _Reader:
+    '''Incrementally decoded text buffer over an iterable of byte chunks.'''
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        '''Reads the next chunk, dropping consumed text. Returns False at the end of the stream.'''
+        if self.exhausted:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.exhausted = True
+            chunk = b''
+        self.text = self.text[self.pos:] + self._decoder.decode(chunk, final=self.exhausted)
+        self.pos = 0
+        return True
+
+    def skip_whitespace(self):
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def decode_value(self, decoder: json.JSONDecoder):
+        '''Decodes the next json value, reading more chunks while the value is incomplete.'''
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and not self.exhausted and not isinstance(value, (dict, list, str)):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def find(self, token: str) -> bool:
+        '''Moves past the next occurrence of token, returns False if the stream ends first.
+        The text searched is kept until the token is found, so read_all can still return it.'''
+        start = self.pos
+        while True:
+            i = self.text.find(token, start)
+            if i >= 0:
+                self.pos = i + len(token)
+                return True
+            # search again from a tail in case the token spans two chunks,
+            # fill drops text[:pos] so shift the offset with it
+            start = max(start, len(self.text) - len(token) + 1) - self.pos
+            if not self.fill():
+                return False
+
+    def read_all(self) -> str:
+        while self.fill():
+            pass
+        return self.text
+
+
+class _Column:
+    '''A preallocated column that grows by doubling.'''
+
+    def __init__(self, dtype: str, capacity: int):
+        self.dtype = dtype
+        self.values = np.empty(capacity, dtype=object if dtype == 'str' else dtype)
+
+    def set(self, i: int, raw):
+        if i >= len(self.values):
+            self.values = np.resize(self.values, 2 * len(self.values))
+        try:
+            self.values[i] = raw
+        except (ValueError, TypeError):
+            if self.values.dtype.kind in 'iu':
+                # integers can't hold NaN, promote the column
+                self.values = self.values.astype('float64')
+            self.values[i] = np.nan
+
+    def array(self, n: int) -> np.ndarray:
+        return self.values[:n]
+
+
+def stream_time_series(chunks: Iterable[bytes], schema: parsing.Schema = parsing.DAILY_ADJUSTED,
+                       stop_before: Optional[str] = None, skip_after: Optional[str] = None,
+                       capacity: int = 8192) -> pd.DataFrame:
+    '''
+    Decodes the time series object of a response body into a typed dataframe.
+
+    Parameters
+    ----------
+    chunks : iterable of bytes
+        the response body, e.g. r.iter_content(chunk_size=65536) of a streamed request
+
+    schema : parsing.Schema, optional
+        schema of the bars, schema.container is the key of the time series object.
+        Default is parsing.DAILY_ADJUSTED
+
+    stop_before : str, optional
+        ISO date, decoding stops at the first bar older than this date. Bars are
+        expected newest first as alpha vantage returns them.
+
+    skip_after : str, optional
+        ISO date, bars newer than this date are skipped without being converted
+
+    capacity : int, optional
+        number of rows preallocated, the columns grow by doubling when exceeded
+
+    Returns
+    -------
+    pandas.DataFrame with the same columns, dtypes and order as parsing.parse_time_series
+
+    Raises
+    ------
+    ContainerNotFound if the response has no time series object, the decoded payload
+    is attached to the exception
+    '''
+    reader = _Reader(chunks)
+    decoder = json.JSONDecoder()
+
+    if not reader.find(json.dumps(schema.container)):
+        raise ContainerNotFound(json.loads(reader.read_all() or 'null'))
+    for token in ':{':
+        if reader.peek() != token:
+            raise json.JSONDecodeError(f'expected "{token}"', reader.text, reader.pos)
+        reader.pos += 1
+
+    index = _Column(schema.index.dtype, capacity)
+    columns = [(f, _Column(f.dtype, capacity)) for f in schema.fields]
+    n = 0
+    while True:
+        c = reader.peek()
+        if c == ',':
+            reader.pos += 1
+            continue
+        if c == '}' or c == '':
+            break
+
+        key = reader.decode_value(decoder)
+        if reader.peek() != ':':
+            raise json.JSONDecodeError('expected ":"', reader.text, reader.pos)
+        reader.pos += 1
+        bar = reader.decode_value(decoder)
+
+        if stop_before is not None and key[:len(stop_before)] < stop_before:
+            break
+        if skip_after is not None and key[:len(skip_after)] > skip_after:
+            continue
+
+        index.set(n, key)
+        for f, col in columns:
+            col.set(n, bar.get(f.source))
+        n += 1
+
+    data = {f.name: col.array(n) for f, col in columns}
+    idx = pd.DatetimeIndex(index.array(n), name=schema.index.name) \
+        if schema.index.dtype.startswith('datetime64') else pd.Index(index.array(n), name=schema.index.name)
+    return pd.DataFrame(data, index=idx, copy=False)
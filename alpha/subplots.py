@@ -3,14 +3,74 @@
 Created on Thu Oct 13 09:03:12 2022
 @author: Korey
 """
-import requests
 import pandas as pd
-import plotly as plt
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
 import numpy as np
 
-def build_subplots(data, render_type='browser', subplot_height=375, title=''):
+# plotly is imported by the functions that draw, so fetch-only code that imports alpha
+# (and downsample_lttb) doesn't pay for it
+
+
+def default_colors() -> list:
+    '''Returns plotly's default trace colors, importing plotly on first use.'''
+    import plotly
+    return plotly.colors.DEFAULT_PLOTLY_COLORS
+
+def downsample_lttb(series: pd.Series, n_out: int) -> pd.Series:
+    '''
+    Downsamples a series to n_out points with the largest triangle three buckets algorithm,
+    which keeps the visual shape (peaks and troughs) of a line far better than taking every
+    n-th point.
+
+    Parameters
+    ----------
+    series : pandas.Series
+        series with a numeric or datetime index, sorted either way
+
+    n_out : int
+        number of points to keep, at least 3. Series with n_out or fewer points are returned as is.
+
+    Returns
+    -------
+    pandas.Series of the selected points
+    '''
+    if n_out >= series.shape[0] or n_out < 3:
+        return series
+    series = series.dropna()
+    n = series.shape[0]
+    if n_out >= n:
+        return series
+
+    x = series.index.to_numpy()
+    x = x.astype('datetime64[ns]').astype(np.int64).astype(np.float64) if x.dtype.kind == 'M' \
+        else x.astype(np.float64)
+    y = series.to_numpy(dtype=np.float64)
+
+    # first and last points are always kept, the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # the average of the following bucket is the third point of each triangle,
+    # the last bucket is followed by the last point
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges), x[-1])[1:]
+    avg_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges), y[-1])[1:]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[a] - avg_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[b] - y[a]))
+        a = lo + int(area.argmax())
+        selected[b + 1] = a
+
+    return series.iloc[selected]
+
+
+def _axis_ref(i: int, axis: str) -> str:
+    # make_subplots numbers axes row by row, subplot i uses x{i}/y{i} (the first is just x/y)
+    return axis if i == 1 else f'{axis}{i}'
+
+
+def build_subplots(data, render_type=None, subplot_height=375, title='',
+                   webgl_threshold: int = None, max_points: int = None):
     ''' Outputs a figure object which is a subplot of the different data sets and series   provided.   
 
     Parameters
@@ -33,9 +93,11 @@ def build_subplots(data, render_type='browser', subplot_height=375, title=''):
                    'title': t}]
         
     render_type : str, optional
-        This is the render type that is used by plotly to determine how to view the figure. More 
-        information can be found here: https://plotly.com/python/renderers/
-        The default is 'browser'.
+        If passed, it is made plotly's default renderer (plotly.io.renderers.default), the one
+        fig.show() uses. That is global state shared by every figure of the process, prefer
+        fig.show(renderer=...) or alpha.export. More information can be found here:
+        https://plotly.com/python/renderers/
+        The default is None, which leaves the renderer alone.
         
     subplot_height : int, optional
         This is the height of each subplot. The default is 375.
@@ -43,28 +105,41 @@ def build_subplots(data, render_type='browser', subplot_height=375, title=''):
     title : str, optional
         Title for the figure, not the individual subplot title
 
+    webgl_threshold : int, optional
+        series with more points than this are drawn with go.Scattergl (WebGL) instead of
+        go.Scatter (SVG). None always uses go.Scatter. The default is None.
+
+    max_points : int, optional
+        series with more points than this are downsampled with downsample_lttb, e.g. to the
+        pixel width of a subplot. The max/min/current values are computed before downsampling.
+        None keeps every point. The default is None.
+
     Returns
     -------
     Plotly figure
 
     '''
 
+    import plotly as plt
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
+
     # these are the render types that are available by default in plotly,
-    # default is browser, if an incorrect value is passed throw an exception
+    # if an incorrect value is passed throw an exception
     render_type_options = ['plotly_mimetype', 'jupyterlab', 'nteract', 'vscode',
                            'notebook', 'notebook_connected', 'kaggle', 'azure', 'colab',
                            'cocalc', 'databricks', 'json', 'png', 'jpeg', 'jpg', 'svg',
                            'pdf', 'browser', 'firefox', 'chrome', 'chromium', 'iframe',
                            'iframe_connected', 'sphinx_gallery', 'sphinx_gallery_png']
 
-    if render_type in render_type_options:
-        plt.io.renderers.default = render_type
-    else:
+    if render_type is not None and render_type not in render_type_options:
         raise ValueError(
             f"render_type={render_type} is not a valid option. Valid options are {render_type_options}")
+    if render_type is not None:
+        plt.io.renderers.default = render_type
 
-    # based on how much data passed, determine the row_count
-    row_count = (len(data) + 1) // 2
+    # based on how much data passed, determine the row_count, an empty grid if there is no data
+    row_count = max((len(data) + 1) // 2, 1)
 
     # control the height of the figure based on the number of rows
     fig_height = row_count * subplot_height
@@ -75,6 +150,11 @@ def build_subplots(data, render_type='browser', subplot_height=375, title=''):
     # create the fig object by calling make subplots, pass in row count, col count, and titles
     fig = make_subplots(rows=row_count, cols=2, subplot_titles=titles)
 
+    # traces, annotations and trendline shapes are collected and added to the figure in
+    # one batch at the end, adding them one by one re-validates the whole figure each time
+    traces, rows, cols = [], [], []
+    annotations, shapes = [], []
+
     # iterate through items in data array and build subplots
     for i, k in enumerate(data, start=1):
 
@@ -92,6 +172,8 @@ def build_subplots(data, render_type='browser', subplot_height=375, title=''):
         else:
             col_place = 2
 
+        xref, yref = _axis_ref(i, 'x'), _axis_ref(i, 'y')
+
         # each subplot can have one or many series, for each series add a trace to that subplot
         
         # TODO - this should be rewritten to be consistent with using a pandas series, 
@@ -99,8 +181,6 @@ def build_subplots(data, render_type='browser', subplot_height=375, title=''):
         # with a single feature, selecting from multiple columns shouldn't be required
         
         for s in subplot_data:
-            #print(s)
-            #breakpoint()
             
             trace_data = None
             
@@ -117,89 +197,72 @@ def build_subplots(data, render_type='browser', subplot_height=375, title=''):
                 raise ValueError(
                     f"Series data is not a pandas dataframe or series.")
             
-            #current_val = s['series']['value'][0]
-            current_val = trace_data[0]
+            current_val = trace_data.iloc[0]
             
             # if a color is passed - use it
             line_dict = {}
             if 'line-color' in s:
                 line_dict['color']=s['line-color']
-            
-            
-            fig.add_trace(go.Scatter(x=trace_data.index, #s['series'].index,
-                                     y=trace_data, #s['series']['value'],
-                                     name=s['legend-name'],
-                                     showlegend=False,
-                                     line=line_dict,# TODO - fix this so subplots legends can be shown
-                                     ),
-                          row=row_place,
-                          col=col_place)
+
+            plot_data = trace_data
+            if max_points is not None and plot_data.shape[0] > max_points:
+                plot_data = downsample_lttb(plot_data, max_points)
+
+            scatter = go.Scatter
+            if webgl_threshold is not None and plot_data.shape[0] > webgl_threshold:
+                scatter = go.Scattergl
+
+            traces.append(scatter(x=plot_data.index,
+                                  y=plot_data.to_numpy(),
+                                  name=s['legend-name'],
+                                  showlegend=False,
+                                  line=line_dict,# TODO - fix this so subplots legends can be shown
+                                  ))
+            rows.append(row_place)
+            cols.append(col_place)
 
             if 'max-trendline' in s or 'min-trendline' in s:
 
                 # TODO - break this out, you only get current if you want a trendline
-                fig.add_annotation(xref='x domain',
-                                   yref='y domain',
-                                   x=1.0,
-                                   y=1.09,
-                                   text='Current:' + str(current_val),
-                                   showarrow=False,
-                                   row=row_place,
-                                   col=col_place)
-
-            if 'max-trendline' in s:
-
-                # from dataframe col get max and create a list where every element is the max number
-                max_val = round(trace_data.max(), 2)
-                max_line = [max_val]*trace_data.shape[0]
-
-                delta_max = round(((1 - (max_val/current_val))*100), 2)
-
-                fig.add_trace(go.Scatter(x=trace_data.index,
-                                         y=max_line,
-                                         name='Max Value',
-                                         line=dict(color='white', width=.5),
-                                         showlegend=False,  # TODO - fix this so subplots legends can be shown
-                                         ),
-                              row=row_place,
-                              col=col_place)
-
-                fig.add_annotation(xref='x domain',
-                                   yref='y domain',
-                                   x=0.01,
-                                   y=1.2,
-                                   text=f'Max: {str(max_val)}({str(delta_max)}%)',
-                                   showarrow=False,
-                                   row=row_place,
-                                   col=col_place)
-
-            if 'min-trendline' in s:
-
-                # from dataframe col get min and create a list where every element is the max number
-                min_val = round(trace_data.min(), 2)
-                min_line = [min_val]*trace_data.shape[0]
-
-                delta_min = round(((1 - (min_val/current_val))*100), 2)
-
-                fig.add_trace(go.Scatter(x=trace_data.index,
-                                         y=min_line,
-                                         name='Min Value',
-                                         line=dict(color='white', width=.5),
-                                         showlegend=False,  # TODO - fix this so subplots legends can be shown
-                                         ),
-                              row=row_place,
-                              col=col_place)
-
-                fig.add_annotation(xref='x domain',
-                                   yref='y domain',
-                                   x=0.01,
-                                   y=1.1,
-                                   text=f'Min: {str(min_val)}({str(delta_min)}%)',
-                                   showarrow=False,
-                                   row=row_place,
-                                   col=col_place)
+                annotations.append(dict(xref=f'{xref} domain',
+                                        yref=f'{yref} domain',
+                                        x=1.0,
+                                        y=1.09,
+                                        text='Current:' + str(current_val),
+                                        showarrow=False))
+
+            # trendlines are two point shapes spanning the subplot instead of a trace
+            # with one point per row of the series
+            for key, label, agg, y in (('max-trendline', 'Max', trace_data.max, 1.2),
+                                       ('min-trendline', 'Min', trace_data.min, 1.1)):
+                if key not in s:
+                    continue
+
+                val = round(agg(), 2)
+                delta = round(((1 - (val/current_val))*100), 2)
+
+                shapes.append(dict(type='line',
+                                   xref=f'{xref} domain',
+                                   yref=yref,
+                                   x0=0,
+                                   x1=1,
+                                   y0=val,
+                                   y1=val,
+                                   line=dict(color='white', width=.5)))
+
+                annotations.append(dict(xref=f'{xref} domain',
+                                        yref=f'{yref} domain',
+                                        x=0.01,
+                                        y=y,
+                                        text=f'{label}: {str(val)}({str(delta)}%)',
+                                        showarrow=False))
+
+    if traces:
+        fig.add_traces(traces, rows=rows, cols=cols)
 
     fig.update_layout(
+        annotations=list(fig.layout.annotations) + annotations,
+        shapes=shapes,
         template="plotly_dark",
         height=fig_height,
         title_text=title)
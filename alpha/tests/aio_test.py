@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the asyncio variants in alpha.aio, these use a fake aiohttp session.
+"""
+
+import asyncio
+import unittest
+
+import pandas as pd
+
+from alpha import aio
+from alpha.cache import ResponseCache
+from alpha.scheduler import RateLimiter
+from alpha.tests.fakes import (FakeAsyncResponse, FakeAsyncSession, FakeClock, daily_adjusted_payload,
+                              intraday_payload)
+from alpha.transport import ThrottleError
+
+
+DATES = ['2022-10-05', '2022-10-06', '2022-10-07']
+
+
+def _responder(params):
+    f = params['function']
+    if f == 'TIME_SERIES_DAILY_ADJUSTED':
+        if params['symbol'] == 'BAD':
+            return {'Error Message': 'Invalid API call.'}
+        return daily_adjusted_payload(DATES, [1.0, 2.0, 3.0])
+    if f == 'CASH_FLOW':
+        return {'annualReports': [{'fiscalDateEnding': '2021-12-31', 'reportedCurrency': 'USD',
+                                   'operatingCashflow': '5', 'netIncome': '3'}],
+                'quarterlyReports': []}
+    if f == 'OVERVIEW':
+        return {'Symbol': params['symbol'], 'MarketCapitalization': '100'}
+    return {'data': [{'date': '2022-02-01', 'value': '2'}, {'date': '2022-01-01', 'value': '1'}]}
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestAsyncTransport(unittest.TestCase):
+
+    def test_throttle_retry_and_error(self):
+        session = FakeAsyncSession(lambda params: {'Note': 'call frequency is 5 calls per minute'})
+        sleeps = []
+
+        async def sleep(s):
+            sleeps.append(s)
+
+        transport = aio.AsyncTransport(session=session, max_retries=2, backoff=1, sleep=sleep)
+        with self.assertRaises(ThrottleError):
+            _run(transport.get_json({'function': 'CPI'}, 'demo'))
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual(sleeps, [1, 2])
+
+    def test_retry_status(self):
+        responses = [FakeAsyncResponse({}, status=503), {'data': []}]
+        session = FakeAsyncSession(lambda params: responses.pop(0))
+
+        async def sleep(s):
+            pass
+
+        transport = aio.AsyncTransport(session=session, sleep=sleep)
+        self.assertEqual(_run(transport.get_json({'function': 'CPI'}, 'demo')), {'data': []})
+        self.assertEqual(len(session.calls), 2)
+
+    def test_cache_and_api_key(self):
+        session = FakeAsyncSession(_responder)
+        transport = aio.AsyncTransport(session=session, cache=ResponseCache(':memory:'))
+
+        async def twice():
+            await transport.get_json({'function': 'CPI'}, 'secret')
+            return await transport.get_json({'function': 'CPI'}, 'secret')
+
+        self.assertIn('data', _run(twice()))
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(session.calls[0]['apikey'], 'secret')
+
+    def test_shared_rate_limiter(self):
+        clock = FakeClock()
+        limiter = RateLimiter(per_minute=2, clock=clock, sleep=clock.sleep)
+        waits = []
+
+        async def sleep(s):
+            waits.append(s)
+            clock.sleep(s)
+
+        transport = aio.AsyncTransport(session=FakeAsyncSession(_responder), rate_limiter=limiter, sleep=sleep)
+
+        async def three():
+            for _ in range(3):
+                await transport.get_json({'function': 'CPI'}, 'demo')
+
+        _run(three())
+        # the synchronous side takes from the same buckets
+        self.assertEqual(len(waits), 1)
+        self.assertGreater(limiter.try_acquire(), 0)
+
+
+class TestAsyncEquities(unittest.TestCase):
+
+    def setUp(self):
+        self.session = FakeAsyncSession(_responder, delay=.01)
+        self.transport = aio.AsyncTransport(session=self.session)
+
+    def test_daily_adjusted_matches_sync_parsing(self):
+        equities = aio.AsyncEquities('demo', ['IBM', 'BAD', 'AAPL'], transport=self.transport)
+        df = _run(equities.get_time_series_daily_adjusted(start='2022-10-06'))
+        self.assertEqual(list(df['ticker'].unique()), ['IBM', 'AAPL'])
+        self.assertEqual(len(df), 4)
+        self.assertEqual(df['volume'].dtype, 'int64')
+        self.assertFalse(equities.last_fetch[1].ok)
+        # tickers are requested concurrently
+        self.assertEqual(self.session.peak, 3)
+
+    def test_concurrency_limit(self):
+        equities = aio.AsyncEquities('demo', [f'T{i}' for i in range(10)], max_workers=4, transport=self.transport)
+        json = _run(equities.get_time_series_daily_adjusted(dataframe=False))
+        self.assertEqual(len(json), 10)
+        self.assertEqual(self.session.peak, 4)
+
+    def test_fundamentals_and_overview(self):
+        equities = aio.AsyncEquities('demo', ['IBM'], transport=self.transport)
+
+        async def both():
+            return await asyncio.gather(equities.get_cashflow(), equities.get_overview())
+
+        cf, overview = _run(both())
+        self.assertEqual(cf.loc[('IBM', pd.Timestamp('2021-12-31')), 'operatingCashflow'], 5)
+        self.assertEqual(overview.loc['IBM', 'MarketCapitalization'], 100)
+        table = _run(equities.fundamentals_table())
+        self.assertEqual(list(table.screen('pe > 0').index), ['IBM'])
+
+    def test_subplot_and_price_matrix(self):
+        equities = aio.AsyncEquities('demo', ['IBM', 'AAPL'], transport=self.transport)
+        fig = _run(equities.daily_adjusted_subplot(indicators=['sma_2']))
+        self.assertEqual(len(fig.data), 4)
+        prices = _run(equities.price_matrix())
+        self.assertEqual(list(prices.columns), ['IBM', 'AAPL'])
+
+    def test_intraday_month_slices(self):
+        def responder(params):
+            month = params['month']
+            return intraday_payload('5min', [f'{month}-02 09:30:00', f'{month}-02 09:35:00'], [1.0, 2.0])
+
+        session = FakeAsyncSession(responder, delay=.01)
+        equities = aio.AsyncEquities('demo', ['IBM', 'AAPL'], transport=aio.AsyncTransport(session=session))
+        df = _run(equities.get_time_series_intraday('5min', months=['2024-01', '2024-02']))
+        self.assertEqual(len(df), 8)
+        self.assertEqual(session.peak, 4)
+
+    def test_incremental_and_stream_not_accepted(self):
+        equities = aio.AsyncEquities('demo', ['IBM'], transport=self.transport)
+        with self.assertRaises(TypeError):
+            equities.get_time_series_daily_adjusted(incremental=True)
+        with self.assertRaises(TypeError):
+            equities.get_time_series_daily_adjusted(stream=True)
+
+
+class TestAsyncEconomics(unittest.TestCase):
+
+    def test_indicators_and_panel(self):
+        session = FakeAsyncSession(_responder, delay=.01)
+        econ = aio.AsyncEconomics('demo', transport=aio.AsyncTransport(session=session))
+
+        async def run():
+            return await asyncio.gather(econ.cpi(), econ.real_gdp(dataframe=False),
+                                        econ.macro_panel(['cpi', 'inflation']))
+
+        cpi, gdp, panel = _run(run())
+        self.assertEqual(cpi['value'].tolist(), [2.0, 1.0])
+        self.assertIn('data', gdp)
+        self.assertEqual(list(panel.columns), ['cpi', 'inflation'])
+        self.assertEqual(len(panel), 2)
+        # cpi is requested by both econ.cpi() and the panel, they share one request
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual(session.peak, 3)
+
+    def test_single_flight(self):
+        session = FakeAsyncSession(_responder, delay=.01)
+        econ = aio.AsyncEconomics('demo', transport=aio.AsyncTransport(session=session))
+        other = aio.AsyncEconomics('demo', transport=aio.AsyncTransport(session=session))
+
+        async def run():
+            return await asyncio.gather(*[e.treasury_yield(maturity='10year') for e in (econ, other) * 5])
+
+        frames = _run(run())
+        self.assertEqual(len(session.calls), 1)
+        for f in frames[1:]:
+            pd.testing.assert_frame_equal(f, frames[0])
+
+        unshared = aio.AsyncEconomics('demo', transport=aio.AsyncTransport(session=session, single_flight=False))
+
+        async def run_unshared():
+            return await asyncio.gather(unshared.cpi(), unshared.cpi())
+
+        _run(run_unshared())
+        self.assertEqual(len(session.calls), 3)
+
+        # requests made with another key are not shared
+        keyed = aio.AsyncEconomics('other', transport=aio.AsyncTransport(session=session))
+
+        async def run_keys():
+            return await asyncio.gather(econ.cpi(), keyed.cpi(), keyed.cpi())
+
+        _run(run_keys())
+        self.assertEqual(sorted(c['apikey'] for c in session.calls[3:]), ['demo', 'other'])
+
+
+if __name__ == '__main__':
+    unittest.main()
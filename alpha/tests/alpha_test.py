@@ -4,64 +4,70 @@ Created on Wed Sep 28 05:49:11 2022
 @author: Korey
 
 Description:
-    This is a script for running test scripts for the economics module. To
-    execute this script go to a cli or conda and navigate to this directory.
-    Then run the script as follows:
-        {python version} -m unittest alpha_test.py
+    This is a script for running test scripts for the economics module. These
+    tests call the live alpha vantage api and are skipped unless an api key is set
+    in the ALPHA_VANTAGE_API_KEY environment variable. Run them from the repository
+    root as follows:
+        ALPHA_VANTAGE_API_KEY={api key} {python version} -m unittest alpha.tests.alpha_test
         
 
 """
 
+import os
 import unittest
-from core import core_api as a
-from core import subplots
+from alpha import core_api as a
+from alpha import subplots
 
-# TODO - pass api_key as an arg
+API_KEY = os.environ.get('ALPHA_VANTAGE_API_KEY')
 
+live = unittest.skipUnless(API_KEY, 'set ALPHA_VANTAGE_API_KEY to run the tests that call alpha vantage')
+
+
+@live
 class TestAlpha(unittest.TestCase):
 
     def test_real_gdp_no_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.real_gdp(dataframe=False)
         self.assertIn('data', r)
 
     def test_real_gdp_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.real_gdp(dataframe=True)
         self.assertIsInstance(r.shape, tuple)
         
     def test_retail_sales_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.retail_sales(dataframe=True)
         self.assertIsInstance(r.shape, tuple)
         
     def test_retail_sales_no_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.retail_sales(dataframe=False)
         self.assertIsInstance(r, dict)
         
     def test_inflation_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.retail_sales(dataframe=True)
         self.assertIsInstance(r.shape, tuple)
         
     def test_inflation_no_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.retail_sales(dataframe=False)
         self.assertIsInstance(r, dict)
         
     def test_cpi_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.cpi()
         self.assertIsInstance(r.shape, tuple)
            
     def test_cpi_no_df(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.cpi(dataframe=False)
         self.assertIsInstance(r, dict)
     
     def test_cpi_semiannual(self):
-        econ = a.Economics(api_key='296ULICGSB63VL7A')
+        econ = a.Economics(api_key=API_KEY)
         r = econ.cpi(interval='semiannual')
         self.assertIsInstance(r.shape, tuple)
         
@@ -75,8 +81,10 @@ class TestAlpha(unittest.TestCase):
         # econ.real_gdp
         # equities.get_time_series_daily
         # equities.subplot
-        
-        
+
+
+class TestSubplots(unittest.TestCase):
+
     def test_alpha_subplot_rendererror(self):
         with self.assertRaises(ValueError):
             subplots.build_subplots(data='',render_type='error')
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for alpha.analytics.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import analytics
+
+
+def _long(prices: dict):
+    # long frame newest bar first, as Equities returns it
+    frames = [pd.DataFrame({'adjusted_close': p, 'ticker': t}, index=p.index).iloc[::-1]
+              for t, p in prices.items()]
+    return pd.concat(frames)
+
+
+class TestPriceMatrix(unittest.TestCase):
+
+    def test_pivot_aligns_dates(self):
+        dates = pd.bdate_range('2022-01-03', periods=5)
+        long = _long({'IBM': pd.Series([1., 2, 3, 4, 5], index=dates),
+                      'AAPL': pd.Series([10., 11], index=dates[3:])})
+        m = analytics.price_matrix(long)
+        self.assertEqual(list(m.columns), ['IBM', 'AAPL'])
+        self.assertTrue(m.index.is_monotonic_increasing)
+        self.assertEqual(m['IBM'].tolist(), [1, 2, 3, 4, 5])
+        self.assertTrue(m['AAPL'].iloc[:3].isna().all())
+        self.assertEqual(m['AAPL'].iloc[3:].tolist(), [10, 11])
+
+    def test_empty(self):
+        self.assertTrue(analytics.price_matrix(pd.DataFrame()).empty)
+
+
+class TestStatistics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        dates = pd.bdate_range('2020-01-01', periods=300)
+        mkt = rng.normal(0, .01, len(dates))
+        rets = {'SPY': mkt, 'A': 2 * mkt, 'B': .5 * mkt + rng.normal(0, .001, len(dates))}
+        self.prices = pd.DataFrame({k: 100 * np.exp(np.cumsum(v)) for k, v in rets.items()}, index=dates)
+
+    def test_returns(self):
+        simple = analytics.returns(self.prices, 'simple')
+        log = analytics.returns(self.prices, 'log')
+        self.assertTrue(simple.iloc[0].isna().all())
+        np.testing.assert_allclose(simple.iloc[1:], self.prices.pct_change().iloc[1:])
+        np.testing.assert_allclose(np.log1p(simple.iloc[1:]), log.iloc[1:])
+        with self.assertRaises(ValueError):
+            analytics.returns(self.prices, 'excess')
+
+    def test_rolling_volatility(self):
+        rets = analytics.returns(self.prices)
+        vol = analytics.rolling_volatility(rets, window=21, annualize=False)
+        np.testing.assert_allclose(vol.iloc[-1], rets.iloc[-21:].std())
+
+    def test_rolling_beta(self):
+        rets = analytics.returns(self.prices)
+        beta = analytics.rolling_beta(rets, 'SPY', window=63)
+        self.assertTrue(beta.iloc[:62].isna().all().all())
+        np.testing.assert_allclose(beta['A'].iloc[63:], 2)
+        self.assertAlmostEqual(beta['B'].iloc[-1], .5, places=1)
+        expected = rets['B'].rolling(63).cov(rets['SPY']) / rets['SPY'].rolling(63).var()
+        np.testing.assert_allclose(beta['B'].iloc[63:], expected.iloc[63:])
+
+    def test_beta_skips_missing_periods(self):
+        rets = analytics.returns(self.prices)
+        rets.iloc[:100, 1] = np.nan
+        np.testing.assert_allclose(analytics.beta(rets, 'SPY')['A'], 2)
+
+    def test_max_drawdown(self):
+        prices = pd.DataFrame({'A': [100., 120, 60, 90, 130]})
+        self.assertAlmostEqual(analytics.max_drawdown(prices)['A'], -.5)
+
+    def test_sharpe_ratio(self):
+        rets = pd.DataFrame({'A': [.01, .02, .03, .02]})
+        expected = rets['A'].mean() / rets['A'].std() * np.sqrt(252)
+        self.assertAlmostEqual(analytics.sharpe_ratio(rets)['A'], expected)
+
+    def test_summary(self):
+        out = analytics.summary(self.prices, benchmark='SPY')
+        self.assertEqual(list(out.index), ['SPY', 'A', 'B'])
+        self.assertAlmostEqual(out.loc['A', 'beta'], 2)
+        self.assertAlmostEqual(out.loc['SPY', 'beta'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
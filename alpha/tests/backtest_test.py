@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the vectorized backtester and parameter sweeps.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import backtest
+
+
+def _prices():
+    index = pd.bdate_range('2024-01-01', periods=6)
+    return pd.DataFrame({'A': [100, 110, 99, 99, 108.9, 119.79], 'B': [50, 50, 55, 60.5, 60.5, 54.45]},
+                        index=index, dtype='float64')
+
+
+def _random_prices(n=300, m=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(100 * np.exp(rng.normal(0.0005, 0.02, (n, m)).cumsum(axis=0)),
+                        index=pd.bdate_range('2020-01-01', periods=n), columns=[f'T{i}' for i in range(m)])
+
+
+class TestRun(unittest.TestCase):
+
+    def test_buy_and_hold_follows_the_price(self):
+        prices = _prices()
+        result = backtest.run(prices, pd.DataFrame({'A': 1.0}, index=prices.index), lag=0)
+        np.testing.assert_allclose(result.equity, prices['A'] / 100)
+        # bought once on the first close, held after that
+        self.assertEqual(result.turnover.tolist(), [1.0, 0, 0, 0, 0, 0])
+
+    def test_costs_and_drift(self):
+        prices = _prices()
+        weights = pd.DataFrame(0.5, index=prices.index, columns=prices.columns)
+        result = backtest.run(prices, weights, cost_bps=10, initial=100)
+
+        rets = prices.pct_change().fillna(0)
+        held = weights.shift(1).fillna(0)
+        gross = (held * rets).sum(axis=1)
+        drifted = held.shift(1).fillna(0) * (1 + rets.shift(1).fillna(0))
+        drifted = drifted.div(1 + gross.shift(1).fillna(0), axis=0)
+        turnover = (held - drifted).abs().sum(axis=1)
+
+        np.testing.assert_allclose(result.turnover, turnover)
+        np.testing.assert_allclose(result.costs, turnover * 0.001)
+        np.testing.assert_allclose(result.equity, 100 * (1 + gross - turnover * 0.001).cumprod())
+        # the first day buys into both, the next ones only trade back what drifted
+        self.assertAlmostEqual(result.turnover.iloc[1], 1.0)
+        self.assertLess(result.turnover.iloc[2:].max(), 0.11)
+
+        stats = result.stats()
+        self.assertEqual(list(stats.index), backtest.STATS)
+        self.assertAlmostEqual(stats['total_return'], result.equity.iloc[-1] / 100 - 1)
+        self.assertAlmostEqual(stats['total_costs'], result.costs.sum())
+
+    def test_lag_avoids_look_ahead(self):
+        prices = _random_prices()
+        # perfect foresight: hold whatever goes up over the same date
+        foresight = (prices.pct_change() > 0).astype(float)
+        self.assertGreater(backtest.run(prices, foresight, lag=0).equity.iloc[-1], 100)
+        self.assertLess(backtest.run(prices, foresight, lag=1).equity.iloc[-1], 10)
+
+        with self.assertRaises(ValueError):
+            backtest.run(prices, np.ones((2, 2)))
+
+
+class TestStrategies(unittest.TestCase):
+
+    def test_crossover_and_momentum(self):
+        prices = _random_prices()
+        weights = backtest.moving_average_crossover(prices, 10, 50)
+        self.assertTrue((weights.iloc[:49] == 0).all().all())
+        sums = weights.sum(axis=1)
+        self.assertTrue(np.allclose(sums[sums > 0], 1))
+
+        weights = backtest.momentum(prices, lookback=20, top=3, every=5)
+        trailing = (prices / prices.shift(20) - 1).iloc[100]
+        self.assertEqual(set(weights.iloc[100][weights.iloc[100] > 0].index), set(trailing.nlargest(3).index))
+        # held between rebalances
+        pd.testing.assert_series_equal(weights.iloc[101], weights.iloc[100], check_names=False)
+
+        with self.assertRaises(ValueError):
+            backtest.moving_average_crossover(prices, 50, 10)
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_parallel_matches_inline(self):
+        prices = _random_prices()
+        grid = {'fast': [5, 10, 60], 'slow': [20, 50]}
+        inline = backtest.sweep(prices, backtest.moving_average_crossover, grid, cost_bps=5, processes=0)
+        parallel = backtest.sweep(prices, backtest.moving_average_crossover, grid, cost_bps=5, processes=2,
+                                  chunk_size=2)
+
+        self.assertEqual(list(inline.columns), ['fast', 'slow'] + backtest.STATS + ['error'])
+        pd.testing.assert_frame_equal(inline, parallel)
+        # fast=60 isn't shorter than either slow
+        self.assertEqual(inline['error'].notna().sum(), 2)
+
+        result = backtest.run(prices, backtest.moving_average_crossover(prices, 10, 50), cost_bps=5)
+        row = inline[(inline['fast'] == 10) & (inline['slow'] == 50)].iloc[0]
+        np.testing.assert_allclose(row[backtest.STATS].to_numpy(dtype=float), result.stats().to_numpy())
+        # the inline sweep leaves no prices behind in the module
+        self.assertEqual(backtest._sweep, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the batch refresh runner and its command line, run against the benchmarks mock
+server so they do not call alpha vantage.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from alpha import batch
+from alpha.__main__ import main
+from alpha.benchmarks.payloads import Payloads
+from alpha.benchmarks.server import MockServer
+from alpha.store import ColumnStore
+from alpha.tests.fakes import FakeSession
+from alpha.transport import Transport
+
+
+class BadSymbolPayloads(Payloads):
+    '''Synthetic payloads, except an error for the symbol BAD.'''
+
+    def payload(self, params: dict) -> dict:
+        if params.get('symbol') == 'BAD':
+            return {'Error Message': 'Invalid API call.'}
+        return super().payload(params)
+
+
+SYMBOLS = ['IBM', 'AAPL', 'BAD', 'MSFT', 'SPY']
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = MockServer(BadSymbolPayloads(bars=30, points=12)).start()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def _refresh(self, **kwargs):
+        kwargs = dict(dict(store_root=self.tmp.name, processes=2, threads=2, chunk_size=2, per_minute=10000,
+                           run_id='nightly', base_url=self.server.url), **kwargs)
+        return batch.refresh(SYMBOLS, ['daily_adjusted', 'cash_flow', 'macro'], 'demo', **kwargs)
+
+    def test_read_universe(self):
+        path = os.path.join(self.tmp.name, 'universe.csv')
+        with open(path, 'w') as f:
+            f.write('symbol,name\n# etfs last\nIBM,International Business Machines\n\nAAPL,Apple\nIBM,dup\nSPY\n')
+        self.assertEqual(batch.read_universe(path), ['IBM', 'AAPL', 'SPY'])
+
+    def test_refresh_and_resume(self):
+        report = self._refresh()
+
+        self.assertEqual(len(report), 2 * len(SYMBOLS) + len(batch.MACRO_INDICATORS))
+        failed = report[~report['ok']]
+        self.assertEqual(sorted(failed['endpoint']), ['cash_flow', 'daily_adjusted'])
+        self.assertTrue((failed['key'] == 'BAD').all())
+
+        store = ColumnStore(self.tmp.name)
+        self.assertEqual(sorted(store.partitions('daily_adjusted')), sorted(set(SYMBOLS) - {'BAD'}))
+        self.assertEqual(len(store.read('daily_adjusted', 'IBM')), 30)
+        self.assertEqual(len(store.partitions('economic')), len(batch.MACRO_INDICATORS))
+        self.assertTrue(os.path.exists(batch.checkpoint_path(self.tmp.name, 'nightly')))
+
+        # the next session of the run only retries what failed
+        requests = self.server.requests
+        again = self._refresh(processes=0)
+        self.assertEqual(sorted(again['endpoint']), ['cash_flow', 'daily_adjusted'])
+        self.assertEqual(self.server.requests - requests, 2)
+
+        # a half written last line of an interrupted session is ignored
+        with open(batch.checkpoint_path(self.tmp.name, 'nightly'), 'a') as f:
+            f.write('{"endpoint": "cash_fl')
+        self.assertEqual(len(self._refresh(processes=0)), 2)
+
+        self.assertEqual(len(self._refresh(restart=True)), len(report))
+
+    def test_macro_indicators_fetched_concurrently(self):
+        barrier = threading.Barrier(3, timeout=2)
+
+        def responder(params):
+            # fails unless the three indicators are requested at the same time
+            barrier.wait()
+            return {'data': [{'date': '2024-01-01', 'value': '1.5'}]}
+
+        names = ['cpi', 'inflation', 'retail_sales']
+        batch._worker.update(api_key='demo', store=ColumnStore(self.tmp.name), threads=3,
+                             transport=Transport(session=FakeSession(responder)))
+        try:
+            rows = batch._run_task(batch.MACRO, names)
+        finally:
+            batch._worker.clear()
+        self.assertEqual([r['key'] for r in rows], names)
+        self.assertTrue(all(r['ok'] for r in rows))
+
+    def test_command_line(self):
+        universe = os.path.join(self.tmp.name, 'universe.txt')
+        with open(universe, 'w') as f:
+            f.write('IBM\nAAPL\n')
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main(['refresh', universe, '--endpoints', 'daily_adjusted,macro', '--api-key', 'demo',
+                         '--store', self.tmp.name, '--processes', '0', '--base-url', self.server.url])
+        self.assertEqual(code, 0)
+        self.assertIn(f'{2 + len(batch.MACRO_INDICATORS)} fetched, 0 failed', out.getvalue())
+
+        with self.assertRaises(ValueError):
+            batch.refresh(['IBM'], ['nope'], 'demo', store_root=self.tmp.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the benchmark suite and its local stand-in server, these do not call alpha vantage.
+"""
+
+import os
+import tempfile
+import unittest
+
+from alpha import core_api as a
+from alpha.benchmarks import payloads, suite
+from alpha.benchmarks.server import MockServer
+from alpha.transport import ThrottleError, Transport
+
+
+class TestMockServer(unittest.TestCase):
+
+    def test_serves_synthetic_payloads_and_throttles(self):
+        with MockServer(payloads.Payloads(bars=50), throttle_every=2) as server:
+            transport = Transport(base_url=server.url, rate_limiter=None, backoff=0.001)
+            equities = a.Equities('bench', ['IBM', 'AAPL'], max_workers=2, transport=transport)
+            df = equities.get_time_series_daily_adjusted()
+            # the second request is throttled and retried
+            self.assertEqual(server.requests, 3)
+            self.assertEqual(server.throttled, 1)
+
+        self.assertEqual(len(df), 100)
+        self.assertEqual(df.index.max().strftime('%Y-%m-%d'), payloads.END)
+
+        with MockServer(throttle_every=1) as server:
+            transport = Transport(base_url=server.url, rate_limiter=None, max_retries=1, backoff=0.001)
+            with self.assertRaises(ThrottleError):
+                a.Economics('bench', transport=transport).cpi()
+
+    def test_replays_recordings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            payloads.record(tmp, {'function': 'CPI', 'interval': 'monthly'},
+                            {'data': [{'date': '2022-01-01', 'value': '1.5'}]})
+            with MockServer(payloads.Payloads(recordings=tmp, points=10)) as server:
+                econ = a.Economics('bench', transport=Transport(base_url=server.url, rate_limiter=None))
+                self.assertEqual(econ.cpi()['value'].tolist(), [1.5])
+                self.assertEqual(len(econ.inflation()), 10)
+
+    def test_synthetic_payloads_are_deterministic(self):
+        self.assertEqual(payloads.daily_adjusted('IBM', 10), payloads.daily_adjusted('IBM', 10))
+        self.assertNotEqual(payloads.daily_adjusted('IBM', 10), payloads.daily_adjusted('AAPL', 10))
+        self.assertEqual(len(payloads.cash_flow('IBM', 5)['quarterlyReports']), 20)
+
+
+class TestSuite(unittest.TestCase):
+
+    def test_run_save_compare(self):
+        results = suite.run(tickers=(1, 2), sizes=(20,), repeat=1)
+        self.assertEqual(set(results['benchmark']), set(suite.BENCHMARKS))
+        self.assertTrue((results['wall'] > 0).all())
+        daily = results[results['benchmark'] == 'daily_adjusted'].set_index('tickers')
+        self.assertEqual(daily.loc[2, 'requests'], 4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.jsonl')
+            suite.save(results, path, 'before')
+            suite.save(results, path, 'after')
+            out = suite.compare(path, 'before', 'after')
+            self.assertEqual(len(out), len(results))
+            self.assertTrue((out['wall_ratio'] == 1).all())
+
+        with self.assertRaises(ValueError):
+            suite.run(benchmarks=['nope'])
+
+
+class TestColdImport(unittest.TestCase):
+
+    def test_fetching_does_not_import_plotly(self):
+        self.assertEqual(suite.cold_import('import alpha')['loaded'], [])
+
+        fetch = suite.cold_import('import alpha; alpha.Equities, alpha.Economics, alpha.subplots.downsample_lttb')
+        self.assertNotIn('plotly', fetch['loaded'])
+        self.assertIn('pandas', fetch['loaded'])
+        self.assertGreater(fetch['seconds'], 0)
+
+        plot = suite.cold_import('import pandas as pd; from alpha import subplots; '
+                                 'subplots.build_subplots([{"subplot": [{"series": pd.Series([1.0, 2.0]), '
+                                 '"legend-name": "x"}], "title": "x"}])')
+        self.assertIn('plotly', plot['loaded'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the persistent response cache, these do not call alpha vantage.
+"""
+
+import os
+import tempfile
+import unittest
+
+from alpha import core_api as a
+from alpha.cache import ResponseCache
+from alpha.tests.fakes import FakeClock, FakeSession
+from alpha.transport import Transport
+
+class TestCache(unittest.TestCase):
+
+    def test_ttl_per_function(self):
+        clock = FakeClock()
+        cache = ResponseCache(':memory:', ttl={'CPI': 100, 'TIME_SERIES_INTRADAY': 10}, clock=clock)
+        cache.set({'function': 'CPI'}, {'data': [1]})
+        cache.set({'function': 'TIME_SERIES_INTRADAY', 'symbol': 'IBM'}, {'x': 1})
+        clock.now += 50
+        self.assertEqual(cache.get({'function': 'CPI'}), {'data': [1]})
+        self.assertIsNone(cache.get({'function': 'TIME_SERIES_INTRADAY', 'symbol': 'IBM'}))
+        self.assertEqual(cache.purge_expired(), 1)
+
+    def test_key_ignores_apikey_and_order(self):
+        cache = ResponseCache(':memory:')
+        cache.set({'function': 'TREASURY_YIELD', 'interval': 'monthly', 'maturity': '2year'}, {'data': []})
+        self.assertIsNotNone(cache.get({'maturity': '2year', 'function': 'TREASURY_YIELD',
+                                        'interval': 'monthly', 'apikey': 'x'}))
+        self.assertIsNone(cache.get({'function': 'TREASURY_YIELD', 'interval': 'monthly', 'maturity': '5year'}))
+
+    def test_throttle_payload_not_cached(self):
+        cache = ResponseCache(':memory:')
+        self.assertFalse(cache.set({'function': 'CPI'}, {'Note': 'slow down'}))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        clock = FakeClock()
+        cache = ResponseCache(':memory:', max_entries=2, clock=clock)
+        for symbol in ['A', 'B']:
+            clock.now += 1
+            cache.set({'function': 'CASH_FLOW', 'symbol': symbol}, {'symbol': symbol})
+        clock.now += 1
+        cache.get({'function': 'CASH_FLOW', 'symbol': 'A'})
+        clock.now += 1
+        cache.set({'function': 'CASH_FLOW', 'symbol': 'C'}, {'symbol': 'C'})
+        self.assertIsNone(cache.get({'function': 'CASH_FLOW', 'symbol': 'B'}))
+        self.assertIsNotNone(cache.get({'function': 'CASH_FLOW', 'symbol': 'A'}))
+
+    def test_warm_economics_call_skips_network(self):
+        with tempfile.TemporaryDirectory() as d:
+            cache = ResponseCache(os.path.join(d, 'cache.sqlite'))
+            session = FakeSession(lambda params: {'data': [{'date': '2022-01-01', 'value': '1.5'}]})
+            first = a.Economics('demo', transport=Transport(cache=cache, session=session)).cpi()
+            second = a.Economics('demo', transport=Transport(cache=cache, session=session)).cpi()
+            self.assertEqual(len(session.calls), 1)
+            self.assertTrue(first.equals(second))
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
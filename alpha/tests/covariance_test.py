@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for alpha.covariance.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha.covariance import RollingCovariance
+
+
+def _returns(rows=300, cols=6, seed=0):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, .01, (rows, 1))
+    values = common + rng.normal(0, .01, (rows, cols))
+    return pd.DataFrame(values, index=pd.bdate_range('2021-01-01', periods=rows),
+                        columns=[f'T{i}' for i in range(cols)])
+
+
+class TestRollingCovariance(unittest.TestCase):
+
+    def test_window_or_halflife_required(self):
+        with self.assertRaises(ValueError):
+            RollingCovariance(['A'])
+        with self.assertRaises(ValueError):
+            RollingCovariance(['A'], window=10, halflife=5)
+
+    def test_fixed_window_matches_pandas(self):
+        rets = _returns()
+        cov = RollingCovariance(rets.columns, window=60)
+        for date, row in rets.iterrows():
+            cov.update(row, date)
+        np.testing.assert_allclose(cov.covariance(), rets.iloc[-60:].cov(), atol=1e-15)
+        np.testing.assert_allclose(cov.correlation(), rets.iloc[-60:].corr(), atol=1e-12)
+        self.assertEqual(cov.last, rets.index[-1])
+
+    def test_update_many_then_update(self):
+        rets = _returns()
+        cov = RollingCovariance(rets.columns, window=60)
+        cov.update_many(rets.iloc[:250])
+        for date, row in rets.iloc[250:].iterrows():
+            cov.update(row, date)
+        np.testing.assert_allclose(cov.covariance(), rets.iloc[-60:].cov(), atol=1e-15)
+
+    def test_missing_returns_are_pairwise(self):
+        rets = _returns(rows=100)
+        rets.iloc[:40, 2] = np.nan
+        rets.iloc[70, 4] = np.nan
+        cov = RollingCovariance(rets.columns, window=100)
+        cov.update_many(rets)
+        np.testing.assert_allclose(cov.covariance(), rets.cov(), atol=1e-15)
+        np.testing.assert_allclose(cov.correlation(), rets.corr(), atol=1e-12)
+        self.assertEqual(cov.periods.loc['T2', 'T4'], 59)
+
+    def test_series_rows_are_aligned(self):
+        cov = RollingCovariance(['A', 'B'], window=5)
+        cov.update(pd.Series({'B': 2.0, 'A': 1.0}))
+        cov.update(pd.Series({'A': 2.0}))
+        self.assertEqual(cov.periods.loc['A', 'A'], 2)
+        self.assertEqual(cov.periods.loc['A', 'B'], 1)
+
+    def test_exponential_weights(self):
+        rets = _returns()
+        block = RollingCovariance(rets.columns, halflife=20)
+        block.update_many(rets)
+        rows = RollingCovariance(rets.columns, halflife=20)
+        for _, row in rets.iterrows():
+            rows.update(row)
+        np.testing.assert_allclose(block.covariance(), rows.covariance(), atol=1e-15)
+        # recent bars dominate, the estimate follows a change in volatility
+        calm = RollingCovariance(rets.columns, halflife=20)
+        calm.update_many(pd.concat([rets, rets.iloc[-60:] * 5]))
+        self.assertGreater(calm.covariance().iloc[0, 0], 10 * block.covariance().iloc[0, 0])
+
+    def test_shrinkage(self):
+        rets = _returns(rows=40, cols=60)
+        cov = RollingCovariance(rets.columns, window=40)
+        cov.update_many(rets)
+        a = cov.shrinkage_intensity()
+        self.assertTrue(0 < a < 1)
+        shrunk = cov.shrunk()
+        # more tickers than bars, the sample covariance is singular but the shrunk one is not
+        self.assertLess(np.linalg.matrix_rank(cov.covariance().to_numpy()), 60)
+        self.assertEqual(np.linalg.matrix_rank(shrunk.to_numpy()), 60)
+        np.testing.assert_allclose(cov.shrunk(intensity=0), cov.covariance())
+
+
+if __name__ == '__main__':
+    unittest.main()
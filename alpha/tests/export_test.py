@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the parallel figure export pipeline.
+"""
+
+import functools
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from alpha import export, subplots
+
+
+def _figure(seed, n=50):
+    # module level so worker processes can build it
+    series = pd.Series(np.random.default_rng(seed).normal(size=n).cumsum(), name='value',
+                       index=pd.bdate_range('2024-01-01', periods=n))
+    return subplots.build_subplots([{'subplot': [{'series': series, 'legend-name': f's{seed}'}],
+                                     'title': f't{seed}'}])
+
+
+def _broken():
+    raise RuntimeError('no data')
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_html_share_one_bundle(self):
+        before = pio.renderers.default
+        figures = {'IBM': functools.partial(_figure, 1), 'AAPL': _figure(2), 'macro/cpi': _figure(3).to_dict(),
+                   'broken': _broken}
+        report = export.export_figures(figures, self.tmp.name, formats=('html', 'json'), processes=2)
+
+        self.assertEqual(list(report['name']), ['IBM', 'IBM', 'AAPL', 'AAPL', 'macro/cpi', 'macro/cpi',
+                                                'broken', 'broken'])
+        ok = report[report['error'].isna()]
+        self.assertEqual(len(ok), 6)
+        self.assertTrue(report.loc[report['name'] == 'broken', 'error'].str.contains('no data').all())
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'macro_cpi.html')))
+
+        bundles = [f for f in os.listdir(self.tmp.name) if f.endswith('.min.js')]
+        self.assertEqual(len(bundles), 1)
+        for path in ok.loc[ok['format'] == 'html', 'path']:
+            with open(path) as f:
+                html = f.read()
+            self.assertIn(f'src="{bundles[0]}"', html)
+            # the bundle is megabytes, a figure that references it is not
+            self.assertLess(len(html), os.path.getsize(os.path.join(self.tmp.name, bundles[0])) / 10)
+
+        with open(os.path.join(self.tmp.name, 'IBM.json')) as f:
+            self.assertEqual(json.load(f)['data'][0]['name'], 's1')
+        self.assertEqual(pio.renderers.default, before)
+
+    def test_options(self):
+        report = export.export_figures({'a': _figure(1)}, self.tmp.name, plotlyjs='cdn', processes=0)
+        with open(report['path'][0]) as f:
+            self.assertIn('cdn.plot.ly', f.read())
+        self.assertFalse(any(f.endswith('.js') for f in os.listdir(self.tmp.name)))
+
+        report = export.export_figures({'b': _figure(1)}, self.tmp.name, formats='json', processes=0)
+        self.assertEqual(list(report['format']), ['json'])
+
+        for formats in ((), ('gif',), ('html', 'gif')):
+            with self.assertRaises(ValueError):
+                export.export_figures({'a': _figure(1)}, self.tmp.name, formats=formats)
+        with self.assertRaises(ValueError):
+            export.export_figures({'a': _figure(1)}, self.tmp.name, plotlyjs='nope')
+
+    def test_names_writing_the_same_file(self):
+        figures = {'BRK/B': _figure(1), 'BRK_B': _figure(2), 'IBM': _figure(3)}
+        with self.assertRaises(ValueError) as cm:
+            export.export_figures(figures, self.tmp.name, formats=('json',), processes=0)
+        self.assertIn('BRK/B', str(cm.exception))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    @unittest.skipIf(importlib.util.find_spec('kaleido') is not None, 'kaleido is installed')
+    def test_images_need_kaleido(self):
+        with self.assertRaises(ImportError):
+            export.export_figures({'a': _figure(1)}, self.tmp.name, formats=('html', 'png'))
+
+
+if __name__ == '__main__':
+    unittest.main()
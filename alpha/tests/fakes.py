@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Test doubles for the offline tests, fake requests and aiohttp sessions and a fake clock.
+"""
+
+import asyncio
+import json
+
+
+class FakeClock:
+    '''A manually advanced clock, sleep moves time forward instead of blocking.'''
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeResponse:
+
+    def __init__(self, payload, status_code: int = 200):
+        self.payload = payload
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode('utf-8')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f'HTTP {self.status_code}')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    '''
+    Stands in for requests.Session. `responder(params)` returns the payload for a query,
+    every call is recorded in `calls`.
+    '''
+
+    def __init__(self, responder):
+        self.responder = responder
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls.append(dict(params))
+        return FakeResponse(self.responder(dict(params)))
+
+    def close(self):
+        pass
+
+
+def daily_adjusted_payload(dates, closes, dividends=None, splits=None, volume=1000):
+    '''Builds a TIME_SERIES_DAILY_ADJUSTED response, newest bar first like alpha vantage.'''
+    dividends = dividends or {}
+    splits = splits or {}
+    series = {}
+    for d, c in sorted(zip(dates, closes), reverse=True):
+        series[d] = {'1. open': f'{c:.4f}', '2. high': f'{c * 1.01:.4f}', '3. low': f'{c * 0.99:.4f}',
+                     '4. close': f'{c:.4f}', '5. adjusted close': f'{c:.4f}', '6. volume': str(volume),
+                     '7. dividend amount': f'{dividends.get(d, 0.0):.4f}',
+                     '8. split coefficient': f'{splits.get(d, 1.0):.1f}'}
+    return {'Meta Data': {'1. Information': 'Daily Time Series with Splits and Dividend Events'},
+            'Time Series (Daily)': series}
+
+
+class FakeAsyncResponse:
+
+    def __init__(self, payload, status: int = 200):
+        self.payload = payload
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f'HTTP {self.status}')
+
+    async def json(self, content_type=None):
+        return json.loads(json.dumps(self.payload))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncSession:
+    '''
+    Stands in for aiohttp.ClientSession. `responder(params)` returns the payload for a query
+    or a FakeAsyncResponse, each request waits `delay` seconds. Every call is recorded in
+    `calls` and the largest number of requests in flight at once in `peak`.
+    '''
+
+    def __init__(self, responder, delay: float = 0.0):
+        self.responder = responder
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self.closed = False
+
+    def get(self, url, params=None, **kwargs):
+        session = self
+        params = dict(params)
+        self.calls.append(params)
+
+        class _Request:
+            async def __aenter__(self):
+                session.in_flight += 1
+                session.peak = max(session.peak, session.in_flight)
+                await asyncio.sleep(session.delay)
+                session.in_flight -= 1
+                r = session.responder(params)
+                return r if isinstance(r, FakeAsyncResponse) else FakeAsyncResponse(r)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Request()
+
+    async def close(self):
+        self.closed = True
+
+
+def intraday_payload(interval, timestamps, closes, volume=100):
+    '''Builds a TIME_SERIES_INTRADAY response, newest bar first like alpha vantage.'''
+    series = {}
+    for ts, c in sorted(zip(timestamps, closes), reverse=True):
+        series[ts] = {'1. open': f'{c:.4f}', '2. high': f'{c + 1:.4f}', '3. low': f'{c - 1:.4f}',
+                      '4. close': f'{c:.4f}', '5. volume': str(volume)}
+    return {'Meta Data': {'1. Information': f'Intraday ({interval}) open, high, low, close prices and volume'},
+            f'Time Series ({interval})': series}
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the fundamentals endpoints of Equities, these do not call alpha vantage.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha.store import ColumnStore
+from alpha.tests.fakes import FakeSession
+from alpha.transport import Transport
+
+
+def _reports(dates, base):
+    return [{'fiscalDateEnding': d, 'reportedCurrency': 'USD', 'netIncome': str(base + i),
+             'operatingCashflow': str(2 * (base + i)), 'changeInCashAndCashEquivalents': 'None',
+             'totalAssets': str(10 * (base + i))}
+            for i, d in enumerate(dates)]
+
+
+ANNUAL = ['2022-12-31', '2021-12-31']
+QUARTERLY = ['2022-12-31', '2022-09-30', '2022-06-30']
+
+
+def _responder(params):
+    t, function = params['symbol'], params['function']
+    if t == 'BAD':
+        return {}
+    base = 100 if t == 'IBM' else 200
+    if function == 'OVERVIEW':
+        return {'Symbol': t, 'Name': f'{t} Corp', 'Sector': 'TECHNOLOGY', 'MarketCapitalization': str(base * 1e9),
+                'PERatio': '21.5', 'LatestQuarter': '2022-12-31', 'DividendDate': 'None', 'EBITDA': 'None'}
+    if function == 'EARNINGS':
+        return {'symbol': t,
+                'annualEarnings': [{'fiscalDateEnding': d, 'reportedEPS': '9.1'} for d in ANNUAL],
+                'quarterlyEarnings': [{'fiscalDateEnding': d, 'reportedDate': '2023-01-25', 'reportedEPS': '3.6',
+                                       'estimatedEPS': '3.6', 'surprise': '0', 'surprisePercentage': 'None'}
+                                      for d in QUARTERLY]}
+    return {'symbol': t, 'annualReports': _reports(ANNUAL, base), 'quarterlyReports': _reports(QUARTERLY, base)}
+
+
+class TestFundamentals(unittest.TestCase):
+
+    def setUp(self):
+        self.session = FakeSession(_responder)
+        self.equities = a.Equities('demo', ['IBM', 'BAD', 'AAPL'], transport=Transport(session=self.session))
+
+    def test_statements_share_one_frame_layout(self):
+        for method, function in (('get_income_statement', 'INCOME_STATEMENT'),
+                                 ('get_balance_sheet', 'BALANCE_SHEET'),
+                                 ('get_cashflow', 'CASH_FLOW')):
+            df = getattr(self.equities, method)()
+            self.assertEqual(df.index.names, ['ticker', 'fiscalDateEnding'])
+            self.assertEqual(list(df.index.unique('ticker')), ['IBM', 'AAPL'])
+            self.assertEqual(len(df), 2 * (len(ANNUAL) + len(QUARTERLY)))
+            self.assertEqual(df['period'].value_counts().to_dict(), {'quarterly': 6, 'annual': 4})
+            self.assertEqual(df['netIncome'].dtype, np.float64)
+            self.assertTrue(df['changeInCashAndCashEquivalents'].isna().all())
+            self.assertIn(function, [c['function'] for c in self.session.calls])
+        # the ticker without reports is reported, not raised
+        self.assertFalse(self.equities.last_fetch[1].ok)
+
+    def test_period_and_dates(self):
+        df = self.equities.get_cashflow(period='annual', start='2022-01-01')
+        self.assertEqual(len(df), 2)
+        self.assertEqual(df.loc[('IBM', pd.Timestamp('2022-12-31')), 'netIncome'], 100)
+        quarterly = self.equities.get_cashflow(period='quarterly', end='2022-09-30')
+        self.assertEqual(list(quarterly.xs('AAPL').index.strftime('%Y-%m-%d')), ['2022-09-30', '2022-06-30'])
+        with self.assertRaises(ValueError):
+            self.equities.get_cashflow(period='monthly')
+
+    def test_earnings(self):
+        df = self.equities.get_earnings()
+        quarterly = df[df['period'] == 'quarterly']
+        self.assertEqual(quarterly['reportedDate'].dtype, 'datetime64[s]')
+        self.assertTrue(quarterly['surprisePercentage'].isna().all())
+        self.assertTrue(df.loc[df['period'] == 'annual', 'estimatedEPS'].isna().all())
+
+    def test_overview(self):
+        df = self.equities.get_overview()
+        self.assertEqual(list(df.index), ['IBM', 'AAPL'])
+        self.assertEqual(df.loc['AAPL', 'Sector'], 'TECHNOLOGY')
+        self.assertEqual(df.loc['IBM', 'PERatio'], 21.5)
+        self.assertTrue(np.isnan(df.loc['IBM', 'EBITDA']))
+        self.assertTrue(pd.isna(df.loc['IBM', 'DividendDate']))
+
+    def test_store_keeps_every_period(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ColumnStore(root)
+            equities = a.Equities('demo', ['IBM'], transport=Transport(session=self.session), store=store)
+            df = equities.get_balance_sheet(period='annual')
+            self.assertEqual(len(df), 2)
+            stored = store.read('balance_sheet', 'IBM')
+            self.assertEqual(sorted(stored['period'].unique()), ['annual', 'quarterly'])
+
+    def test_cashflow_subplot(self):
+        fig = self.equities.cashflow_subplot(columns=['operatingCashflow', 'netIncome'])
+        self.assertEqual(len(fig.data), 4)
+        self.assertEqual(len(fig.data[0].y), len(ANNUAL))
+
+
+if __name__ == '__main__':
+    unittest.main()
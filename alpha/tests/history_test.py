@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for incremental refreshes of daily adjusted prices, these do not call alpha vantage.
+"""
+
+import datetime
+import tempfile
+import unittest
+
+import pandas as pd
+
+from alpha import core_api as a
+from alpha import history
+from alpha.tests.fakes import FakeSession, daily_adjusted_payload
+from alpha.transport import Transport
+
+
+class FakeMarket:
+    '''Serves full or compact daily adjusted payloads from a business day calendar.'''
+
+    def __init__(self, days: int):
+        self.dates = [d.strftime('%Y-%m-%d') for d in pd.bdate_range(end=datetime.date.today(), periods=days)]
+        self.closes = [100.0 + i for i in range(days)]
+        self.dividends = {}
+        self.visible = days - 3
+
+    def __call__(self, params):
+        n = self.visible
+        dates, closes = self.dates[:n], self.closes[:n]
+        if params['outputsize'] == 'compact':
+            dates, closes = dates[-history.COMPACT_BARS:], closes[-history.COMPACT_BARS:]
+        return daily_adjusted_payload(dates, closes, dividends=self.dividends)
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.market = FakeMarket(300)
+        self.session = FakeSession(self.market)
+        self.equities = a.Equities('demo', ['IBM'], transport=Transport(session=self.session),
+                                   history=history.HistoryStore(self.dir.name))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def refresh(self):
+        return self.equities.get_time_series_daily_adjusted(incremental=True)
+
+    def test_appends_only_new_bars(self):
+        first = self.refresh()
+        self.assertEqual(self.equities.last_refresh, {'IBM': 'full'})
+        self.assertEqual(len(first), 297)
+
+        self.market.visible += 2
+        second = self.refresh()
+        self.assertEqual(self.equities.last_refresh, {'IBM': 'compact'})
+        self.assertEqual(self.session.calls[-1]['outputsize'], 'compact')
+        self.assertEqual(len(second), 299)
+        self.assertEqual(second.index[0], pd.Timestamp(self.market.dates[298]))
+        self.assertTrue(second.index.is_monotonic_decreasing)
+
+    def test_dividend_forces_full_refresh(self):
+        self.refresh()
+        self.market.visible += 1
+        self.market.dividends[self.market.dates[297]] = 0.5
+        self.refresh()
+        self.assertEqual(self.equities.last_refresh, {'IBM': 'full'})
+        self.assertEqual([c['outputsize'] for c in self.session.calls], ['full', 'compact', 'full'])
+
+    def test_changed_adjusted_close_forces_full_refresh(self):
+        self.refresh()
+        self.market.closes = [c * 0.5 for c in self.market.closes]
+        self.refresh()
+        self.assertEqual(self.equities.last_refresh, {'IBM': 'full'})
+
+    def test_gap_too_big(self):
+        stored = pd.DataFrame({history.ADJUSTED_CLOSE: [1.0]}, index=['2022-01-03'])
+        self.assertTrue(history.gap_too_big(stored, today=datetime.date(2022, 6, 1)))
+        self.assertFalse(history.gap_too_big(stored, today=datetime.date(2022, 2, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for alpha.indicators, checked against per ticker pandas computations.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha import indicators
+from alpha.tests.fakes import FakeSession, daily_adjusted_payload
+from alpha.transport import Transport
+
+
+def _long():
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range('2022-01-03', periods=120)
+    frames = []
+    for t, start in (('IBM', 0), ('AAPL', 30)):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, .02, len(dates) - start)))
+        frames.append(pd.DataFrame({'high': close * 1.02, 'low': close * .97, 'close': close,
+                                    'adjusted_close': close, 'ticker': t},
+                                   index=dates[start:]).iloc[::-1])
+    return pd.concat(frames)
+
+
+def _different_calendars():
+    # AAPL misses some of IBM's dates and trades on a few dates IBM doesn't
+    prices = _long()
+    dates = prices.index
+    aapl = prices[(prices['ticker'] == 'AAPL') & ~dates.isin(dates.unique()[::7])].copy()
+    # some of its fridays moved to saturdays
+    moved = aapl.index.isin(dates.unique()[5::11]) & (aapl.index.dayofweek == 4)
+    aapl.index = aapl.index.where(~moved, aapl.index + pd.Timedelta(days=1))
+    return pd.concat([prices[prices['ticker'] == 'IBM'], aapl])
+
+
+def _check_against_pandas(out):
+    for t in ('IBM', 'AAPL'):
+        df = out[out['ticker'] == t].sort_index()
+        s = df['adjusted_close']
+        np.testing.assert_allclose(df['sma_10'], s.rolling(10).mean(), rtol=1e-9)
+        np.testing.assert_allclose(df['ema_12'], s.ewm(span=12, adjust=False).mean(), rtol=1e-12)
+
+        diff = s.diff()
+        gain = diff.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        loss = (-diff.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+        np.testing.assert_allclose(df['rsi_14'], 100 - 100 / (1 + gain / loss), rtol=1e-9)
+
+        line = s.ewm(span=12, adjust=False).mean() - s.ewm(span=26, adjust=False).mean()
+        np.testing.assert_allclose(df['macd'], line, rtol=1e-9)
+        np.testing.assert_allclose(df['macd_signal'], line.ewm(span=9, adjust=False).mean(), rtol=1e-9)
+
+        upper = s.rolling(20).mean() + 2 * s.rolling(20).std(ddof=0)
+        np.testing.assert_allclose(df['bb_upper'], upper, rtol=1e-9)
+
+        prev = df['close'].shift()
+        tr = pd.concat([df['high'] - df['low'], (df['high'] - prev).abs(),
+                        (df['low'] - prev).abs()], axis=1).max(axis=1)
+        np.testing.assert_allclose(df['atr_14'], tr.ewm(alpha=1 / 14, adjust=False).mean(), rtol=1e-9)
+
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        self.prices = _long()
+        self.out = indicators.compute(self.prices, ['sma_10', 'ema_12', 'rsi', 'macd', 'bollinger', 'atr'])
+
+    def _ticker(self, t):
+        return self.out[self.out['ticker'] == t].sort_index()
+
+    def test_row_order_and_columns_kept(self):
+        self.assertTrue(self.out.index.equals(self.prices.index))
+        self.assertEqual(list(self.out.columns[:5]), list(self.prices.columns))
+        for spec in ['sma_10', 'ema_12', 'rsi', 'macd', 'bollinger', 'atr']:
+            for c in indicators.output_columns(spec):
+                self.assertIn(c, self.out.columns)
+
+    def test_against_pandas(self):
+        _check_against_pandas(self.out)
+
+    def test_tickers_with_different_calendars(self):
+        prices = _different_calendars()
+        out = indicators.compute(prices, ['sma_10', 'ema_12', 'rsi', 'macd', 'bollinger', 'atr'])
+        self.assertTrue(out.index.equals(prices.index))
+        _check_against_pandas(out)
+        # a missing date costs no sma values beyond the first window
+        aapl = out[out['ticker'] == 'AAPL']
+        self.assertEqual(aapl['sma_10'].isna().sum(), 9)
+
+    def test_shorter_history_starts_later(self):
+        aapl = self._ticker('AAPL')
+        self.assertTrue(aapl['sma_10'].iloc[:9].isna().all())
+        self.assertFalse(np.isnan(aapl['sma_10'].iloc[9]))
+
+    def test_invalid_indicator(self):
+        with self.assertRaises(ValueError):
+            indicators.compute(self.prices, ['vwap'])
+
+
+class TestIndicatorSubplots(unittest.TestCase):
+
+    def test_overlays_and_oscillators(self):
+        dates = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2022-01-03', periods=60)]
+        session = FakeSession(lambda params: daily_adjusted_payload(dates, [100.0 + i for i in range(60)]))
+        equities = a.Equities('demo', ['IBM', 'AAPL'], transport=Transport(session=session))
+        fig = equities.daily_adjusted_subplot(indicators=['sma_10', 'bollinger', 'rsi'])
+        # per ticker: price, sma and three bands on the price subplot, rsi on its own subplot
+        self.assertEqual(len(fig.data), 2 * (1 + 1 + 3 + 1))
+        titles = [t.text for t in fig.layout.annotations[:4]]
+        self.assertEqual(titles, ['IBM', 'IBM rsi', 'AAPL', 'AAPL rsi'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for Economics.macro_panel, these do not call alpha vantage.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha.tests.fakes import FakeSession
+from alpha.transport import Transport
+
+
+def _records(dates, values):
+    return [{'date': d.strftime('%Y-%m-%d'), 'value': str(v)} for d, v in zip(dates[::-1], values[::-1])]
+
+
+SERIES = {
+    'CPI': _records(pd.date_range('2021-01-01', periods=12, freq='MS'), range(12)),
+    'REAL_GDP': _records(pd.date_range('2021-01-01', periods=4, freq='QS'), [100, 101, 102, 103]),
+    'TREASURY_YIELD': _records(pd.date_range('2021-01-01', periods=12, freq='MS'), np.arange(12) / 10),
+    'FEDERAL_FUNDS_RATE': [{'date': '2021-01-01', 'value': '.'}],
+}
+
+
+class TestMacroPanel(unittest.TestCase):
+
+    def setUp(self):
+        def responder(params):
+            if params['function'] == 'INFLATION':
+                return {'Error Message': 'Invalid API call.'}
+            return {'data': SERIES[params['function']]}
+
+        self.session = FakeSession(responder)
+        self.econ = a.Economics('demo', transport=Transport(session=self.session))
+
+    def test_aligned_monthly_panel(self):
+        panel = self.econ.macro_panel(['cpi', 'real_gdp',
+                                       {'indicator': 'treasury_yield', 'maturity': '2year'},
+                                       {'indicator': 'treasury_yield', 'maturity': '10year', 'name': 'ten'}])
+        self.assertEqual(list(panel.columns), ['cpi', 'real_gdp', 'treasury_yield_2year', 'ten'])
+        self.assertEqual(len(panel), 12)
+        self.assertEqual(panel.index.freqstr, 'MS')
+        # quarterly gdp is carried forward over the months of its quarter
+        self.assertEqual(list(panel['real_gdp'].iloc[:4]), [100, 100, 100, 101])
+        self.assertEqual(len(self.session.calls), 4)
+
+    def test_start_end_and_failures(self):
+        panel = self.econ.macro_panel(['real_gdp', 'inflation'], start='2021-05-01', end='2021-08-01')
+        self.assertEqual(list(panel['real_gdp']), [101, 101, 102])
+        self.assertNotIn('inflation', panel.columns)
+        self.assertEqual([r.ok for r in self.econ.last_fetch], [True, False])
+
+    def test_invalid_indicator(self):
+        with self.assertRaises(ValueError):
+            self.econ.macro_panel(['gold'])
+
+
+if __name__ == '__main__':
+    unittest.main()
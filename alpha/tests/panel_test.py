@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the compact multi-ticker price panel, these do not call alpha vantage.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import analytics
+from alpha import core_api as a
+from alpha.panel import PricePanel
+from alpha.tests.fakes import FakeSession, daily_adjusted_payload
+from alpha.transport import Transport
+
+
+DATES = [str(d) for d in pd.bdate_range('2024-01-01', periods=6).date]
+
+
+def _responder(params):
+    symbol = params['symbol']
+    if symbol == 'BAD':
+        return {'Error Message': 'Invalid API call.'}
+    # AAPL misses the first two days, so the wide matrix has gaps
+    dates = DATES if symbol == 'IBM' else DATES[2:]
+    base = 100.0 if symbol == 'IBM' else 50.0
+    return daily_adjusted_payload(dates, [base + i for i in range(len(dates))])
+
+
+class TestPricePanel(unittest.TestCase):
+
+    def setUp(self):
+        self.equities = a.Equities('demo', ['IBM', 'BAD', 'AAPL'], transport=Transport(session=FakeSession(_responder)))
+
+    def test_matches_the_long_frame(self):
+        long = self.equities.get_time_series_daily_adjusted()
+        panel = self.equities.get_price_panel()
+
+        self.assertEqual(panel.tickers, ['IBM', 'AAPL'])
+        self.assertEqual(panel.offsets.tolist(), [0, 6, 10])
+        self.assertEqual(len(panel), len(long))
+        self.assertIn('AAPL', panel)
+        self.assertNotIn('BAD', panel)
+
+        for t in panel:
+            expected = long[long['ticker'] == t].drop(columns='ticker').sort_index()
+            pd.testing.assert_frame_equal(panel[t], expected, check_names=False, check_freq=False)
+
+        pd.testing.assert_frame_equal(panel.wide('adjusted_close'), analytics.price_matrix(long),
+                                      check_names=False, check_freq=False)
+        self.assertTrue(np.isnan(panel.wide()['AAPL'].iloc[:2]).all())
+
+        frame = panel.to_frame()
+        self.assertIsInstance(frame['ticker'].dtype, pd.CategoricalDtype)
+        rebuilt = PricePanel.from_frame(long)
+        self.assertEqual(rebuilt.tickers, panel.tickers)
+        np.testing.assert_array_equal(rebuilt.columns['close'], panel.columns['close'])
+
+        with self.assertRaises(KeyError):
+            panel.select('MSFT')
+
+    def test_float32_and_views(self):
+        panel = self.equities.get_price_panel(float32=True, start=DATES[1])
+
+        self.assertEqual(panel.columns['close'].dtype, np.float32)
+        self.assertEqual(panel.columns['volume'].dtype, np.int64)
+        self.assertEqual(panel.dates.dtype.kind, 'M')
+        self.assertEqual(panel.select('IBM').index[0], pd.Timestamp(DATES[1]))
+        self.assertLess(panel.nbytes, PricePanel.from_frame(self.equities.get_time_series_daily_adjusted()).nbytes)
+
+        # selecting a ticker slices the panel's arrays instead of copying them
+        self.assertTrue(np.shares_memory(panel.column('close', 'AAPL'), panel.columns['close']))
+        self.assertEqual(panel.wide('close').dtypes.iloc[0], np.float32)
+
+    def test_empty(self):
+        panel = PricePanel.from_frames([])
+        self.assertEqual(len(panel), 0)
+        self.assertTrue(panel.wide().empty)
+        self.assertEqual(len(panel.to_frame()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
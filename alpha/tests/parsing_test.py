@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for schema driven parsing of alpha vantage responses.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha import parsing
+from alpha.tests.fakes import FakeSession, daily_adjusted_payload
+from alpha.transport import Transport
+
+
+class TestParsing(unittest.TestCase):
+
+    def test_daily_adjusted_schema(self):
+        payload = daily_adjusted_payload(['2022-10-06', '2022-10-07'], [10.0, 11.0])
+        df = parsing.parse_response(payload, parsing.DAILY_ADJUSTED)
+        self.assertEqual(list(df.columns), parsing.DAILY_ADJUSTED.columns)
+        self.assertEqual(df.index.dtype.kind, 'M')
+        self.assertEqual(df['volume'].dtype, np.int64)
+        self.assertEqual(df['adjusted_close'].dtype, np.float64)
+        self.assertEqual(df['adjusted_close'].iloc[0], 11.0)
+
+    def test_economic_missing_values(self):
+        df = a._build_dataframe([{'date': '2022-02-01', 'value': '.'},
+                                 {'date': '2022-01-01', 'value': '2.5'}])
+        self.assertTrue(np.isnan(df['value'].iloc[0]))
+        self.assertEqual(df['value'].iloc[1], 2.5)
+        self.assertEqual(df.index.name, 'date')
+
+    def test_fundamentals_keep_undeclared_fields(self):
+        reports = [{'fiscalDateEnding': '2021-12-31', 'reportedCurrency': 'USD',
+                    'netIncome': '100', 'capitalExpenditures': 'None'}]
+        df = parsing.parse_records(reports, parsing.FUNDAMENTALS)
+        self.assertEqual(df['reportedCurrency'].iloc[0], 'USD')
+        self.assertEqual(df['netIncome'].iloc[0], 100.0)
+        self.assertTrue(np.isnan(df['capitalExpenditures'].iloc[0]))
+
+    def test_date_positions_sorted_both_ways(self):
+        index = pd.bdate_range('2022-01-03', periods=10)
+        for idx in (index, index[::-1]):
+            pos = parsing.date_positions(idx, '2022-01-05', '2022-01-10')
+            self.assertIsInstance(pos, slice)
+            self.assertEqual(sorted(idx[pos].day), [5, 6, 7, 10])
+        shuffled = index[[3, 1, 7, 0]]
+        self.assertEqual(list(parsing.date_positions(shuffled, '2022-01-04', None)), [True, True, True, False])
+
+    def test_range_pushdown_while_parsing(self):
+        payload = daily_adjusted_payload(['2022-10-05', '2022-10-06', '2022-10-07'], [1.0, 2.0, 3.0])
+        df = parsing.parse_response(payload, parsing.DAILY_ADJUSTED, start='2022-10-06', end='2022-10-06')
+        self.assertEqual(list(df['close']), [2.0])
+
+    def test_economics_start_end(self):
+        records = [{'date': f'2022-{m:02d}-01', 'value': str(m)} for m in range(12, 0, -1)]
+        econ = a.Economics('demo', transport=Transport(session=FakeSession(lambda params: {'data': records})))
+        df = econ.cpi(start='2022-03-01', end='2022-05-01')
+        self.assertEqual(list(df['value']), [5.0, 4.0, 3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the quota manager and api error handling, these do not call alpha vantage.
+"""
+
+import unittest
+
+from alpha import core_api as a
+from alpha.quota import QuotaExhausted, QuotaManager
+from alpha.tests.fakes import FakeClock, FakeSession, daily_adjusted_payload
+from alpha.transport import AlphaVantageError, ThrottleError, Transport
+
+
+THROTTLE = {'Note': 'Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute.'}
+CPI = {'data': [{'date': '2022-01-01', 'value': '281.1'}]}
+
+
+class TestQuotaManager(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def quota(self, keys, **kwargs):
+        return QuotaManager(keys, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_spaces_requests_under_the_minute_limit(self):
+        quota = self.quota('KEY', per_minute=2)
+        for _ in range(4):
+            quota.acquire()
+        # two requests of burst, then one every 30 seconds
+        self.assertAlmostEqual(self.clock.now, 1060.0)
+        usage = quota.usage()
+        self.assertEqual(usage.loc['KEY', 'calls_minute'], 2)
+        self.assertEqual(usage.loc['KEY', 'calls_day'], 4)
+        self.assertEqual(usage.loc['KEY', 'remaining_minute'], 0)
+
+    def test_rotates_across_keys(self):
+        quota = self.quota(['A', 'B'], per_minute=1)
+        self.assertEqual([quota.acquire() for _ in range(4)], ['A', 'B', 'A', 'B'])
+        # both keys are out of tokens after the first round
+        self.assertAlmostEqual(self.clock.now, 1060.0)
+
+    def test_throttle_cools_key_down_and_halves_its_rate(self):
+        quota = self.quota(['A', 'B'], per_minute=60, backoff=2)
+        self.assertEqual(quota.acquire(), 'A')
+        quota.record('A', throttled=True)
+        self.assertEqual(quota.usage().loc['A', 'rate_per_minute'], 30)
+        self.assertEqual(quota.usage().loc['A', 'cooldown'], 2)
+        # A is cooling down, so B serves the next requests
+        self.assertEqual([quota.acquire() for _ in range(3)], ['B', 'B', 'B'])
+
+        quota.record('A', throttled=True)
+        self.assertEqual(quota.usage().loc['A', 'cooldown'], 4)
+        for _ in range(10):
+            quota.record('A')
+        self.assertEqual(quota.usage().loc['A', 'rate_per_minute'], 60)
+        self.assertEqual(quota.usage().loc['A', 'throttled'], 2)
+
+    def test_daily_quota_exhausted(self):
+        quota = self.quota(['A', 'B'], per_minute=5, per_day=2, max_wait=60)
+        for _ in range(4):
+            quota.acquire()
+        self.assertEqual(quota.remaining_today, 0)
+        with self.assertRaises(QuotaExhausted):
+            quota.acquire()
+
+
+class TestTransportQuota(unittest.TestCase):
+
+    def test_throttled_key_is_rotated_out(self):
+        def responder(params):
+            return THROTTLE if params['apikey'] == 'A' else CPI
+
+        session = FakeSession(responder)
+        clock = FakeClock()
+        quota = QuotaManager(['A', 'B'], clock=clock, sleep=clock.sleep)
+        econ = a.Economics(None, transport=Transport(session=session, quota=quota, sleep=clock.sleep))
+
+        self.assertEqual(econ.cpi()['value'].tolist(), [281.1])
+        self.assertEqual([c['apikey'] for c in session.calls], ['A', 'B'])
+        self.assertEqual(quota.usage()['throttled'].tolist(), [1, 0])
+
+    def test_api_key_list_builds_a_quota_manager(self):
+        econ = a.Economics(['A', 'B'])
+        self.assertEqual(econ.transport.quota.keys, ['A', 'B'])
+        self.assertIsNone(econ.transport.rate_limiter)
+
+    def test_error_payloads_raise_alpha_vantage_errors(self):
+        session = FakeSession(lambda params: {'Error Message': 'Invalid API call.'})
+        econ = a.Economics('demo', transport=Transport(session=session))
+        with self.assertRaises(AlphaVantageError) as cm:
+            econ.cpi()
+        self.assertIn('Invalid API call', str(cm.exception))
+        self.assertEqual(cm.exception.params['function'], 'CPI')
+
+        session = FakeSession(lambda params: daily_adjusted_payload(['2022-10-07'], [1.0])
+                              if params['symbol'] == 'IBM' else {'Error Message': 'Invalid API call.'})
+        equities = a.Equities('demo', ['IBM', 'BAD'], transport=Transport(session=session))
+        equities.get_time_series_daily_adjusted()
+        self.assertIsInstance(equities.last_fetch[1].error, AlphaVantageError)
+
+        throttled = Transport(session=FakeSession(lambda params: THROTTLE), max_retries=0)
+        with self.assertRaises(ThrottleError) as cm:
+            a.Economics('demo', transport=throttled).cpi()
+        self.assertEqual(cm.exception.payload, THROTTLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
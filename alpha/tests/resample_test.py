@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for intraday, weekly and monthly bars and the resampling engine, these do not call
+alpha vantage.
+"""
+
+import datetime
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha import resample
+from alpha.store import ColumnStore
+from alpha.tests.fakes import FakeSession, daily_adjusted_payload, intraday_payload
+from alpha.transport import Transport
+
+
+def _minutes(month, n=120):
+    start = pd.Timestamp(f'{month}-02 09:30')
+    return [str(start + pd.Timedelta(minutes=i)) for i in range(n)]
+
+
+def _intraday_responder(params):
+    if params['symbol'] == 'BAD':
+        return {'Error Message': 'Invalid API call.'}
+    month = params.get('month', '2024-03')
+    ts = _minutes(month)
+    # every slice also repeats the first bar of the next month, as overlapping slices do
+    nxt = str(pd.Period(month, 'M') + 1)
+    ts = ts + _minutes(nxt, 1)
+    return intraday_payload(params['interval'], ts, np.arange(len(ts), dtype=float) + 100)
+
+
+class TestResampleBars(unittest.TestCase):
+
+    def test_matches_pandas_for_every_ticker(self):
+        rng = np.random.default_rng(0)
+        index = pd.date_range('2024-01-02 04:00', periods=300, freq='1min')
+        frames = []
+        for t in ('IBM', 'AAPL'):
+            c = 100 + rng.standard_normal(300).cumsum()
+            frames.append(pd.DataFrame({'open': c, 'high': c + 1, 'low': c - 1, 'close': c,
+                                        'volume': rng.integers(1, 100, 300), 'ticker': t}, index=index))
+        bars = pd.concat(frames).sample(frac=1, random_state=1)
+
+        out = resample.resample_bars(bars, '15min')
+        for t, frame in zip(('IBM', 'AAPL'), frames):
+            expected = frame.drop(columns='ticker').resample('15min').agg(
+                {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+            got = out[out['ticker'] == t].drop(columns='ticker')
+            pd.testing.assert_frame_equal(got, expected, check_freq=False)
+
+    def test_weekly_bars_labelled_with_last_day(self):
+        dates = pd.bdate_range('2024-01-01', '2024-01-12')
+        bars = pd.DataFrame({'close': np.arange(10.0), 'dividend_amount': [0] * 9 + [0.5]}, index=dates)
+        weekly = resample.resample_bars(bars, 'W', label='last')
+        self.assertEqual(list(weekly.index), [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-12')])
+        self.assertEqual(weekly['close'].tolist(), [4.0, 9.0])
+        self.assertEqual(weekly['dividend_amount'].tolist(), [0.0, 0.5])
+
+    def test_invalid_rule(self):
+        with self.assertRaises(ValueError):
+            resample.bins(pd.DatetimeIndex(['2024-01-01']), '7sec')
+
+
+class TestIntraday(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ColumnStore(self.tmp.name)
+        self.session = FakeSession(_intraday_responder)
+        self.equities = a.Equities('demo', ['IBM', 'AAPL', 'BAD'], transport=Transport(session=self.session),
+                                   store=self.store)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_month_slices_are_stitched_without_duplicates(self):
+        df = self.equities.get_time_series_intraday('1min', months=['2024-01', '2024-02'])
+        self.assertEqual(len(self.session.calls), 6)
+        self.assertEqual(list(df['ticker'].unique()), ['IBM', 'AAPL'])
+        # 120 bars per month, the bar repeated by the january slice is kept once
+        self.assertEqual(len(df), 2 * (120 + 121))
+        self.assertFalse(df.reset_index().duplicated(['date', 'ticker']).any())
+        self.assertTrue(df[df['ticker'] == 'IBM'].index.is_monotonic_increasing)
+        self.assertEqual(df['volume'].dtype, 'int64')
+        self.assertEqual([r.key for r in self.equities.last_fetch if not r.ok], [('BAD', '2024-01'), ('BAD', '2024-02')])
+
+    def test_stored_months_are_not_downloaded_again(self):
+        first = self.equities.get_time_series_intraday('1min', start='2024-01-01', end='2024-01-31')
+        calls = len(self.session.calls)
+        again = self.equities.get_time_series_intraday('1min', months=['2024-01'], end='2024-01-31')
+        self.assertEqual(len(self.session.calls), calls + 1)  # only BAD is requested
+        pd.testing.assert_frame_equal(again, first)
+
+        # coarser intervals are resampled from the stored 1min bars
+        df = self.equities.get_time_series_intraday('15min', months=['2024-01'], end='2024-01-31')
+        self.assertEqual(len(self.session.calls), calls + 2)
+        ibm = df[df['ticker'] == 'IBM']
+        self.assertEqual(len(ibm), 8)
+        self.assertEqual(ibm['volume'].tolist(), [1500] * 8)
+        self.assertEqual(ibm['open'].iloc[1], 115.0)
+
+    def test_end_date_includes_the_whole_day(self):
+        # every bar of the month is on the 2nd, between 09:30 and 11:29
+        df = self.equities.get_time_series_intraday('1min', start='2024-01-01', end='2024-01-02')
+        self.assertEqual(len(df[df['ticker'] == 'IBM']), 120)
+        self.assertEqual(df.index.max(), pd.Timestamp('2024-01-02 11:29'))
+
+        df = self.equities.get_time_series_intraday('1min', months=['2024-01'], end='2024-01-02 10:00')
+        self.assertEqual(len(df[df['ticker'] == 'IBM']), 31)
+        df = self.equities.get_time_series_intraday('1min', months=['2024-01'], end=datetime.date(2024, 1, 2))
+        self.assertEqual(len(df[df['ticker'] == 'IBM']), 120)
+
+    def test_every_slice_failed_is_empty(self):
+        equities = a.Equities('demo', ['BAD'], transport=Transport(session=self.session))
+        df = equities.get_time_series_intraday('5min', start='2024-01-01', end='2024-01-31')
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), ['open', 'high', 'low', 'close', 'volume', 'ticker'])
+        self.assertEqual(df['volume'].dtype, 'int64')
+
+    def test_latest_bars_are_not_stored(self):
+        df = self.equities.get_time_series_intraday('5min')
+        self.assertNotIn('month', self.session.calls[0])
+        self.assertEqual(self.store.partitions('intraday_5min'), [])
+        self.assertEqual(len(df[df['ticker'] == 'IBM']), 121)
+
+
+class TestPeriodAdjusted(unittest.TestCase):
+
+    def test_weekly_derived_from_current_daily_history(self):
+        last = np.busday_offset(datetime.date.today(), -1, roll='forward')
+        dates = [str(d) for d in pd.bdate_range(end=str(last), periods=20).date]
+        session = FakeSession(lambda params: daily_adjusted_payload(dates, list(np.arange(20.0) + 10)))
+        with tempfile.TemporaryDirectory() as tmp:
+            equities = a.Equities('demo', ['IBM'], transport=Transport(session=session), store=ColumnStore(tmp))
+            equities.get_time_series_daily_adjusted(output_size='full')
+            weekly = equities.get_time_series_weekly_adjusted()
+            monthly = equities.get_time_series_monthly_adjusted()
+
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(weekly.index[0], pd.Timestamp(str(last)))
+        self.assertTrue(weekly.index.is_monotonic_decreasing)
+        self.assertEqual(weekly['adjusted_close'].iloc[0], 29.0)
+        self.assertEqual(list(weekly.columns), ['open', 'high', 'low', 'close', 'adjusted_close', 'volume',
+                                                'dividend_amount', 'ticker'])
+        self.assertEqual(monthly['volume'].sum(), 20 * 1000)
+
+    def test_weekly_fetched_without_history(self):
+        payload = {'Weekly Adjusted Time Series': {
+            '2024-01-12': {'1. open': '1', '2. high': '2', '3. low': '0.5', '4. close': '1.5',
+                           '5. adjusted close': '1.4', '6. volume': '500', '7. dividend amount': '0.0000'}}}
+        session = FakeSession(lambda params: payload)
+        equities = a.Equities('demo', ['IBM'], transport=Transport(session=session))
+        weekly = equities.get_time_series_weekly_adjusted()
+        self.assertEqual(session.calls[0]['function'], 'TIME_SERIES_WEEKLY_ADJUSTED')
+        self.assertEqual(weekly['adjusted_close'].tolist(), [1.4])
+
+
+if __name__ == '__main__':
+    unittest.main()
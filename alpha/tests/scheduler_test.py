@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the concurrent fetch engine and rate limiter, these do not call alpha vantage.
+"""
+
+import multiprocessing
+import threading
+import time
+import unittest
+
+from alpha import core_api as a, parsing
+from alpha.scheduler import (RateLimiter, SharedRateLimiter, SingleFlight, TokenBucket, fetch_concurrent,
+                             report_frame)
+from alpha.tests.fakes import FakeClock, FakeSession
+from alpha.transport import Transport
+
+
+def _take(limiter, taken):
+    # module level so spawned processes can run it
+    for _ in range(10):
+        if limiter.try_acquire() == 0:
+            with taken.get_lock():
+                taken.value += 1
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_token_bucket_waits_for_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            bucket.acquire()
+        # two tokens of burst, then one token per second
+        self.assertAlmostEqual(clock.now, 1002.0)
+
+    def test_rate_limiter_respects_daily_quota(self):
+        clock = FakeClock()
+        limiter = RateLimiter(per_minute=60, per_day=3, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertGreaterEqual(clock.now, 1000 + 86400 / 3 - 1e-6)
+
+    def test_shared_rate_limiter_is_one_budget_across_processes(self):
+        clock = FakeClock()
+        limiter = SharedRateLimiter(per_minute=60, per_day=3, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertGreaterEqual(clock.now, 1000 + 86400 / 3 - 1e-6)
+
+        ctx = multiprocessing.get_context()
+        limiter = SharedRateLimiter(per_minute=5, context=ctx)
+        taken = ctx.Value('i', 0)
+        workers = [ctx.Process(target=_take, args=(limiter, taken)) for _ in range(3)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        # 30 attempts in three processes, only the burst of 5 (plus a refill or two) gets through
+        self.assertGreaterEqual(taken.value, 5)
+        self.assertLessEqual(taken.value, 7)
+
+    def test_results_in_key_order_with_failures(self):
+        def fetch(k):
+            # later keys finish first
+            time.sleep(0.01 * (5 - k))
+            if k == 2:
+                raise RuntimeError('bad symbol')
+            return k * 10
+
+        results = fetch_concurrent(fetch, range(5), max_workers=5)
+        self.assertEqual([r.key for r in results], [0, 1, 2, 3, 4])
+        self.assertEqual([r.value for r in results], [0, 10, None, 30, 40])
+        self.assertFalse(results[2].ok)
+        self.assertIsInstance(results[2].error, RuntimeError)
+
+        report = report_frame(results)
+        self.assertEqual(report['ok'].sum(), 4)
+        self.assertTrue((report['latency'] > 0).all())
+
+    def test_fetch_runs_concurrently(self):
+        barrier = threading.Barrier(4, timeout=2)
+        results = fetch_concurrent(lambda k: barrier.wait(), range(4), max_workers=4)
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_equities_daily_adjusted_skips_failed_ticker(self):
+        payloads = {'AAA': {'Time Series (Daily)': {'2022-10-07': {'1. open': '1.0', '5. adjusted close': '2.0'}}},
+                    'BBB': {'Error Message': 'Invalid API call.'}}
+        session = FakeSession(lambda params: payloads[params['symbol']])
+
+        equities = a.Equities(api_key='demo', tickers=['AAA', 'BBB'], transport=Transport(session=session))
+        df = equities.get_time_series_daily_adjusted()
+
+        self.assertEqual(list(df['ticker']), ['AAA'])
+        self.assertEqual([r.ok for r in equities.last_fetch], [True, False])
+
+    def test_equities_every_ticker_failed_is_empty(self):
+        session = FakeSession(lambda params: {'Error Message': 'Invalid API call.'})
+        equities = a.Equities(api_key='demo', tickers=['AAA', 'BBB'], transport=Transport(session=session))
+
+        df = equities.get_time_series_daily_adjusted()
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), parsing.DAILY_ADJUSTED.columns + ['ticker'])
+        self.assertFalse(any(r.ok for r in equities.last_fetch))
+
+        weekly = equities.get_time_series_weekly_adjusted()
+        self.assertTrue(weekly.empty)
+        self.assertEqual(list(weekly.columns), parsing.WEEKLY_ADJUSTED.columns + ['ticker'])
+        self.assertEqual(len(equities.daily_adjusted_subplot().data), 0)
+
+    def test_single_flight_shares_result_and_error(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return {'value': 1}
+
+        def fail():
+            calls.append(1)
+            release.wait(2)
+            raise RuntimeError('bad symbol')
+
+        threading.Timer(0.05, release.set).start()
+        results = fetch_concurrent(lambda k: flights.do('cpi', slow), range(6), max_workers=6)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.shared, 5)
+        self.assertTrue(all(r.value is results[0].value for r in results))
+
+        # the key is released once the call finishes
+        release.clear()
+        threading.Timer(0.05, release.set).start()
+        results = fetch_concurrent(lambda k: flights.do('cpi', fail), range(3), max_workers=3)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(isinstance(r.error, RuntimeError) for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
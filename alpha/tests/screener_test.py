@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for alpha.screener.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha.screener import FundamentalsTable
+from alpha.store import ColumnStore
+from alpha.tests.fakes import FakeSession
+from alpha.transport import Transport
+
+
+def _frame(rows):
+    # rows of (ticker, fiscalDateEnding, {field: value}), annual reports
+    index = pd.MultiIndex.from_tuples([(t, pd.Timestamp(d)) for t, d, _ in rows],
+                                      names=['ticker', 'fiscalDateEnding'])
+    df = pd.DataFrame([v for _, _, v in rows], index=index)
+    df['period'] = 'annual'
+    return df
+
+
+INCOME = _frame([('CHEAP', '2022-12-31', {'totalRevenue': 1000., 'netIncome': 100.}),
+                 ('CHEAP', '2021-12-31', {'totalRevenue': 800., 'netIncome': 50.}),
+                 ('PRICEY', '2022-12-31', {'totalRevenue': 500., 'netIncome': 10.}),
+                 ('PRICEY', '2021-12-31', {'totalRevenue': 500., 'netIncome': -10.}),
+                 ('LOSS', '2022-12-31', {'totalRevenue': 300., 'netIncome': -20.})])
+BALANCE = _frame([('CHEAP', '2022-12-31', {'totalShareholderEquity': 1000., 'shortLongTermDebtTotal': 500.,
+                                           'totalCurrentAssets': 300., 'totalCurrentLiabilities': 100.}),
+                  ('PRICEY', '2022-12-31', {'totalShareholderEquity': 100., 'shortLongTermDebtTotal': np.nan,
+                                            'longTermDebt': 150., 'shortTermDebt': 50.}),
+                  ('LOSS', '2022-12-31', {'totalShareholderEquity': 200., 'shortLongTermDebtTotal': 20.})])
+CASHFLOW = _frame([('CHEAP', '2022-12-31', {'operatingCashflow': 150., 'capitalExpenditures': 30.}),
+                   ('PRICEY', '2022-12-31', {'operatingCashflow': 20., 'capitalExpenditures': 15.})])
+OVERVIEW = pd.DataFrame({'MarketCapitalization': [1000., 2000., 600.]},
+                        index=pd.Index(['CHEAP', 'PRICEY', 'LOSS'], name='ticker'))
+
+
+class TestFundamentalsTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = FundamentalsTable.from_frames(INCOME, BALANCE, CASHFLOW, OVERVIEW)
+
+    def test_ratios(self):
+        df = self.table.to_frame()
+        self.assertEqual(df.loc['CHEAP', 'pe'], 10)
+        self.assertEqual(df.loc['PRICEY', 'pe'], 200)
+        self.assertEqual(df.loc['CHEAP', 'fcf_yield'], .12)
+        self.assertEqual(df.loc['CHEAP', 'debt_to_equity'], .5)
+        self.assertEqual(df.loc['PRICEY', 'debt_to_equity'], 2)
+        self.assertEqual(df.loc['CHEAP', 'revenue_growth'], .25)
+        self.assertEqual(df.loc['PRICEY', 'earnings_growth'], 2)
+        self.assertTrue(np.isnan(df.loc['LOSS', 'revenue_growth']))
+        self.assertTrue(np.isnan(df.loc['LOSS', 'pe']))
+        self.assertEqual(df.loc['CHEAP', 'as_of'], pd.Timestamp('2022-12-31'))
+
+    def test_screen(self):
+        self.assertEqual(list(self.table.screen('pe < 15').index), ['CHEAP'])
+        self.assertEqual(list(self.table.screen('15 > pe').index), ['CHEAP'])
+        self.assertEqual(sorted(self.table.screen('debt_to_equity <= 2 and net_margin > 0').index),
+                         ['CHEAP', 'PRICEY'])
+        self.assertEqual(sorted(self.table.screen('pe < 15 or not debt_to_equity < 1').index),
+                         ['CHEAP', 'PRICEY'])
+        self.assertEqual(list(self.table.screen('0 < pe < 100').index), ['CHEAP'])
+        # missing values fail the comparison, LOSS has no cash flow
+        self.assertEqual(sorted(self.table.screen('fcf > -1000').index), ['CHEAP', 'PRICEY'])
+        # LOSS has no pe, it fails the negation as well
+        self.assertEqual(list(self.table.screen('not pe < 15').index), ['PRICEY'])
+        self.assertEqual(list(self.table.screen('not (pe < 15 or fcf < -1000)').index), ['PRICEY'])
+
+    def test_indexed_and_scanned_screens_agree(self):
+        self.assertEqual(list(self.table.screen('pe < 15').index),
+                         list(self.table.screen('pe + 0 < 15').index))
+        self.assertEqual(list(self.table.screen('fcf > 0.5 * netIncome').index), ['CHEAP'])
+
+    def test_sort_limit_columns(self):
+        df = self.table.screen('totalRevenue > 0', columns=['totalRevenue'], sort='totalRevenue',
+                               ascending=False, limit=2)
+        self.assertEqual(list(df.index), ['CHEAP', 'PRICEY'])
+        self.assertEqual(list(df.columns), ['totalRevenue'])
+
+    def test_invalid_screens(self):
+        with self.assertRaises(KeyError):
+            self.table.screen('nope > 1')
+        with self.assertRaises(ValueError):
+            self.table.screen('pe')
+        with self.assertRaises(ValueError):
+            self.table.screen('__import__("os") > 1')
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ColumnStore(root)
+            self.table.save(store)
+            loaded = FundamentalsTable.load(store)
+            pd.testing.assert_frame_equal(loaded.to_frame().sort_index(), self.table.to_frame().sort_index())
+            self.assertIsNone(FundamentalsTable.load(store, 'missing'))
+
+    def test_market_cap_from_prices(self):
+        balance = BALANCE.copy()
+        balance['commonStockSharesOutstanding'] = 10.
+        table = FundamentalsTable.from_frames(INCOME, balance, CASHFLOW, prices=pd.Series({'CHEAP': 100.}))
+        self.assertEqual(table.to_frame().loc['CHEAP', 'pe'], 10)
+        self.assertTrue(np.isnan(table.to_frame().loc['PRICEY', 'pe']))
+
+    def test_large_table(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        columns = {'market_cap': rng.uniform(1e8, 1e12, n), 'netIncome': rng.normal(1e9, 1e9, n),
+                   'totalShareholderEquity': rng.uniform(1e8, 1e11, n)}
+        table = FundamentalsTable([f'T{i}' for i in range(n)], columns)
+        pe = table.columns['pe']
+        expected = np.flatnonzero((pe > 0) & (pe < 15))
+        np.testing.assert_array_equal(np.flatnonzero(table.mask('0 < pe < 15')), expected)
+
+
+class TestEquitiesFundamentalsTable(unittest.TestCase):
+
+    def test_fundamentals_table(self):
+        def responder(params):
+            f = params['function']
+            if f == 'OVERVIEW':
+                return {'Symbol': params['symbol'], 'MarketCapitalization': '1000'}
+            report = {'fiscalDateEnding': '2022-12-31', 'reportedCurrency': 'USD', 'netIncome': '100',
+                      'totalShareholderEquity': '400', 'operatingCashflow': '120', 'capitalExpenditures': '20'}
+            return {'annualReports': [report], 'quarterlyReports': []}
+
+        equities = a.Equities('demo', ['IBM'], transport=Transport(session=FakeSession(responder)))
+        table = equities.fundamentals_table()
+        self.assertEqual(list(table.screen('pe == 10 and fcf_yield >= 0.1').index), ['IBM'])
+
+
+if __name__ == '__main__':
+    unittest.main()
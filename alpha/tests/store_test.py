@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the columnar local store, these do not call alpha vantage.
+"""
+
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from alpha import core_api as a
+from alpha.store import ColumnStore, partition_name
+from alpha.tests.fakes import FakeSession, daily_adjusted_payload
+from alpha.transport import Transport
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = ColumnStore(self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip_sorted_and_memory_mapped(self):
+        index = pd.DatetimeIndex(['2022-01-05', '2022-01-03', '2022-01-04'], name='date')
+        df = pd.DataFrame({'close': [3.0, 1.0, 2.0], 'volume': np.array([30, 10, 20]),
+                           'currency': ['USD', 'USD', 'EUR']}, index=index)
+        self.store.write('daily_adjusted', 'IBM', df)
+
+        out = self.store.read('daily_adjusted', 'IBM')
+        self.assertEqual(list(out['close']), [1.0, 2.0, 3.0])
+        self.assertEqual(list(out['currency']), ['USD', 'EUR', 'USD'])
+        self.assertEqual(out['volume'].dtype, np.int64)
+        self.assertEqual(out.index.name, 'date')
+
+    def test_missing_strings_stay_missing(self):
+        index = pd.DatetimeIndex(['2022-01-03', '2022-01-04', '2022-01-05'], name='date')
+        df = pd.DataFrame({'currency': np.array(['USD', None, np.nan], dtype=object),
+                           'note': np.array(['a', 'b', 'c'], dtype=object)}, index=index)
+        self.store.write('daily_adjusted', 'IBM', df)
+
+        out = self.store.read('daily_adjusted', 'IBM')
+        self.assertEqual(out['currency'].iloc[0], 'USD')
+        self.assertEqual(out['currency'].isna().tolist(), [False, True, True])
+        self.assertEqual(out['note'].tolist(), ['a', 'b', 'c'])
+        self.assertEqual(self.store.read('daily_adjusted', 'IBM', start='2022-01-04')['currency'].isna().tolist(),
+                         [True, True])
+
+    def test_column_subset_and_date_range(self):
+        index = pd.bdate_range('2022-01-03', periods=10, name='date')
+        self.store.write('daily_adjusted', 'IBM', pd.DataFrame({'close': np.arange(10.0), 'open': 1.0}, index=index))
+        out = self.store.read('daily_adjusted', 'IBM', columns=['close'], start='2022-01-05', end='2022-01-10')
+        self.assertEqual(list(out.columns), ['close'])
+        self.assertEqual(list(out['close']), [2.0, 3.0, 4.0, 5.0])
+
+    def test_missing_partition(self):
+        self.assertIsNone(self.store.read('daily_adjusted', 'NOPE'))
+        self.assertTrue(self.store.read_many('daily_adjusted').empty)
+
+    def test_fetchers_write_partitions(self):
+        dates = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2022-01-03', periods=20)]
+
+        def responder(params):
+            if params['function'] == 'TIME_SERIES_DAILY_ADJUSTED':
+                return daily_adjusted_payload(dates, [float(i) for i in range(20)])
+            return {'data': [{'date': '2022-02-01', 'value': '2.0'}, {'date': '2022-01-01', 'value': '1.0'}]}
+
+        transport = Transport(session=FakeSession(responder))
+        a.Equities('demo', ['IBM', 'MSFT'], transport=transport, store=self.store) \
+            .get_time_series_daily_adjusted(output_size='full')
+        a.Economics('demo', transport=transport, store=self.store).treasury_yield(maturity='2year')
+
+        self.assertEqual(self.store.partitions('daily_adjusted'), ['IBM', 'MSFT'])
+        prices = self.store.read_many('daily_adjusted', columns=['adjusted_close'], start='2022-01-10')
+        self.assertEqual(prices['ticker'].value_counts().to_dict(), {'IBM': 15, 'MSFT': 15})
+
+        name = partition_name({'function': 'TREASURY_YIELD', 'interval': 'monthly', 'maturity': '2year'})
+        self.assertEqual(list(self.store.read('economic', name)['value']), [1.0, 2.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the streaming time series decoder, these do not call alpha vantage.
+"""
+
+import json
+import threading
+import unittest
+
+import pandas as pd
+
+from alpha import core_api as a
+from alpha import parsing, streaming
+from alpha.quota import QuotaManager
+from alpha.scheduler import fetch_concurrent
+from alpha.tests.fakes import FakeClock, FakeSession, daily_adjusted_payload
+from alpha.transport import Transport
+
+
+def _chunks(payload, size):
+    body = json.dumps(payload, indent=1).encode('utf-8')
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        dates = [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2020-01-01', periods=500)]
+        self.payload = daily_adjusted_payload(dates, [10.0 + i / 7 for i in range(500)])
+
+    def test_matches_full_decode(self):
+        expected = parsing.parse_response(self.payload, parsing.DAILY_ADJUSTED)
+        for size in (1, 7, 4096):
+            df = streaming.stream_time_series(_chunks(self.payload, size), capacity=16)
+            pd.testing.assert_frame_equal(df, expected)
+
+    def test_stops_before_start(self):
+        df = streaming.stream_time_series(_chunks(self.payload, 512), stop_before='2021-06-01')
+        self.assertGreaterEqual(df.index.min(), pd.Timestamp('2021-06-01'))
+        self.assertLess(df.index.min(), pd.Timestamp('2021-06-08'))
+
+    def test_missing_container(self):
+        with self.assertRaises(streaming.ContainerNotFound) as ctx:
+            streaming.stream_time_series(_chunks({'Note': 'slow down'}, 3))
+        self.assertEqual(ctx.exception.payload, {'Note': 'slow down'})
+
+    def test_integer_column_with_missing_value(self):
+        self.payload['Time Series (Daily)']['2020-01-01']['6. volume'] = 'None'
+        df = streaming.stream_time_series(_chunks(self.payload, 100))
+        self.assertEqual(df['volume'].dtype, 'float64')
+        self.assertEqual(df['volume'].isna().sum(), 1)
+
+    def test_equities_stream(self):
+        session = FakeSession(lambda params: self.payload)
+        equities = a.Equities('demo', ['IBM', 'MSFT'], transport=Transport(session=session))
+        df = equities.get_time_series_daily_adjusted(output_size='full', stream=True, start='2021-01-04')
+        self.assertTrue((df.index >= '2021-01-04').all())
+        expected = sum(d >= '2021-01-04' for d in self.payload['Time Series (Daily)'])
+        self.assertEqual(df['ticker'].value_counts().to_dict(), {'IBM': expected, 'MSFT': expected})
+
+    def test_throttled_stream_starts_the_key_cooldown(self):
+        def responder(params):
+            return {'Note': 'Thank you for using Alpha Vantage! call frequency'} if params['apikey'] == 'A' \
+                else self.payload
+
+        session = FakeSession(responder)
+        clock = FakeClock()
+        quota = QuotaManager(['A', 'B'], clock=clock, sleep=clock.sleep)
+        equities = a.Equities(None, ['IBM'], transport=Transport(session=session, quota=quota, sleep=clock.sleep))
+        df = equities.get_time_series_daily_adjusted(output_size='full', stream=True)
+
+        self.assertEqual(len(df), 500)
+        # the retry after the throttled stream goes to the other key
+        self.assertEqual([c['apikey'] for c in session.calls], ['A', 'B'])
+        self.assertEqual(quota.usage()['throttled'].tolist(), [1, 0])
+
+    def test_identical_streams_share_one_request(self):
+        release = threading.Event()
+
+        def responder(params):
+            release.wait(2)
+            return self.payload
+
+        session = FakeSession(responder)
+        equities = [a.Equities('demo', ['IBM'], transport=Transport(session=session)) for _ in range(3)]
+        threading.Timer(0.05, release.set).start()
+        results = fetch_concurrent(lambda e: e.get_time_series_daily_adjusted(stream=True, start='2021-01-04'),
+                                   equities, max_workers=3)
+
+        self.assertEqual(len(session.calls), 1)
+        for r in results:
+            pd.testing.assert_frame_equal(r.value, results[0].value)
+        # another date range is another stream
+        equities[0].get_time_series_daily_adjusted(stream=True, start='2021-06-01')
+        self.assertEqual(len(session.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
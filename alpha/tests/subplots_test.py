@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for subplots.build_subplots and downsample_lttb.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from alpha import subplots
+
+
+def _series(n, name='value'):
+    index = pd.bdate_range('2000-01-03', periods=n)[::-1]
+    return pd.Series(np.sin(np.arange(n) / 25) + 2, index=index, name=name)
+
+
+def _data(count, n):
+    return [{'subplot': [{'series': _series(n),
+                          'legend-name': f'T{i}',
+                          'max-trendline': {},
+                          'min-trendline': {}}],
+             'title': f'T{i}'} for i in range(count)]
+
+
+class TestDownsample(unittest.TestCase):
+
+    def test_keeps_endpoints_and_extremes(self):
+        s = _series(2000).sort_index()
+        out = subplots.downsample_lttb(s, 200)
+        self.assertEqual(len(out), 200)
+        self.assertEqual(out.index[0], s.index[0])
+        self.assertEqual(out.index[-1], s.index[-1])
+        self.assertTrue(out.index.is_monotonic_increasing)
+        self.assertAlmostEqual(out.max(), s.max(), places=2)
+        self.assertAlmostEqual(out.min(), s.min(), places=2)
+
+    def test_short_series_unchanged(self):
+        s = _series(50)
+        self.assertIs(subplots.downsample_lttb(s, 100), s)
+
+
+class TestBuildSubplots(unittest.TestCase):
+
+    def test_traces_shapes_and_annotations(self):
+        fig = subplots.build_subplots(_data(3, 300))
+        self.assertEqual(len(fig.data), 3)
+        self.assertIsInstance(fig.data[0], go.Scatter)
+        # one max and one min line per subplot, drawn on that subplot's axes
+        self.assertEqual(len(fig.layout.shapes), 6)
+        self.assertEqual([s.yref for s in fig.layout.shapes[::2]], ['y', 'y2', 'y3'])
+        self.assertEqual(fig.layout.shapes[0].y0, round(_series(300).max(), 2))
+        # 3 subplot titles plus current/max/min per subplot
+        self.assertEqual(len(fig.layout.annotations), 3 + 9)
+        self.assertEqual([t.xaxis for t in fig.data], ['x', 'x2', 'x3'])
+
+    def test_webgl_and_downsampling(self):
+        fig = subplots.build_subplots(_data(2, 3000), webgl_threshold=500, max_points=800)
+        self.assertIsInstance(fig.data[0], go.Scattergl)
+        self.assertEqual(len(fig.data[0].y), 800)
+        # trendlines use the full series
+        self.assertEqual(fig.layout.shapes[0].y0, round(_series(3000).max(), 2))
+
+    def test_invalid_render_type(self):
+        with self.assertRaises(ValueError):
+            subplots.build_subplots(_data(1, 10), render_type='nope')
+
+    def test_leaves_the_global_renderer_alone(self):
+        import plotly.io as pio
+        before = pio.renderers.default
+        subplots.build_subplots(_data(1, 10))
+        self.assertEqual(pio.renderers.default, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
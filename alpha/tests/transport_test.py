@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the pooled request pipeline, these do not call alpha vantage.
+"""
+
+import threading
+import unittest
+
+from alpha import core_api as a
+from alpha.scheduler import fetch_concurrent
+from alpha.tests.fakes import FakeClock, FakeSession
+from alpha.transport import ThrottleError, Transport, is_throttle_payload
+
+
+class TestTransport(unittest.TestCase):
+
+    def test_pooled_session(self):
+        transport = Transport(pool_maxsize=16)
+        adapter = transport.session.get_adapter('https://www.alphavantage.co/query')
+        self.assertEqual(adapter._pool_maxsize, 16)
+        self.assertIn('gzip', transport.session.headers['Accept-Encoding'])
+
+    def test_retries_throttle_payload_with_backoff(self):
+        clock = FakeClock()
+        replies = [{'Note': 'Thank you for using Alpha Vantage!'},
+                   {'Information': 'Please consider spreading out your free API requests more sparingly '
+                                   '(1 request per second).'},
+                   {'data': []}]
+        session = FakeSession(lambda params: replies.pop(0))
+        transport = Transport(session=session, backoff=2, sleep=clock.sleep)
+        self.assertEqual(transport.get_json({'function': 'CPI'}, 'demo'), {'data': []})
+        self.assertEqual(len(session.calls), 3)
+        self.assertEqual(clock.now, 1000 + 2 + 4)
+        self.assertEqual(session.calls[0], {'function': 'CPI', 'apikey': 'demo'})
+
+    def test_gives_up_after_max_retries(self):
+        session = FakeSession(lambda params: {'Note': 'call frequency is 5 calls per minute'})
+        transport = Transport(session=session, max_retries=1, sleep=lambda s: None)
+        with self.assertRaises(ThrottleError):
+            transport.get_json({'function': 'CPI'}, 'demo')
+        self.assertEqual(len(session.calls), 2)
+
+    def test_premium_information_is_not_throttle(self):
+        self.assertFalse(is_throttle_payload({'Information': 'This is a premium endpoint.'}))
+
+    def test_transport_shared_by_equities_and_economics(self):
+        session = FakeSession(lambda params: {'data': [{'date': '2022-01-01', 'value': '2'}],
+                                              'annualReports': [{'fiscalDateEnding': '2021-12-31',
+                                                                 'reportedCurrency': 'USD',
+                                                                 'netIncome': '10'}]})
+        transport = Transport(session=session)
+        a.Economics('demo', transport=transport).real_gdp()
+        a.Equities('demo', ['IBM'], transport=transport).get_cashflow()
+        self.assertEqual([c['function'] for c in session.calls], ['REAL_GDP', 'CASH_FLOW'])
+
+    def test_identical_concurrent_queries_share_one_request(self):
+        release = threading.Event()
+
+        def responder(params):
+            release.wait(2)
+            return {'data': [{'date': '2022-01-01', 'value': '4.1'}]}
+
+        session = FakeSession(responder)
+        # separate objects and transports, like concurrent dashboard requests
+        econs = [a.Economics('demo', transport=Transport(session=session)) for _ in range(6)]
+        threading.Timer(0.05, release.set).start()
+        results = fetch_concurrent(lambda e: e.treasury_yield(maturity='10year'), econs, max_workers=6)
+
+        self.assertEqual(len(session.calls), 1)
+        self.assertTrue(all(r.value['value'].tolist() == [4.1] for r in results))
+
+        unshared = a.Economics('demo', transport=Transport(session=session, single_flight=False))
+        fetch_concurrent(lambda k: unshared.cpi(), range(2), max_workers=2)
+        self.assertEqual(len(session.calls), 3)
+
+    def test_queries_with_different_keys_are_not_shared(self):
+        release = threading.Event()
+
+        def responder(params):
+            release.wait(2)
+            if params['apikey'] == 'bad':
+                return {'Error Message': 'Invalid API key.'}
+            return {'data': [{'date': '2022-01-01', 'value': '4.1'}]}
+
+        session = FakeSession(responder)
+        econs = [a.Economics(key, transport=Transport(session=session)) for key in ('demo', 'bad', 'demo', 'bad')]
+        threading.Timer(0.05, release.set).start()
+        results = fetch_concurrent(lambda e: e.cpi(), econs, max_workers=4)
+
+        self.assertEqual(sorted(c['apikey'] for c in session.calls), ['bad', 'demo'])
+        self.assertEqual([r.ok for r in results], [True, False, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP transport shared by the Equities and Economics classes.
+
+Every request to alpha vantage goes through a single Transport, which owns a
+keep-alive requests.Session with a connection pool so repeated calls reuse the
+same TCP/TLS connection. The transport also applies the response cache, the rate
+limiter, timeouts, gzip and retries: connection errors and 429/5xx statuses are
+retried by urllib3, and throttle payloads ("Note" / "Information") returned with
+an HTTP 200 are retried with exponential backoff. With a quota.QuotaManager the
+transport rotates across several api keys and spaces requests to stay under each
+key's limits.
+
+Identical queries sent concurrently from several threads are coalesced: the first one
+goes to the api and the others wait for its response, across every Transport in the
+process, so a burst of identical calls costs one request of quota.
+"""
+
+import time
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from alpha.cache import ResponseCache, cache_key
+from alpha.scheduler import RateLimiter, SingleFlight
+from alpha.streaming import ContainerNotFound
+
+
+BASE_URL = 'https://www.alphavantage.co/query'
+
+# phrases alpha vantage uses in "Information" payloads when a key is over its limit
+_THROTTLE_PHRASES = ('call frequency', 'rate limit', 'requests per', 'request per', 'sparingly')
+
+# in flight requests shared by every Transport, see flight_key
+_FLIGHTS = SingleFlight()
+
+
+def flight_key(base_url: str, params: dict, api_key: str, quota=None) -> tuple:
+    '''
+    Key of a query shared by concurrent identical requests: the base url, the query and the
+    api key, or the quota pool the key is taken from. Requests made with different keys are
+    never coalesced, one key's result or error is not handed to another.
+    '''
+    return base_url, api_key if quota is None else id(quota), cache_key(params)
+
+
+class AlphaVantageError(Exception):
+    '''
+    Raised when alpha vantage answers with an error or throttle payload instead of data,
+    e.g. {"Error Message": "Invalid API call."}. params is the query and payload the
+    decoded response.
+    '''
+
+    def __init__(self, message: str, params: dict = None, payload=None):
+        super().__init__(message)
+        self.params = params
+        self.payload = payload
+
+
+class ThrottleError(AlphaVantageError):
+    '''Raised when alpha vantage keeps returning throttle payloads after all retries.'''
+
+
+def is_throttle_payload(data) -> bool:
+    '''Returns True if a decoded response is an alpha vantage throttling message.'''
+    if not isinstance(data, dict):
+        return False
+    if 'Note' in data:
+        return True
+    info = data.get('Information')
+    return isinstance(info, str) and any(p in info.lower() for p in _THROTTLE_PHRASES)
+
+
+def payload_error(data, what: str, params: dict = None) -> AlphaVantageError:
+    '''
+    Builds the error for a response that is missing the data asked for, a ThrottleError
+    for throttle payloads and an AlphaVantageError otherwise.
+
+    Parameters
+    ----------
+    data : dict
+        the decoded response
+
+    what : str
+        description of the missing data, e.g. 'no daily time series returned for IBM'
+    '''
+    message = None
+    if isinstance(data, dict):
+        message = data.get('Error Message') or data.get('Information') or data.get('Note')
+    cls = ThrottleError if is_throttle_payload(data) else AlphaVantageError
+    return cls(f'{what}: {message or data}', params, data)
+
+
+class Transport:
+    '''
+    Pooled, retrying request pipeline for alpha vantage. Share one Transport between
+    Equities and Economics objects to share the connection pool, cache and rate limiter.
+
+    Parameters
+    ----------
+    cache : ResponseCache, optional
+        response cache, if None every call goes to the api
+
+    rate_limiter : RateLimiter, optional
+        acquired before each request that is sent to the api (cache hits skip it)
+
+    quota : QuotaManager, optional
+        if set, every request is sent with an api key handed out by the quota manager
+        instead of the caller's key, and throttle payloads are reported back to it. The
+        quota manager's cooldowns replace the backoff between throttle retries.
+
+    timeout : float, optional
+        seconds to wait for a response. Default is 30.
+
+    max_retries : int, optional
+        retries for connection errors, 429/5xx statuses and throttle payloads. Default is 3.
+
+    backoff : float, optional
+        base of the exponential backoff in seconds, the n-th retry waits backoff * 2**n.
+        Default is 1.
+
+    pool_maxsize : int, optional
+        maximum number of kept-alive connections, should be at least the number of
+        concurrent workers. Default is 32.
+
+    session : requests.Session, optional
+        session to send requests with, by default a pooled session is created
+
+    base_url : str, optional
+        alpha vantage query url
+
+    single_flight : bool, optional
+        if True a query already in flight (from any thread and any Transport) is not sent
+        again, the caller waits for the in flight response instead. Default is True.
+    '''
+
+    def __init__(self, cache: Optional[ResponseCache] = None, rate_limiter: Optional[RateLimiter] = None,
+                 timeout: float = 30, max_retries: int = 3, backoff: float = 1.0,
+                 pool_maxsize: int = 32, session: Optional[requests.Session] = None,
+                 base_url: str = BASE_URL, sleep: Callable = time.sleep, single_flight: bool = True,
+                 quota=None):
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.quota = quota
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.session = session if session is not None else self._build_session(pool_maxsize)
+        self._sleep = sleep
+        self.single_flight = single_flight
+
+    def _build_session(self, pool_maxsize: int) -> requests.Session:
+        session = requests.Session()
+        retry = Retry(total=self.max_retries, backoff_factor=self.backoff,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        return session
+
+    def get_json(self, params: dict, api_key: str):
+        '''
+        Returns the decoded json response for a query.
+
+        Parameters
+        ----------
+        params : dict
+            query parameters e.g. {'function': 'CPI', 'interval': 'monthly'}
+
+        api_key : str
+            alpha vantage api key
+
+        Returns
+        -------
+        dict of the decoded json response, error payloads (e.g. "Error Message") are returned
+        as is. Coalesced callers get the same dict, treat it as read only.
+
+        Raises
+        ------
+        ThrottleError if alpha vantage is still throttling after max_retries retries
+        '''
+        if self.single_flight:
+            return _FLIGHTS.do(flight_key(self.base_url, params, api_key, self.quota),
+                               lambda: self._get_json(params, api_key))
+        return self._get_json(params, api_key)
+
+    def _get_json(self, params: dict, api_key: str):
+        if self.cache is not None:
+            data = self.cache.get(params)
+            if data is not None:
+                return data
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            key = self.quota.acquire() if self.quota is not None else api_key
+
+            r = self.session.get(self.base_url, params=dict(params, apikey=key),
+                                 timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+
+            throttled = is_throttle_payload(data)
+            if self.quota is not None:
+                self.quota.record(key, throttled)
+            if not throttled:
+                break
+            if attempt < self.max_retries and self.quota is None:
+                self._sleep(self.backoff * 2**attempt)
+        else:
+            raise ThrottleError(f'alpha vantage throttled {params} after {self.max_retries} retries: {data}',
+                                params, data)
+
+        if self.cache is not None:
+            self.cache.set(params, data)
+
+        return data
+
+    def cached(self, params: dict):
+        '''Returns the fresh cached response for params, or None.'''
+        return self.cache.get(params) if self.cache is not None else None
+
+    def stream(self, params: dict, api_key: str, decode: Callable, variant: tuple = ()):
+        '''
+        Sends a query and decodes the response body while it downloads, returns decode(chunks)
+        where chunks iterates over the bytes of the body.
+
+        The rate limiter, the quota and single flight apply as in get_json: a throttle
+        payload starts the key's cooldown, and identical streams in flight at once share one
+        request and its result (treat it as read only). variant is anything else the result
+        depends on, e.g. the date range decode keeps, so only identical streams are shared.
+        The cache and throttle retries don't apply, the body is never held as json so
+        streamed responses are not cached. decode raises streaming.ContainerNotFound on a
+        throttle or error payload, the caller decides how to go on.
+        '''
+        if self.single_flight:
+            return _FLIGHTS.do(flight_key(self.base_url, params, api_key, self.quota) + ('stream',) + tuple(variant),
+                               lambda: self._stream(params, api_key, decode))
+        return self._stream(params, api_key, decode)
+
+    def _stream(self, params: dict, api_key: str, decode: Callable):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        key = self.quota.acquire() if self.quota is not None else api_key
+        r = self.session.get(self.base_url, params=dict(params, apikey=key),
+                             timeout=self.timeout, stream=True)
+        try:
+            r.raise_for_status()
+            try:
+                result = decode(r.iter_content(chunk_size=2**16))
+            except ContainerNotFound as e:
+                if self.quota is not None:
+                    self.quota.record(key, is_throttle_payload(e.payload))
+                raise
+            if self.quota is not None:
+                self.quota.record(key, False)
+            return result
+        finally:
+            r.close()
+
+    def close(self):
+        self.session.close()
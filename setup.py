@@ -12,6 +12,8 @@ description='A package to interact with alphavantage api.',
 url='#',
 author='Korey Stafford',
 install_requires=['pandas','plotly'],
+extras_require={'async': ['aiohttp'], 'export': ['kaleido']},
+entry_points={'console_scripts': ['alpha=alpha.__main__:main']},
 author_email='',
 packages=setuptools.find_packages(),
 zip_safe=False)
\ No newline at end of file